@@ -7,6 +7,8 @@ import os
 import json
 import hashlib
 
+from host_throttle import get_host_throttle
+
 def generate_acronym(title):
     """Génère un acronyme à partir des lettres majuscules du titre."""
     acronym = ''.join(char for char in title if char.isupper())
@@ -143,6 +145,27 @@ def process_multiline_attribute(attr_name, content_lines):
     # Cas standard (une seule ligne)
     return f'    <p><strong>{attr_name}</strong> {content}</p>\n'
 
+async def throttled_goto(page, url, timeout):
+    """
+    page.goto régulé par le contrôleur de concurrence partagé avec le scraping
+    HTTP : un seul budget de politesse pour tout l'hôte.
+    """
+    throttle = get_host_throttle()
+    if throttle is None:
+        return await page.goto(url, timeout=timeout)
+    await throttle.acquire_async(url)
+    start = time.monotonic()
+    try:
+        response = await page.goto(url, timeout=timeout)
+    except Exception:
+        throttle.release(url, error=True)
+        raise
+    if response is None:
+        throttle.release(url)
+    else:
+        throttle.release(url, response.status, time.monotonic() - start, response.headers.get("retry-after"))
+    return response
+
 async def process_service(page, service_id, source_url, is_english=False, retry_timeout=60000):
     """Traite un seul service de manière asynchrone"""
     try:
@@ -150,7 +173,7 @@ async def process_service(page, service_id, source_url, is_english=False, retry_
         url_with_entity = f"{source_url}?entity={service_id}"
         
         # Navigue vers cette URL avec timeout configurable
-        await page.goto(url_with_entity, timeout=retry_timeout)
+        await throttled_goto(page, url_with_entity, retry_timeout)
         await page.wait_for_load_state('networkidle')
         
         # Extrais les informations
@@ -231,7 +254,7 @@ async def scrape_annuaire_async(url):
         
         # Obtenir la liste des services
         main_page = await context.new_page()
-        await main_page.goto(source_url, timeout=60000)
+        await throttled_goto(main_page, source_url, 60000)
         await main_page.wait_for_load_state('networkidle')
         
         # Sélecteur des services
@@ -360,7 +383,7 @@ async def scrape_french_services():
         
         # Obtenir la liste des services
         main_page = await context.new_page()
-        await main_page.goto(source_url, timeout=60000)
+        await throttled_goto(main_page, source_url, 60000)
         await main_page.wait_for_load_state('networkidle')
         
         # Sélecteur des services
@@ -41,6 +41,7 @@ class JobStats(BaseModel):
     urls_failed: int = 0
     annuaire_services: int = 0
     vectors_created: int = 0
+    vectors_failed: int = 0
     directories_created: int = 0
     files_created: int = 0
     start_time: Optional[float] = None
@@ -55,6 +56,7 @@ class JobSummary(BaseModel):
     files_created: int = 0
     annuaire_services: int = 0
     vectors_created: int = 0
+    vectors_failed: int = 0
     total_time: str = "0s"
 
 class ScrapingRequest(BaseModel):
@@ -62,12 +64,23 @@ class ScrapingRequest(BaseModel):
     output_folder: str = "output"
     thematique: str = "monservicepublic"
     workers: int = 8
+    cleaning_workers: int = 0
+    loader_workers: int = 0
+    sync: bool = False  # Embedding différentiel (manifeste des vecteurs) au lieu du nettoyage des namespaces
+    async_fetch: bool = False
+    max_in_flight: int = 32
+    http_cache_dir: Optional[str] = None
+    incremental: bool = False
+    retry_failed: bool = False
+    archive_dir: Optional[str] = None
+    replay: bool = False
+    corpus_format: Optional[str] = None  # "files" ou "jsonl" (défaut : config.py)
     skip_scraping: bool = False
     skip_embedding: bool = False
 
 class JobStatus(BaseModel):
     job_id: str
-    status: str  # "pending", "running", "completed", "failed"
+    status: str  # "pending", "running", "completed", "completed_with_errors", "failed"
     created_at: str
     started_at: Optional[str] = None
     completed_at: Optional[str] = None
@@ -126,6 +139,7 @@ def run_scraping_job(job_id: str, request: ScrapingRequest):
             "urls_failed": 0,
             "annuaire_services": 0,
             "vectors_created": 0,
+            "vectors_failed": 0,
             "directories_created": 0,
             "files_created": 0,
             "start_time": start_time,
@@ -153,10 +167,11 @@ def run_scraping_job(job_id: str, request: ScrapingRequest):
             # Hook dans le processus de scraping pour suivre le progrès
             import upsert
             original_process_single_url = upsert.process_single_url
+            original_process_multiple_urls = upsert.process_multiple_urls
             
-            def tracked_process_single_url(url, output_folder, silent=False):
+            def tracked_process_single_url(url, output_folder, silent=False, **kwargs):
                 try:
-                    result = original_process_single_url(url, output_folder, silent)
+                    result = original_process_single_url(url, output_folder, silent, **kwargs)
                     job_data["stats"]["urls_processed"] += 1
                     
                     # Mettre à jour le progrès tous les 10 URLs
@@ -173,15 +188,28 @@ def run_scraping_job(job_id: str, request: ScrapingRequest):
                     job_data["stats"]["urls_failed"] += 1
                     raise e
             
-            # Remplacer temporairement la fonction
+            def tracked_process_multiple_urls(url_list, output_base_folder, *args, **kwargs):
+                # Total compté au fil du flux des sitemaps, sans les relire en amont
+                def counted_urls():
+                    for url in url_list:
+                        job_data["stats"]["urls_total"] += 1
+                        yield url
+                return original_process_multiple_urls(counted_urls(), output_base_folder, *args, **kwargs)
+            
+            # Remplacer temporairement les fonctions
             upsert.process_single_url = tracked_process_single_url
+            upsert.process_multiple_urls = tracked_process_multiple_urls
             
             try:
-                # Charger les URLs pour connaître le total
-                from upsert import load_urls_from_sitemaps
-                urls = load_urls_from_sitemaps(request.sitemaps)
-                job_data["stats"]["urls_total"] = len(urls)
-                job_data["progress"] = f"Phase 1/2: Scraping de {len(urls)} URLs..."
+                from upsert import load_failure_manifest
+                if request.replay:
+                    # Replay : l'archive locale donne le total sans accès réseau
+                    from html_archive import RawArchive
+                    urls = RawArchive(request.archive_dir).urls() if request.archive_dir else []
+                    job_data["stats"]["urls_total"] = len(urls)
+                    job_data["progress"] = f"Phase 1/2: Replay de {len(urls)} URLs archivées..."
+                else:
+                    job_data["progress"] = "Phase 1/2: Scraping des URLs au fil de l'analyse des sitemaps..."
                 jobs[job_id] = job_data
                 save_job_status(job_id, job_data)
                 
@@ -193,22 +221,40 @@ def run_scraping_job(job_id: str, request: ScrapingRequest):
                     thematique=request.thematique,
                     workers=request.workers,
                     skip_scraping=False,
-                    skip_embedding=True  # On fait l'embedding après
+                    skip_embedding=True,  # On fait l'embedding après
+                    async_fetch=request.async_fetch,
+                    max_in_flight=request.max_in_flight,
+                    http_cache_dir=request.http_cache_dir,
+                    incremental=request.incremental,
+                    cleaning_workers=request.cleaning_workers,
+                    retry_failed=request.retry_failed,
+                    archive_dir=request.archive_dir,
+                    replay=request.replay,
+                    corpus_format=request.corpus_format
                 )
                 
+                # Échecs définitifs (après relances) : le tracker compte chaque tentative
+                job_data["stats"]["urls_failed"] = len(load_failure_manifest(request.output_folder))
+                
                 # Compter les fichiers créés
-                import os
                 if os.path.exists(request.output_folder):
-                    files_count = sum([len(files) for _, _, files in os.walk(request.output_folder)])
+                    from output_files import count_output_files
+                    files_count = count_output_files(request.output_folder)
                     dirs_count = sum([len(dirs) for _, dirs, _ in os.walk(request.output_folder)]) - 1
                     job_data["stats"]["files_created"] = files_count
                     job_data["stats"]["directories_created"] = max(0, dirs_count)
+                    from corpus import corpus_exists, load_corpus_index
+                    if corpus_exists(request.output_folder):
+                        # Corpus JSONL : compter les pages plutôt que les shards
+                        job_data["stats"]["files_created"] = len(load_corpus_index(request.output_folder))
                 
             finally:
-                # Restaurer la fonction originale
+                # Restaurer les fonctions originales
                 upsert.process_single_url = original_process_single_url
+                upsert.process_multiple_urls = original_process_multiple_urls
         
         # Phase 2: Embedding
+        embedding_errors = []
         if not request.skip_embedding:
             job_data["stats"]["current_phase"] = "embedding"
             job_data["progress"] = "Phase 2/2: Génération des embeddings..."
@@ -219,19 +265,28 @@ def run_scraping_job(job_id: str, request: ScrapingRequest):
             import embedding_pipeline
             original_upsert_to_pinecone = embedding_pipeline.upsert_to_pinecone
             
+            # Appelée en parallèle par le pool d'upsert de run_embedding
+            vectors_lock = threading.Lock()
+            
             def tracked_upsert_to_pinecone(index, vectors, namespace):
-                result = original_upsert_to_pinecone(index, vectors, namespace)
-                job_data["stats"]["vectors_created"] += len(vectors)
-                job_data["progress"] = f"Embedding: {job_data['stats']['vectors_created']} vecteurs créés"
-                jobs[job_id] = job_data
-                return result
+                failed_ids = original_upsert_to_pinecone(index, vectors, namespace) or []
+                with vectors_lock:
+                    # Seuls les vecteurs effectivement insérés sont comptés
+                    job_data["stats"]["vectors_created"] += len(vectors) - len(failed_ids)
+                    job_data["progress"] = f"Embedding: {job_data['stats']['vectors_created']} vecteurs créés"
+                    jobs[job_id] = job_data
+                return failed_ids
             
             # Remplacer temporairement
             embedding_pipeline.upsert_to_pinecone = tracked_upsert_to_pinecone
             
             try:
                 from embedding_pipeline import run_embedding
-                run_embedding(request.output_folder, request.thematique)
+                report = run_embedding(request.output_folder, request.thematique,
+                                       loader_workers=request.loader_workers, sync=request.sync)
+                if report:
+                    job_data["stats"]["vectors_failed"] = report["metrics"]["vectors_failed"]
+                    embedding_errors = report["errors"]
             finally:
                 # Restaurer la fonction originale
                 embedding_pipeline.upsert_to_pinecone = original_upsert_to_pinecone
@@ -240,8 +295,12 @@ def run_scraping_job(job_id: str, request: ScrapingRequest):
         end_time = time.time()
         total_time = end_time - start_time
         
-        # Succès - Statistiques finales
-        job_data["status"] = "completed"
+        # Succès - Statistiques finales (vecteurs en échec : terminé avec erreurs)
+        if embedding_errors:
+            job_data["status"] = "completed_with_errors"
+            job_data["error"] = f"{len(embedding_errors)} erreur(s) d'embedding, dont : {embedding_errors[0]}"
+        else:
+            job_data["status"] = "completed"
         job_data["completed_at"] = datetime.now().isoformat()
         job_data["stats"]["end_time"] = end_time
         job_data["stats"]["total_duration_seconds"] = total_time
@@ -261,6 +320,7 @@ def run_scraping_job(job_id: str, request: ScrapingRequest):
             "files_created": job_data["stats"]["files_created"],
             "annuaire_services": job_data["stats"]["annuaire_services"],
             "vectors_created": job_data["stats"]["vectors_created"],
+            "vectors_failed": job_data["stats"]["vectors_failed"],
             "total_time": job_data["stats"]["total_duration_formatted"]
         }
         
@@ -484,11 +544,15 @@ async def run_embedding_only(
     background_tasks: BackgroundTasks,
     output_folder: str = "output",
     thematique: str = "monservicepublic",
+    loader_workers: int = 0,
+    sync: bool = False,
     token: str = Depends(verify_token)
 ):
     """
     Lance UNIQUEMENT l'embedding sur les fichiers existants
     (Suppose que le scraping a déjà été fait)
+    loader_workers: processus pour le chargement des documents (0 = séquentiel)
+    sync: n'insérer que les chunks nouveaux ou modifiés et supprimer les vecteurs obsolètes
     """
     # Créer une requête qui skip le scraping
     request = ScrapingRequest(
@@ -496,12 +560,39 @@ async def run_embedding_only(
         output_folder=output_folder,
         thematique=thematique,
         workers=1,  # Pas utilisé pour embedding
+        loader_workers=loader_workers,
+        sync=sync,
         skip_scraping=True,
         skip_embedding=False
     )
     
     return await start_scraping(request, background_tasks, token)
 
+@app.post("/scrape/retry-failed", response_model=JobResponse, summary="Relancer uniquement les URLs en échec")
+async def retry_failed_scraping(
+    background_tasks: BackgroundTasks,
+    output_folder: str = "output",
+    thematique: str = "monservicepublic",
+    workers: int = 8,
+    skip_embedding: bool = False,
+    token: str = Depends(verify_token)
+):
+    """
+    Relance uniquement les URLs listées dans le manifeste des échecs du
+    dernier scraping (output_folder/.failed_urls.json), sans crawl complet
+    """
+    request = ScrapingRequest(
+        sitemaps=[],  # Les URLs viennent du manifeste des échecs
+        output_folder=output_folder,
+        thematique=thematique,
+        workers=workers,
+        retry_failed=True,
+        skip_scraping=False,
+        skip_embedding=skip_embedding
+    )
+    
+    return await start_scraping(request, background_tasks, token)
+
 @app.get("/jobs/{job_id}/stats", summary="Statistiques détaillées d'un job")
 async def get_job_stats(job_id: str, token: str = Depends(verify_token)):
     """
@@ -564,7 +655,7 @@ async def get_job_progress(job_id: str, token: str = Depends(verify_token)):
         "urls_processed": stats.get("urls_processed", 0),
         "urls_total": stats.get("urls_total", 0),
         "vectors_created": stats.get("vectors_created", 0),
-        "is_completed": job_data.get("status") in ["completed", "failed"],
+        "is_completed": job_data.get("status") in ["completed", "completed_with_errors", "failed"],
         "error": job_data.get("error") if job_data.get("status") == "failed" else None
     }
 
@@ -617,22 +708,25 @@ async def get_simple_status(job_id: str, token: str = Depends(verify_token)):
         "job_id": job_id,
         "status": status,
         "is_running": status == "running",
-        "is_completed": status == "completed",
+        "is_completed": status in ["completed", "completed_with_errors"],
         "is_failed": status == "failed",
         "progress_text": job_data.get("progress", ""),
         "current_phase": stats.get("current_phase", "unknown")
     }
     
     # Ajouter des infos selon le statut
-    if status == "completed":
+    if status in ["completed", "completed_with_errors"]:
         summary = job_data.get("summary", {})
         result.update({
             "urls_scraped": summary.get("urls_scraped", 0),
             "vectors_created": summary.get("vectors_created", 0),
+            "vectors_failed": summary.get("vectors_failed", 0),
             "total_time": summary.get("total_time", "0s"),
             "files_created": summary.get("files_created", 0),
             "annuaire_services": summary.get("annuaire_services", 0)
         })
+        if status == "completed_with_errors":
+            result["error"] = job_data.get("error")
     elif status == "failed":
         result.update({
             "error": job_data.get("error", "Erreur inconnue"),
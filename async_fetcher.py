@@ -0,0 +1,97 @@
+#async_fetcher.py
+import asyncio
+
+import httpx
+
+# Le support HTTP/2 de httpx dépend du paquet optionnel "h2"
+try:
+    import h2  # noqa: F401
+    http2_available = True
+except ImportError:
+    http2_available = False
+
+# Délais (connexion, lecture) en secondes
+DEFAULT_TIMEOUT = (10.0, 30.0)
+
+# Erreurs réseau transitoires (délais dépassés, connexion refusée ou coupée)
+TRANSIENT_ERRORS = (httpx.TransportError,)
+
+# Réponses téléchargées en attente de traitement, par requête simultanée autorisée
+PENDING_RESULTS_FACTOR = 2
+
+async def _fetch_one(client, semaphore, pending, url, on_result, executor, request_headers, throttle):
+    """
+    Télécharge une URL en respectant la limite de requêtes simultanées
+    (et celle de l'hôte si un contrôleur est fourni), puis confie la réponse
+    au callback dans l'executor (le nettoyage HTML est CPU-bound et ne doit
+    pas bloquer la boucle d'événements). pending, acquis par l'appelant, est
+    libéré une fois le callback terminé : si le nettoyage est plus lent que
+    le téléchargement, les corps en attente restent en nombre borné.
+    """
+    try:
+        await _fetch_and_handle(client, semaphore, url, on_result, executor, request_headers, throttle)
+    finally:
+        pending.release()
+
+async def _fetch_and_handle(client, semaphore, url, on_result, executor, request_headers, throttle):
+    loop = asyncio.get_running_loop()
+    response, error = None, None
+    async with semaphore:
+        if throttle is not None:
+            await throttle.acquire_async(url)
+        start = loop.time()
+        try:
+            headers = request_headers(url) if request_headers else None
+            resp = await client.get(url, headers=headers)
+            response = (resp.status_code, resp.content, resp.headers)
+        except Exception as e:
+            error = e
+        if throttle is not None:
+            if error is not None:
+                throttle.release(url, error=True)
+            else:
+                throttle.release(url, response[0], loop.time() - start, response[2].get("Retry-After"))
+    await loop.run_in_executor(executor, on_result, url, response, error)
+
+async def fetch_urls_async(urls, on_result, max_in_flight=32, executor=None, timeout=DEFAULT_TIMEOUT,
+                           request_headers=None, throttle=None):
+    """
+    Récupère toutes les URLs avec un unique pool de connexions keep-alive
+    (HTTP/2 si disponible, gzip/br géré par httpx).
+
+    on_result(url, response, error) est appelé pour chaque URL, avec
+    response = (status_code, content, headers).
+    timeout: couple (connexion, lecture) en secondes.
+    request_headers(url), si fourni, renvoie les en-têtes propres à chaque requête.
+    throttle: HostThrottle optionnel régulant la concurrence par hôte.
+    """
+    limits = httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+    semaphore = asyncio.Semaphore(max_in_flight)
+    pending = asyncio.Semaphore(max_in_flight * PENDING_RESULTS_FACTOR)
+    loop = asyncio.get_running_loop()
+    async with httpx.AsyncClient(
+        http2=http2_available,
+        limits=limits,
+        timeout=httpx.Timeout(timeout[1], connect=timeout[0]),
+        verify=False,
+        follow_redirects=True,
+    ) as client:
+        # urls peut être un flux (générateur bloquant) : chaque URL est lancée
+        # dès qu'elle est disponible, sans attendre la fin du flux
+        iterator = iter(urls)
+        tasks = []
+        while True:
+            url = await loop.run_in_executor(None, next, iterator, None)
+            if url is None:
+                break
+            # Attendre qu'une réponse soit traitée avant de lancer une URL de plus
+            await pending.acquire()
+            tasks.append(asyncio.create_task(
+                _fetch_one(client, semaphore, pending, url, on_result, executor, request_headers, throttle)
+            ))
+        await asyncio.gather(*tasks)
+
+def fetch_urls(urls, on_result, max_in_flight=32, executor=None, timeout=DEFAULT_TIMEOUT,
+               request_headers=None, throttle=None):
+    """Point d'entrée synchrone qui exécute la version asynchrone"""
+    asyncio.run(fetch_urls_async(urls, on_result, max_in_flight, executor, timeout, request_headers, throttle))
@@ -0,0 +1,54 @@
+#bench_enriched_text.py
+"""
+Micro-benchmark de la conversion en texte enrichi : parcours unique
+(enriched_text.soup_to_enriched_text) contre l'implémentation d'origine en
+plusieurs passes (tests/enriched_text_reference.py), sur les pages de test.
+
+    python benchmarks/bench_enriched_text.py [--repeat N] [--parser lxml|html.parser]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "tests"))
+
+from conftest import PAGE_URLS, read_golden, read_page  # noqa: E402
+from enriched_text import soup_to_enriched_text  # noqa: E402
+from enriched_text_reference import reference_soup_to_enriched_text  # noqa: E402
+from html_parsing import parse_html  # noqa: E402
+
+def bench(convert, documents, parser, repeat):
+    """Meilleur temps (secondes) de conversion de tous les documents, analyse exclue."""
+    best = None
+    for _ in range(repeat):
+        # Analyse hors mesure : la référence modifie l'arbre, chaque tour repart de documents neufs
+        soups = [(parse_html(html, parser), url) for html, url in documents]
+        start = time.perf_counter()
+        for soup, url in soups:
+            convert(soup, url)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la conversion HTML -> texte enrichi")
+    parser.add_argument("--repeat", type=int, default=20, help="Nombre de tours (meilleur temps retenu)")
+    parser.add_argument("--parser", default="lxml", help="Parseur BeautifulSoup (lxml ou html.parser)")
+    args = parser.parse_args()
+    
+    # Pages brutes et pages nettoyées (entrée réelle de la conversion au scraping)
+    documents = [(read_page(name), url) for name, url in PAGE_URLS.items()]
+    documents += [(read_golden("clean", name, "html"), url) for name, url in PAGE_URLS.items()]
+    
+    reference = bench(reference_soup_to_enriched_text, documents, args.parser, args.repeat)
+    single_walk = bench(soup_to_enriched_text, documents, args.parser, args.repeat)
+    print(f"[INFO] {len(documents)} documents, meilleur de {args.repeat} tours ({args.parser})")
+    print(f"[INFO] Référence (plusieurs passes) : {reference * 1000:.2f} ms")
+    print(f"[INFO] Parcours unique             : {single_walk * 1000:.2f} ms")
+    print(f"[INFO] Accélération                : x{reference / single_walk:.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -169,3 +169,107 @@ BASE_DOMAIN = "https://monservicepublic.gouv.mc"
 
 # Namespace utilisé pour les URLs fixes.
 PARENT_NAMESPACE = "general"
+
+# Parseur HTML utilisé par BeautifulSoup : "lxml" (rapide, repli automatique
+# sur "html.parser" s'il n'est pas installé) ou "html.parser".
+HTML_PARSER = "lxml"
+
+# Analyse partielle des pages : ne construire que le sous-arbre <main>
+# (repli sur l'analyse complète si la page n'en a pas). Suppose que <main>
+# n'est pas imbriqué dans un header/nav, ce qui est le cas du gabarit du site.
+PARTIAL_PARSE = False
+
+# Sérialisation des pages nettoyées : "compact" (sans indentation, espaces
+# réduits ; titre lu sans analyse au chargement de l'embedding) ou "pretty"
+# (prettify() de BeautifulSoup, plusieurs fois plus volumineux).
+HTML_SERIALIZATION = "compact"
+
+# Cache local des embeddings (SQLite) : clé = modèle + hash du texte du chunk ;
+# un chunk inchangé depuis un run précédent n'est pas réembeddé. None pour le
+# désactiver. Au-delà de la taille maximale (vecteurs, en Mo), les entrées les
+# moins récemment utilisées sont évincées en fin de run.
+EMBEDDING_CACHE_PATH = "embedding_cache.sqlite"
+EMBEDDING_CACHE_MAX_MB = 1024
+
+# Manifeste local des IDs de vecteurs par index, namespace et page, utilisé par
+# la synchronisation différentielle de l'embedding (--sync) : seuls les chunks
+# nouveaux ou modifiés sont insérés et seuls les IDs obsolètes sont supprimés.
+VECTOR_MANIFEST_PATH = "vector_manifest.json"
+
+# Requêtes d'embedding groupées selon le nombre réel de tokens des chunks
+# (tiktoken ; sans lui, une estimation d'après la longueur du texte) : plafond de
+# tokens par requête, sous la limite OpenAI de 300k, et nombre maximal de
+# textes par requête (limite de l'API : 2048).
+EMBEDDING_MAX_TOKENS_PER_REQUEST = 250000
+EMBEDDING_MAX_ITEMS_PER_REQUEST = 1000
+
+# Embedding concurrent : lots traités en parallèle et quotas du compte OpenAI
+# (requêtes et tokens par minute) appliqués par un seau à jetons partagé ; un
+# refus pour rate limiting suspend tous les workers selon les en-têtes de la
+# réponse, au plus EMBEDDING_MAX_RETRIES fois par requête.
+EMBEDDING_WORKERS = 4
+OPENAI_REQUESTS_PER_MINUTE = 3000
+OPENAI_TOKENS_PER_MINUTE = 1000000
+EMBEDDING_MAX_RETRIES = 6
+
+# Upsert Pinecone : requêtes dimensionnées par taille sérialisée (limite de
+# l'API : 2 Mo) et nombre de vecteurs, envoyées en parallèle pendant
+# l'embedding des lots suivants. Une requête en échec transitoire (429, 5xx,
+# réseau) est relancée avec backoff exponentiel, une requête trop grosse est
+# coupée en deux.
+PINECONE_UPSERT_MAX_BYTES = 1800000
+PINECONE_UPSERT_MAX_VECTORS = 1000
+PINECONE_UPSERT_WORKERS = 4
+PINECONE_UPSERT_MAX_RETRIES = 5
+
+# Profils de gabarit par domaine : quand une page correspond au gabarit connu,
+# le contenu principal est extrait directement par sélecteurs CSS, sans les
+# heuristiques génériques (bannière cookies, classes de navigation, fils d'Ariane).
+SITE_PROFILES = {
+    "monservicepublic.gouv.mc": {
+        # Conteneur du contenu principal (doit être unique dans la page)
+        "content_selector": "main",
+        # Éléments retirés du contenu principal
+        "remove_selectors": [
+            "nav", "header", "footer",
+            "[role=navigation]", "[role=banner]", "[role=contentinfo]",
+            "[aria-label*=breadcrumb i]", "[aria-label*=ariane i]", "[class*=breadcrumb]",
+            "#cmplz-cookiebanner-container", "[class*=cmplz]",
+        ],
+        # Longueur minimale du texte du conteneur pour valider le gabarit
+        "min_text_length": 200,
+    },
+}
+
+# Concurrence adaptative par hôte (AIMD) : la limite de requêtes simultanées
+# par hôte augmente tant que la latence reste saine et diminue sur 429/503.
+# Le budget est partagé entre le scraping HTTP et le crawl Playwright de l'annuaire
+# (workers / max_in_flight restent des plafonds globaux).
+ADAPTIVE_CONCURRENCY = True
+HOST_INITIAL_CONCURRENCY = 4
+HOST_MAX_CONCURRENCY = 32
+# Respecter le Crawl-delay déclaré dans robots.txt
+RESPECT_ROBOTS_TXT = True
+
+# Délais réseau par requête (secondes) : établissement de la connexion et lecture
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = 30
+
+# Relance en fin de scraping des URLs en échec transitoire (erreur réseau,
+# 408/429/5xx) : backoff exponentiel avec jitter, file bornée
+RETRY_MAX_ATTEMPTS = 3
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 30.0
+RETRY_QUEUE_MAX = 500
+
+# Sorties par générations : chaque scraping écrit dans une nouvelle génération
+# (<output>.generations/gen-<date>) publiée par échange atomique du lien
+# symbolique <output> une fois terminée ; les lecteurs voient toujours un corpus
+# complet. Nombre de générations précédentes conservées (diff, retour arrière).
+STAGED_OUTPUT = True
+OUTPUT_GENERATIONS_KEPT = 3
+
+# Format des pages scrapées : "files" (un fichier .txt par page, dans le dossier
+# de son groupe) ou "jsonl" (corpus en shards JSONL compressés zstd/zlib avec un
+# index des positions, dans <output>/corpus ; voir corpus.py)
+CORPUS_FORMAT = "files"
@@ -0,0 +1,163 @@
+#corpus.py
+import hashlib
+import json
+import mmap
+import os
+import threading
+from datetime import datetime, timezone
+
+from html_archive import compress, decompress, zstd_available
+
+# Corpus en shards JSONL compressés, alternative aux fichiers .txt (un par page).
+# Chaque enregistrement est une ligne JSON compressée en une frame indépendante :
+# avec zstd, "zstdcat shard-*.jsonl.zst" redonne directement le JSONL.
+CORPUS_DIRNAME = "corpus"
+INDEX_FILENAME = "index.json"
+DEFAULT_SHARD_SIZE = 32 * 1024 * 1024
+# Compaction quand les enregistrements actifs occupent moins de cette part des shards
+COMPACTION_THRESHOLD = 0.5
+
+def corpus_dir(output_folder):
+    return os.path.join(output_folder, CORPUS_DIRNAME)
+
+def corpus_exists(output_folder):
+    return os.path.isfile(os.path.join(corpus_dir(output_folder), INDEX_FILENAME))
+
+def load_corpus_index(output_folder):
+    """Index url -> [shard, offset, longueur, codec, groupe, hash] (vide si absent)."""
+    index_path = os.path.join(corpus_dir(output_folder), INDEX_FILENAME)
+    if not os.path.exists(index_path):
+        return {}
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"[AVERT] Index du corpus illisible, ignoré : {e}")
+        return {}
+
+def iter_corpus_records(output_folder):
+    """
+    Parcourt les enregistrements du corpus (dicts url, group, hash, filename,
+    html et enriched : texte enrichi) shard par shard, dans l'ordre du fichier ; chaque shard est projeté
+    en mémoire plutôt que lu en entier.
+    """
+    directory = corpus_dir(output_folder)
+    by_shard = {}
+    for entry in load_corpus_index(output_folder).values():
+        by_shard.setdefault(entry[0], []).append(entry)
+    for shard in sorted(by_shard):
+        path = os.path.join(directory, shard)
+        if not os.path.getsize(path):
+            continue
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for _, offset, length, codec, _, _ in sorted(by_shard[shard], key=lambda entry: entry[1]):
+                yield json.loads(decompress(codec, mapped[offset:offset + length]))
+
+class CorpusWriter:
+    """
+    Écriture du corpus en ajout seul.
+
+    Chaque run écrit dans de nouveaux shards : un shard existant n'est jamais
+    modifié (il peut être partagé par lien physique avec une génération
+    précédente). Une page réécrite pointe vers son nouvel enregistrement ;
+    une page inchangée (même hash) n'est pas réécrite. Les enregistrements
+    inactifs sont éliminés par compaction lors de save().
+    """
+
+    def __init__(self, output_folder, shard_size=DEFAULT_SHARD_SIZE):
+        self.directory = corpus_dir(output_folder)
+        self.shard_size = shard_size
+        self._index = load_corpus_index(output_folder)
+        self._lock = threading.Lock()
+        self._run_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        self._shard_count = 0
+        self._shard = None
+        self._shard_file = None
+        self._shard_offset = 0
+        self.written = 0
+        self.unchanged = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def __contains__(self, url):
+        return url in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    def _open_shard(self, frame_size):
+        """Prépare le shard du run courant où écrire (appelé sous verrou)."""
+        if self._shard_file is not None:
+            if self._shard_offset == 0 or self._shard_offset + frame_size <= self.shard_size:
+                return
+            self._shard_file.close()
+        extension = "jsonl.zst" if zstd_available else "jsonl.zz"
+        self._shard = f"shard-{self._run_id}-{self._shard_count:03d}.{extension}"
+        self._shard_count += 1
+        self._shard_offset = 0
+        self._shard_file = open(os.path.join(self.directory, self._shard), "wb")
+
+    def add(self, url, group, html, filename=None, enriched=None):
+        """
+        Ajoute (ou remplace) la page url du groupe group.
+        enriched: dict {"url", "title", "text"} du texte enrichi de la page.
+        """
+        digest = hashlib.sha256(html.encode("utf-8")).hexdigest()
+        with self._lock:
+            entry = self._index.get(url)
+            if entry is not None and entry[4] == group and entry[5] == digest:
+                self.unchanged += 1
+                return
+        record = {"url": url, "group": group, "hash": digest, "filename": filename, "html": html,
+                  "enriched": enriched}
+        codec, frame = compress((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+        with self._lock:
+            self._open_shard(len(frame))
+            self._shard_file.write(frame)
+            self._index[url] = [self._shard, self._shard_offset, len(frame), codec, group, digest]
+            self._shard_offset += len(frame)
+            self.written += 1
+
+    def remove(self, url):
+        with self._lock:
+            return self._index.pop(url, None) is not None
+
+    def _compact(self):
+        """Réécrit les enregistrements actifs dans de nouveaux shards si les inactifs dominent (sous verrou)."""
+        shards = [name for name in os.listdir(self.directory) if name.startswith("shard-")]
+        total = sum(os.path.getsize(os.path.join(self.directory, name)) for name in shards)
+        live = sum(entry[2] for entry in self._index.values())
+        if total and live / total < COMPACTION_THRESHOLD:
+            old_index = self._index
+            self._index = {}
+            for url, entry in sorted(old_index.items(), key=lambda item: (item[1][0], item[1][1])):
+                shard, offset, length, codec, group, digest = entry
+                with open(os.path.join(self.directory, shard), "rb") as f:
+                    f.seek(offset)
+                    frame = f.read(length)
+                # Les frames sont recopiées telles quelles, sans recompression
+                self._open_shard(length)
+                self._shard_file.write(frame)
+                self._index[url] = [self._shard, self._shard_offset, length, codec, group, digest]
+                self._shard_offset += length
+            if self._shard_file is not None:
+                # Aucun shard ouvert si plus aucun enregistrement n'est actif
+                self._shard_file.close()
+                self._shard_file = None
+        # Shards qui ne contiennent plus aucun enregistrement actif
+        referenced = {entry[0] for entry in self._index.values()}
+        for name in shards:
+            if name not in referenced:
+                os.remove(os.path.join(self.directory, name))
+
+    def save(self):
+        """Ferme le shard en cours, compacte si besoin et écrit l'index de manière atomique."""
+        with self._lock:
+            if self._shard_file is not None:
+                self._shard_file.close()
+                self._shard_file = None
+            self._compact()
+            index_path = os.path.join(self.directory, INDEX_FILENAME)
+            tmp_path = f"{index_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._index, f)
+            os.replace(tmp_path, index_path)
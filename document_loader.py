@@ -0,0 +1,91 @@
+#document_loader.py
+from html_parsing import parse_html, compact_title
+from enriched_text import enhanced_html_to_text
+from url_classifier import get_classifier
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+# Chargement et découpage des pages avant l'embedding. Le module n'a aucun
+# effet de bord à l'import (ni clés d'API ni connexion Pinecone) : les
+# processus du chargement parallèle, démarrés à neuf (spawn), l'importent
+# pour exécuter load_pages_chunks.
+
+# Découpeur de texte du processus courant (un par worker du chargement parallèle)
+_text_splitter = None
+
+def get_text_splitter():
+    global _text_splitter
+    if _text_splitter is None:
+        _text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=20000,
+            chunk_overlap=5000,
+            separators=["\n\n", "\n", ". ", " ", ""]
+        )
+    return _text_splitter
+
+def load_page_chunks(page, fixed_thematique):
+    """
+    Texte enrichi, métadonnées et découpage d'une page de iter_scraped_pages.
+    Renvoie (texte enrichi, [(chunk, métadonnées), ...]) ; exécutable dans un
+    processus du chargement parallèle.
+    """
+    html_content, filename, folder_name, enriched = page
+    classifier = get_classifier()  # URLs fixes et patterns annuaire compilés depuis config.py
+    if enriched is not None:
+        # Texte enrichi produit au scraping : aucune analyse HTML
+        url_extracted = enriched["url"]
+        enriched_text = enriched["text"]
+    else:
+        # Extraire l'URL : lue directement en tête des pages compactes, via BeautifulSoup sinon
+        url_extracted = compact_title(html_content)
+        if url_extracted is None:
+            soup = parse_html(html_content)
+            url_extracted = soup.title.string.strip() if soup.title and soup.title.string else "unknown"
+        
+        # Utiliser la fonction améliorée pour préserver les liens
+        enriched_text = enhanced_html_to_text(html_content, base_url=url_extracted)
+    
+    # Déduire le namespace à partir du dossier (groupe) de la page
+    if folder_name is not None:
+        # Si c'est dans le dossier "Annuaire", forcer le namespace "child"
+        if folder_name == "Annuaire":
+            namespace = "child"
+        elif folder_name == "general":
+            namespace = "general"
+        else:
+            # Tous les autres dossiers (catégories) vont dans "child"
+            namespace = "child"
+    else:
+        namespace = "general"
+    
+    metadata = {
+        "filename": filename,  # Nom du fichier au lieu du chemin complet
+        "url": url_extracted,
+        "namespace": namespace,
+        "format": "enriched_text"  # Indique que le contenu est du texte enrichi
+    }
+    if enriched is not None and enriched.get("title"):
+        metadata["title"] = enriched["title"]  # Titre de la page d'origine
+    
+    # Déterminer la thématique
+    # Si c'est l'annuaire, définir une thématique spécifique
+    is_annuaire = classifier.is_annuaire(url_extracted)
+    if is_annuaire:
+        metadata["thematique"] = "Annuaire administratif"
+    else:
+        # Vérifier si l'URL extraite figure dans FIXED_URLS pour ajouter la thématique associée
+        fixed_them = classifier.fixed_thematique(url_extracted)
+        metadata["thematique"] = fixed_them if fixed_them is not None else fixed_thematique
+    
+    # Découpage du texte en chunks
+    chunks = get_text_splitter().split_text(enriched_text)
+    
+    chunk_records = []
+    for i, chunk in enumerate(chunks):
+        chunk_metadata = metadata.copy()
+        chunk_metadata["chunk"] = i  # Ajouter un numéro de chunk
+        chunk_records.append((chunk, chunk_metadata))
+    return enriched_text, chunk_records
+
+def load_pages_chunks(pages, fixed_thematique):
+    """load_page_chunks sur un lot de pages (tâche du chargement parallèle)."""
+    return [load_page_chunks(page, fixed_thematique) for page in pages]
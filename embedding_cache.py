@@ -0,0 +1,109 @@
+#embedding_cache.py
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+
+# Les vecteurs sont stockés en float32, la précision conservée par Pinecone.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    last_used REAL NOT NULL
+)
+"""
+
+def cache_key(model, text):
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+class EmbeddingCache:
+    """
+    Cache SQLite des embeddings, indexé par modèle + SHA-256 du texte du chunk.
+
+    Un chunk dont le texte n'a pas changé depuis un run précédent réutilise
+    son vecteur au lieu d'un nouvel appel à l'API. Quand la taille des
+    vecteurs dépasse max_bytes, les entrées les moins récemment utilisées
+    sont évincées (à la fermeture).
+    """
+
+    def __init__(self, path, max_bytes=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(_SCHEMA)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+
+    def get_many(self, model, texts):
+        """Vecteurs en cache pour chaque texte (None si absent)."""
+        keys = [cache_key(model, text) for text in texts]
+        found = {}
+        with self._lock:
+            # Par paquets : limite du nombre de paramètres d'une requête SQLite
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                self._conn.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?",
+                                       [(now, key) for key in found])
+                self._conn.commit()
+            self.hits += sum(1 for key in keys if key in found)
+            self.misses += sum(1 for key in keys if key not in found)
+        return [array("f", found[key]).tolist() if key in found else None for key in keys]
+
+    def put_many(self, model, texts, vectors):
+        now = time.time()
+        rows = [(cache_key(model, text), model, array("f", vector).tobytes(), now)
+                for text, vector in zip(texts, vectors)]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows)
+            self._conn.commit()
+
+    def size_bytes(self):
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+
+    def evict(self):
+        """Supprime les entrées les moins récemment utilisées au-delà de max_bytes."""
+        if not self.max_bytes:
+            return 0
+        excess = self.size_bytes() - self.max_bytes
+        if excess <= 0:
+            return 0
+        removed = []
+        with self._lock:
+            for key, length in self._conn.execute("SELECT key, LENGTH(vector) FROM embeddings ORDER BY last_used"):
+                if excess <= 0:
+                    break
+                removed.append((key,))
+                excess -= length
+            self._conn.executemany("DELETE FROM embeddings WHERE key = ?", removed)
+            self._conn.commit()
+            self.evicted += len(removed)
+        return len(removed)
+
+    def summary(self):
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups * 100 if lookups else 0.0
+        return (f"{self.hits} succès, {self.misses} échecs ({rate:.1f}% de succès), "
+                f"{self.evicted} entrées évincées")
+
+    def close(self):
+        self.evict()
+        with self._lock:
+            self._conn.close()
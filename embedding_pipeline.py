@@ -1,21 +1,46 @@
 #embedding_pipeline.py
 import os
 import glob
-import re
 import logging
 import sys
-import uuid
+import hashlib
+import json
+import random
 import time
+import multiprocessing
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
 from typing import List, Dict, Any
+from urllib.parse import urlsplit, urlunsplit
 from datetime import datetime, timezone
 from dotenv import load_dotenv
-from bs4 import BeautifulSoup
 from tqdm import tqdm
 
+from enriched_text import load_enriched_sidecar
+from document_loader import load_page_chunks, load_pages_chunks
+from corpus import corpus_exists, iter_corpus_records, load_corpus_index
+from embedding_cache import EmbeddingCache
+from rate_limiter import RateLimiter
+from host_throttle import parse_retry_after
+from config import (EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_MB, VECTOR_MANIFEST_PATH,
+                    EMBEDDING_MAX_TOKENS_PER_REQUEST, EMBEDDING_MAX_ITEMS_PER_REQUEST,
+                    EMBEDDING_WORKERS, EMBEDDING_MAX_RETRIES, OPENAI_REQUESTS_PER_MINUTE, OPENAI_TOKENS_PER_MINUTE,
+                    PINECONE_UPSERT_MAX_BYTES, PINECONE_UPSERT_MAX_VECTORS, PINECONE_UPSERT_WORKERS,
+                    PINECONE_UPSERT_MAX_RETRIES)
+from vector_manifest import load_vector_manifest, save_vector_manifest, manifest_ids, manifest_hashes
+
 # Import for OpenAI embeddings
 from langchain_openai import OpenAIEmbeddings
 from langchain.schema import Document
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+# Compte de tokens local pour grouper les requêtes d'embedding (paquet optionnel
+# "tiktoken", installé avec langchain_openai)
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
 
 # Importation du package officiel pinecone V2
 from pinecone import Pinecone, ServerlessSpec
@@ -35,32 +60,44 @@ PINECONE_INDEX_NAME = os.getenv('PINECONE_INDEX_NAME')
 WEBHOOK_URL = os.getenv('SCRAPER_WEBHOOK_URL', 'https://n8n.altores.app/webhook/api-end-scrapper')
 WEBHOOK_BEARER = os.getenv('SCRAPER_WEBHOOK_BEARER')
 
-if not all([OPENAI_API_KEY, PINECONE_API_KEY, PINECONE_ENV, PINECONE_INDEX_NAME]):
-    logger.error("Une ou plusieurs variables d'environnement sont manquantes. Vérifiez votre fichier .env.")
-    sys.exit(1)
+# Index Pinecone, initialisé au premier appel de get_index et non à l'import :
+# les processus du chargement parallèle (spawn) réimportent ce module
+_index = None
+_index_lock = threading.Lock()
 
-# Initialisation de Pinecone
-pc = Pinecone(api_key=PINECONE_API_KEY)
-
-# Vérifier si l'index existe, sinon le créer
-try:
-    indexes = pc.list_indexes().names()
-    if PINECONE_INDEX_NAME not in indexes:
-        logger.info(f"L'index '{PINECONE_INDEX_NAME}' n'existe pas. Création en cours...")
-        pc.create_index(
-            name=PINECONE_INDEX_NAME,
-            dimension=1536,  # Dimension pour text-embedding-ada-002
-            metric='cosine',
-            spec=ServerlessSpec(cloud="gcp", region=PINECONE_ENV)
-        )
-        logger.info(f"L'index '{PINECONE_INDEX_NAME}' a été créé.")
-    else:
-        logger.info(f"L'index '{PINECONE_INDEX_NAME}' existe déjà.")
-
-    index = pc.Index(PINECONE_INDEX_NAME)
-except Exception as e:
-    logger.error(f"Erreur lors de l'initialisation de Pinecone: {e}")
-    sys.exit(1)
+def get_index():
+    """Index Pinecone PINECONE_INDEX_NAME, créé s'il n'existe pas (arrêt du programme si la configuration manque)."""
+    global _index
+    with _index_lock:
+        if _index is not None:
+            return _index
+        if not all([OPENAI_API_KEY, PINECONE_API_KEY, PINECONE_ENV, PINECONE_INDEX_NAME]):
+            logger.error("Une ou plusieurs variables d'environnement sont manquantes. Vérifiez votre fichier .env.")
+            sys.exit(1)
+        
+        # Initialisation de Pinecone
+        pc = Pinecone(api_key=PINECONE_API_KEY)
+        
+        # Vérifier si l'index existe, sinon le créer
+        try:
+            indexes = pc.list_indexes().names()
+            if PINECONE_INDEX_NAME not in indexes:
+                logger.info(f"L'index '{PINECONE_INDEX_NAME}' n'existe pas. Création en cours...")
+                pc.create_index(
+                    name=PINECONE_INDEX_NAME,
+                    dimension=1536,  # Dimension pour text-embedding-ada-002
+                    metric='cosine',
+                    spec=ServerlessSpec(cloud="gcp", region=PINECONE_ENV)
+                )
+                logger.info(f"L'index '{PINECONE_INDEX_NAME}' a été créé.")
+            else:
+                logger.info(f"L'index '{PINECONE_INDEX_NAME}' existe déjà.")
+            
+            _index = pc.Index(PINECONE_INDEX_NAME)
+        except Exception as e:
+            logger.error(f"Erreur lors de l'initialisation de Pinecone: {e}")
+            sys.exit(1)
+        return _index
 
 
 def send_webhook_report(payload: Dict[str, Any], method: str = "GET") -> None:
@@ -83,6 +120,7 @@ def send_webhook_report(payload: Dict[str, Any], method: str = "GET") -> None:
                 "unique_namespaces": metrics.get("unique_namespaces"),
                 "errors_count": len(payload.get("errors", [])),
                 "duration_seconds": payload.get("duration_seconds"),
+                "peak_rss_mb": metrics.get("peak_rss_mb"),
                 "started_at": payload.get("started_at"),
                 "ended_at": payload.get("ended_at"),
             }
@@ -100,158 +138,107 @@ def send_webhook_report(payload: Dict[str, Any], method: str = "GET") -> None:
     except Exception as e:
         logger.error(f"Erreur lors de l'envoi du webhook: {e}")
 
-def enhanced_html_to_text(html_content, base_url="https://monservicepublic.gouv.mc"):
-    """
-    Convertit HTML en texte enrichi en préservant les liens et la structure.
-    """
-    soup = BeautifulSoup(html_content, "html.parser")
-    
-    # Supprimer les scripts, styles, et autres éléments non pertinents
-    for tag in soup.find_all(['script', 'style', 'meta', 'noscript']):
-        tag.decompose()
-    
-    # Traitement des liens (a href)
-    for a_tag in soup.find_all('a', href=True):
-        href = a_tag.get('href', '')
-        
-        # Convertir les URLs relatives en URLs absolues
-        if href and not href.startswith(('http://', 'https://', 'mailto:', 'tel:')):
-            if href.startswith('/'):
-                href = base_url + href
-            else:
-                href = f"{base_url}/{href}"
-        
-        # Format du texte: Texte du lien [URL]
-        link_text = a_tag.get_text(strip=True)
-        if link_text and href:
-            # Remplacer le contenu du lien par texte + URL entre crochets
-            new_text = f"{link_text} [{href}]"
-            a_tag.string = new_text
-    
-    # Traitement des en-têtes (h1, h2, h3...)
-    for i in range(1, 7):
-        for header in soup.find_all(f'h{i}'):
-            header_text = header.get_text(strip=True)
-            # Ajouter des # pour les en-têtes
-            prefix = '#' * i
-            header.string = f"\n\n{prefix} {header_text}\n\n"
-    
-    # Traitement des paragraphes
-    for p in soup.find_all('p'):
-        p_text = p.get_text(strip=True)
-        if p_text:
-            # Ajouter des sauts de ligne autour des paragraphes
-            p.string = f"\n{p_text}\n"
-    
-    # Traitement des listes
-    for ul in soup.find_all('ul'):
-        for i, li in enumerate(ul.find_all('li', recursive=False)):
-            li_text = li.get_text(strip=True)
-            if li_text:
-                li.string = f"\n- {li_text}"
-    
-    for ol in soup.find_all('ol'):
-        for i, li in enumerate(ol.find_all('li', recursive=False)):
-            li_text = li.get_text(strip=True)
-            if li_text:
-                li.string = f"\n{i+1}. {li_text}"
-    
-    # Obtenir le texte complet avec les espaces préservés
-    text = soup.get_text(separator="\n")
-    
-    # Nettoyer les espaces multiples et les sauts de ligne excessifs
-    text = re.sub(r'\n{3,}', '\n\n', text)
-    text = re.sub(r' {2,}', ' ', text)
-    
-    return text.strip()
-
-def load_and_split_documents(base_folder, fixed_thematique):
+def iter_scraped_pages(base_folder):
     """
-    Parcourt le dossier base_folder pour charger les fichiers scrappés (.txt),
-    convertit le HTML en texte enrichi pour préserver les liens et la structure,
-    déduit le namespace et applique le text splitting.
+    Pages scrappées de base_folder : fichiers .txt puis, s'il existe, corpus
+    JSONL (lu en flux). Produit (html, nom de fichier, groupe, enrichi) ; le
+    groupe est le dossier de la page, None à la racine. enrichi est le texte
+    enrichi produit au scraping ({"url", "title", "text"}), None pour les
+    pages d'un run antérieur : le HTML n'est alors lu que dans ce cas.
     """
-    import config  # pour accéder à config.FIXED_URLS et ANNUAIRE_URL_PATTERNS
     document_paths = glob.glob(os.path.join(base_folder, '**', '*.txt'), recursive=True)
-    documents = []
     
     # Debug: Afficher le nombre total de fichiers trouvés
     logger.info(f"Nombre total de fichiers trouvés: {len(document_paths)}")
     
     for file_path in document_paths:
+        parts = os.path.relpath(file_path, base_folder).split(os.sep)
+        group = parts[0] if len(parts) > 1 else None
+        enriched = load_enriched_sidecar(file_path)
+        if enriched is not None:
+            yield None, os.path.basename(file_path), group, enriched
+            continue
         with open(file_path, 'r', encoding='utf-8') as f:
             html_content = f.read()
-        
-        # Extraire l'URL via BeautifulSoup
-        soup = BeautifulSoup(html_content, "html.parser")
-        url_extracted = soup.title.string.strip() if soup.title and soup.title.string else "unknown"
-        
-        # Utiliser la fonction améliorée pour préserver les liens
-        enriched_text = enhanced_html_to_text(html_content, base_url=url_extracted)
-        
-        # Déduire le namespace à partir du chemin relatif
-        rel_path = os.path.relpath(file_path, base_folder)
-        parts = rel_path.split(os.sep)
-        
-        # Logique améliorée pour le namespace
-        if len(parts) > 1:
-            folder_name = parts[0]
-            # Si c'est dans le dossier "Annuaire", forcer le namespace "child"
-            if folder_name == "Annuaire":
-                namespace = "child"
-            elif folder_name == "general":
-                namespace = "general"
-            else:
-                # Tous les autres dossiers (catégories) vont dans "child"
-                namespace = "child"
-        else:
-            namespace = "general"
-        
-        # Extraire le nom de fichier sans chemin complet
-        filename = os.path.basename(file_path)
-        
-        metadata = {
-            "filename": filename,  # Nom du fichier au lieu du chemin complet
-            "url": url_extracted,
-            "namespace": namespace,
-            "format": "enriched_text"  # Indique que le contenu est du texte enrichi
-        }
-        
-        # Déterminer la thématique
-        # Si c'est l'annuaire, définir une thématique spécifique
-        is_annuaire = any(pattern in url_extracted for pattern in config.ANNUAIRE_URL_PATTERNS)
-        if is_annuaire:
-            metadata["thematique"] = "Annuaire administratif"
-        else:
-            # Vérifier si l'URL extraite figure dans FIXED_URLS pour ajouter la thématique associée
-            fixed_them = None
-            for fixed in config.FIXED_URLS:
-                if url_extracted == fixed["url"]:
-                    fixed_them = fixed["thematique"]
-                    break
-            metadata["thematique"] = fixed_them if fixed_them is not None else fixed_thematique
-        
-        # Debug: Afficher un échantillon du texte enrichi pour le premier document
-        if len(documents) == 0:
-            sample = enriched_text[:500] + "..."
-            logger.info(f"Échantillon du texte enrichi: {sample}")
-        
-        # Découpage du texte en chunks
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=20000,
-            chunk_overlap=5000,
-            separators=["\n\n", "\n", ". ", " ", ""]
-        )
-        
-        chunks = text_splitter.split_text(enriched_text)
-        
-        # Créer des documents pour chaque chunk
-        for i, chunk in enumerate(chunks):
-            chunk_metadata = metadata.copy()
-            chunk_metadata["chunk"] = i  # Ajouter un numéro de chunk
-            chunk_doc = Document(page_content=chunk, metadata=chunk_metadata)
-            documents.append(chunk_doc)
+        yield html_content, os.path.basename(file_path), group, None
+    
+    if corpus_exists(base_folder):
+        logger.info(f"Corpus JSONL trouvé: {len(load_corpus_index(base_folder))} pages")
+        for record in iter_corpus_records(base_folder):
+            yield record["html"], record["filename"], record["group"], record.get("enriched")
+
+# Pages transmises ensemble à un worker du chargement parallèle
+LOADER_CHUNKSIZE = 16
+# Lots de documents en attente d'embedding (file bornée entre chargement et embedding)
+EMBED_QUEUE_DEPTH = 4
+# Requêtes d'upsert en attente ou en cours (vecteurs embeddés gardés en mémoire)
+UPSERT_QUEUE_DEPTH = 16
+
+def _page_batches(pages, size):
+    batch = []
+    for page in pages:
+        batch.append(page)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _bounded_ordered_map(executor, pages, fixed_thematique, max_pending):
+    """Résultats de load_page_chunks dans l'ordre des pages, avec au plus max_pending lots soumis."""
+    pending = deque()
+    for batch in _page_batches(pages, LOADER_CHUNKSIZE):
+        pending.append(executor.submit(load_pages_chunks, batch, fixed_thematique))
+        if len(pending) >= max_pending:
+            yield from pending.popleft().result()
+    while pending:
+        yield from pending.popleft().result()
+
+def iter_documents(base_folder, fixed_thematique, loader_workers=0):
+    """
+    Génère, page après page, les Documents (chunks) des pages scrappées de
+    base_folder : texte enrichi, namespace, thématique, découpage.
+    loader_workers: nombre de processus pour le chargement (0 = séquentiel) ;
+    au plus deux lots de pages par processus sont en cours, et l'ordre des
+    chunks ne dépend pas du nombre de processus.
+    """
+    pages = iter_scraped_pages(base_folder)
+    executor = None
+    if loader_workers > 0:
+        # spawn : des processus neufs plutôt qu'une copie (fork) de celui-ci, qui fait déjà tourner
+        # des threads et tient des connexions ouvertes ; disponible sur tous les systèmes
+        executor = ProcessPoolExecutor(max_workers=loader_workers, mp_context=multiprocessing.get_context("spawn"))
+        logger.info(f"Chargement parallèle dans {loader_workers} processus.")
+        results = _bounded_ordered_map(executor, pages, fixed_thematique, max_pending=2 * loader_workers)
+    else:
+        results = (load_page_chunks(page, fixed_thematique) for page in pages)
     
+    first = True
+    try:
+        for enriched_text, chunk_records in results:
+            # Debug: Afficher un échantillon du texte enrichi pour le premier document
+            if first:
+                sample = enriched_text[:500] + "..."
+                logger.info(f"Échantillon du texte enrichi: {sample}")
+                first = False
+            
+            # Créer des documents pour chaque chunk
+            for chunk, chunk_metadata in chunk_records:
+                yield Document(page_content=chunk, metadata=chunk_metadata)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+def load_and_split_documents(base_folder, fixed_thematique, loader_workers=0):
+    """
+    Parcourt le dossier base_folder pour charger les pages scrappées (.txt ou
+    corpus JSONL) avec leur texte enrichi (liens et structure préservés),
+    déduit le namespace et applique le text splitting. Le texte enrichi est
+    celui produit au scraping ; il n'est recalculé à partir du HTML que pour
+    les pages d'un run antérieur. Renvoie la liste complète des Documents
+    (run_embedding les traite en flux avec iter_documents).
+    """
+    documents = list(iter_documents(base_folder, fixed_thematique, loader_workers))
     logger.info(f"{len(documents)} chunks générés après splitting.")
     return documents
 
@@ -347,23 +334,194 @@ def batch_documents(documents, batch_size=100):
     for i in range(0, len(documents), batch_size):
         yield documents[i:i + batch_size]
 
-def create_pinecone_vectors(docs, embeddings_model):
+def canonical_url(url):
+    """URL normalisée pour les IDs : schéma et hôte en minuscules, sans fragment ni / final."""
+    parts = urlsplit(url.strip())
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, parts.query, ""))
+
+def vector_id_prefix(url):
+    """Préfixe commun aux IDs de tous les vecteurs d'une page."""
+    return hashlib.sha256(canonical_url(url).encode("utf-8")).hexdigest()[:24] + "#"
+
+def vector_id(url, chunk_index, text):
+    """ID stable d'un chunk : préfixe de la page, numéro du chunk et hash du texte."""
+    text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+    return f"{vector_id_prefix(url)}{chunk_index}#{text_hash}"
+
+def metadata_hash(metadata):
+    """Hash des métadonnées d'un chunk : un changement (thématique, titre...) impose de le réinsérer."""
+    return hashlib.sha256(json.dumps(metadata, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+
+def page_key(metadata):
+    """URL identifiant la page d'un chunk (nom du fichier si l'URL est inconnue)."""
+    url = metadata.get("url")
+    return url if url and url != "unknown" else metadata["filename"]
+
+def list_page_vector_ids(index, url, namespace):
+    """IDs des vecteurs d'une page présents dans le namespace (listage par préfixe)."""
+    ids = []
+    for page in index.list(prefix=vector_id_prefix(url), namespace=namespace):
+        ids.extend(page)
+    return ids
+
+def delete_page_vectors(index, url, namespace):
+    """Supprime tous les vecteurs d'une page, sans reconstruire le namespace."""
+    return delete_vector_ids(index, list_page_vector_ids(index, url, namespace), namespace)
+
+def delete_vector_ids(index, ids, namespace):
+    """Supprime une liste d'IDs par lots de 1000 (limite de l'API)."""
+    ids = list(ids)
+    for i in range(0, len(ids), 1000):
+        index.delete(ids=ids[i:i + 1000], namespace=namespace)
+    return len(ids)
+
+# Encodage des modèles d'embeddings OpenAI (ada-002, text-embedding-3-*)
+_token_encoding = None
+
+def count_tokens(text):
+    """
+    Nombre de tokens du texte. Sans tiktoken, estimation à 3 caractères par
+    token (plus prudente que la moyenne observée en français) ; une requête
+    sous-estimée et refusée pour sa taille est redécoupée (voir embed_texts).
+    """
+    global _token_encoding
+    if tiktoken is None:
+        return len(text) // 3 + 1
+    if _token_encoding is None:
+        _token_encoding = tiktoken.get_encoding("cl100k_base")
+    return len(_token_encoding.encode(text, disallowed_special=()))
+
+def token_packs(token_counts, max_tokens=EMBEDDING_MAX_TOKENS_PER_REQUEST,
+                max_items=EMBEDDING_MAX_ITEMS_PER_REQUEST):
+    """
+    Bornes (début, fin) de paquets consécutifs d'au plus max_tokens tokens et
+    max_items éléments ; un élément plus gros que max_tokens forme un paquet à lui seul.
+    Sert aussi aux tailles en octets des requêtes d'upsert (payload_batches).
+    """
+    start, total = 0, 0
+    for i, count in enumerate(token_counts):
+        if i > start and (total + count > max_tokens or i - start >= max_items):
+            yield start, i
+            start, total = i, 0
+        total += count
+    if start < len(token_counts):
+        yield start, len(token_counts)
+
+# Messages d'erreur OpenAI d'une requête refusée pour sa taille
+_REQUEST_TOO_LARGE_HINTS = ("max_tokens_per_request", "tokens per request", "maximum context length",
+                            "too many inputs", "too many tokens", "array too long")
+
+def is_request_too_large(error):
+    """Requête d'embedding refusée pour sa taille (et non pour le rate limiting)."""
+    status = getattr(error, "status_code", None)
+    message = str(error).lower()
+    if status == 429 or "rate limit" in message:
+        return False
+    return status == 413 or any(hint in message for hint in _REQUEST_TOO_LARGE_HINTS)
+
+def is_rate_limited(error):
+    """Requête refusée pour rate limiting (429), hors quota épuisé qu'une pause ne règle pas."""
+    status = getattr(error, "status_code", None)
+    message = str(error).lower()
+    if "insufficient_quota" in message:
+        return False
+    return status == 429 or "rate limit" in message
+
+# Erreurs transitoires du client OpenAI (serveur, réseau, délai dépassé)
+_TRANSIENT_ERROR_NAMES = ("InternalServerError", "APIConnectionError", "APITimeoutError")
+# Pause maximale entre deux tentatives après une erreur transitoire (secondes)
+EMBED_MAX_BACKOFF = 30.0
+
+def is_transient_error(error):
+    """Échec transitoire d'une requête d'embedding (5xx, connexion, timeout) qu'une nouvelle tentative peut régler."""
+    if any(cls.__name__ in _TRANSIENT_ERROR_NAMES for cls in type(error).__mro__):
+        return True
+    status = getattr(error, "status_code", None)
+    return isinstance(status, int) and status >= 500
+
+def _embed_request(embeddings_model, texts, token_counts, stats, limiter=None):
+    """
+    Une requête d'embedding, envoyée quand limiter (RateLimiter optionnel)
+    le permet. Refusée pour rate limiting, elle est relancée après la pause
+    indiquée par les en-têtes de la réponse ; après une erreur transitoire
+    (is_transient_error), avec backoff exponentiel ; refusée pour sa taille,
+    elle est coupée en deux.
+    """
+    attempt = 0
+    while True:
+        if limiter is not None:
+            limiter.acquire(sum(token_counts))
+        stats["embedding_requests"] = stats.get("embedding_requests", 0) + 1
+        try:
+            return embeddings_model.embed_documents(texts)
+        except Exception as e:
+            if limiter is not None and is_rate_limited(e) and attempt < EMBEDDING_MAX_RETRIES:
+                headers = getattr(getattr(e, "response", None), "headers", None)
+                delay = limiter.backoff(headers, attempt)
+                attempt += 1
+                logger.warning(f"Rate limit OpenAI atteint, pause de {delay:.1f}s "
+                               f"(tentative {attempt}/{EMBEDDING_MAX_RETRIES}) : {e}")
+                continue
+            if is_transient_error(e) and attempt < EMBEDDING_MAX_RETRIES:
+                delay = min(EMBED_MAX_BACKOFF, 2.0 ** attempt) * random.uniform(0.5, 1.0)
+                attempt += 1
+                logger.warning(f"Erreur transitoire OpenAI, nouvelle tentative dans {delay:.1f}s "
+                               f"(tentative {attempt}/{EMBEDDING_MAX_RETRIES}) : {e}")
+                time.sleep(delay)
+                continue
+            if len(texts) < 2 or not is_request_too_large(e):
+                raise
+            logger.warning(f"Requête d'embedding de {len(texts)} textes refusée pour sa taille, découpage en deux : {e}")
+            middle = len(texts) // 2
+            return (_embed_request(embeddings_model, texts[:middle], token_counts[:middle], stats, limiter)
+                    + _embed_request(embeddings_model, texts[middle:], token_counts[middle:], stats, limiter))
+
+def embed_texts(embeddings_model, texts, stats=None, limiter=None):
+    """
+    Embeddings des textes, en requêtes groupées selon leur nombre de tokens
+    (EMBEDDING_MAX_TOKENS_PER_REQUEST, EMBEDDING_MAX_ITEMS_PER_REQUEST).
+    stats: dict optionnel où compter les requêtes envoyées ("embedding_requests").
+    limiter: RateLimiter optionnel appliquant les quotas OpenAI.
+    """
+    stats = {} if stats is None else stats
+    token_counts = [count_tokens(text) for text in texts]
+    embeddings = []
+    for start, end in token_packs(token_counts):
+        embeddings.extend(_embed_request(embeddings_model, texts[start:end], token_counts[start:end],
+                                         stats, limiter))
+    return embeddings
+
+def create_pinecone_vectors(docs, embeddings_model, cache=None, stats=None, limiter=None):
     """
     Crée des vecteurs Pinecone à partir de documents et d'un modèle d'embeddings.
     Retourne une liste de tuples (id, vecteur, métadonnées).
+    cache: EmbeddingCache optionnel ; seuls les textes absents du cache sont envoyés à l'API.
+    stats, limiter: comptage des requêtes et quotas OpenAI (voir embed_texts).
     """
     # Extraire le texte et les métadonnées
     texts = [doc.page_content for doc in docs]
     metadatas = [doc.metadata for doc in docs]
     
     # Générer les embeddings
-    embeddings = embeddings_model.embed_documents(texts)
+    if cache is None:
+        embeddings = embed_texts(embeddings_model, texts, stats, limiter)
+    else:
+        model = getattr(embeddings_model, "model", "default")
+        embeddings = cache.get_many(model, texts)
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            computed = embed_texts(embeddings_model, missing_texts, stats, limiter)
+            cache.put_many(model, missing_texts, computed)
+            for i, embedding in zip(missing, computed):
+                embeddings[i] = embedding
     
     # Créer les vecteurs Pinecone
     vectors = []
     for i, (embedding, metadata) in enumerate(zip(embeddings, metadatas)):
-        # Générer un ID unique
-        vec_id = str(uuid.uuid4())
+        # ID déterministe : réinsérer un chunk inchangé écrase son vecteur
+        vec_id = vector_id(page_key(metadata), metadata["chunk"], texts[i])
         
         # Ajouter le contenu du texte aux métadonnées (pour la recherche)
         metadata_copy = metadata.copy()
@@ -374,111 +532,347 @@ def create_pinecone_vectors(docs, embeddings_model):
     
     return vectors
 
-def upsert_to_pinecone(index, vectors, namespace):
+# Taille maximale d'une valeur float sérialisée dans une requête d'upsert
+_FLOAT_PAYLOAD_BYTES = 24
+# Statuts d'un échec d'upsert transitoire
+UPSERT_RETRYABLE_STATUSES = (408, 429, 500, 502, 503, 504)
+# Pause maximale entre deux tentatives d'upsert (secondes)
+UPSERT_MAX_BACKOFF = 30.0
+
+def vector_payload_bytes(vector):
+    """Majorant de la taille d'un vecteur (id, valeurs, métadonnées) sérialisé dans une requête d'upsert."""
+    vec_id, embedding, metadata = vector
+    return len(vec_id) + len(embedding) * _FLOAT_PAYLOAD_BYTES + len(json.dumps(metadata)) + 64
+
+def payload_batches(vectors, max_bytes=PINECONE_UPSERT_MAX_BYTES, max_vectors=PINECONE_UPSERT_MAX_VECTORS):
+    """Découpe les vecteurs en requêtes d'upsert d'au plus max_bytes octets sérialisés et max_vectors vecteurs."""
+    sizes = [vector_payload_bytes(vector) for vector in vectors]
+    return [vectors[start:end] for start, end in token_packs(sizes, max_bytes, max_vectors)]
+
+def _upsert_with_retry(index, batch, namespace):
     """
-    Insère des vecteurs dans Pinecone en utilisant l'API V2.
+    Une requête d'upsert, relancée avec backoff exponentiel (ou Retry-After)
+    en cas d'échec transitoire ; refusée pour sa taille, elle est coupée en
+    deux. Renvoie les IDs des vecteurs qui n'ont pas pu être insérés.
     """
-    # Convertir au format attendu par Pinecone V2
-    pinecone_vectors = []
-    for vec_id, embedding, metadata in vectors:
-        pinecone_vectors.append({
-            "id": vec_id,
-            "values": embedding,
-            "metadata": metadata
-        })
-    
-    # Upsert par lots pour éviter de dépasser les limites
-    batch_size = 200
-    for i in range(0, len(pinecone_vectors), batch_size):
-        batch = pinecone_vectors[i:i + min(batch_size, len(pinecone_vectors) - i)]
+    for attempt in range(PINECONE_UPSERT_MAX_RETRIES + 1):
         try:
             index.upsert(vectors=batch, namespace=namespace)
             logger.info(f"Lot de {len(batch)} vecteurs inséré dans le namespace '{namespace}'")
+            return []
         except Exception as e:
-            logger.error(f"Erreur lors de l'insertion d'un lot dans Pinecone: {e}")
-            # Attendre et réessayer en cas d'erreur de rate limiting
-            if "rate" in str(e).lower():
-                logger.info("Rate limit atteint, pause de 10 secondes...")
-                time.sleep(10)
-                # Réessayer
-                try:
-                    index.upsert(vectors=batch, namespace=namespace)
-                    logger.info(f"Lot de {len(batch)} vecteurs inséré après pause")
-                except Exception as retry_e:
-                    logger.error(f"Échec de l'insertion après pause: {retry_e}")
+            status = getattr(e, "status", None) or getattr(e, "status_code", None)
+            message = str(e).lower()
+            if len(batch) > 1 and (status == 413 or "too large" in message or ("exceeds" in message and "size" in message)):
+                logger.warning(f"Lot de {len(batch)} vecteurs refusé pour sa taille, découpage en deux : {e}")
+                middle = len(batch) // 2
+                return (_upsert_with_retry(index, batch[:middle], namespace)
+                        + _upsert_with_retry(index, batch[middle:], namespace))
+            if status is None:
+                # Erreur réseau (sauf erreur de programmation ou de validation)
+                retryable = not isinstance(e, (TypeError, ValueError, KeyError, AttributeError))
+            else:
+                retryable = status in UPSERT_RETRYABLE_STATUSES
+            if not retryable or attempt == PINECONE_UPSERT_MAX_RETRIES:
+                logger.error(f"Échec de l'insertion d'un lot de {len(batch)} vecteurs dans Pinecone: {e}")
+                return [vector["id"] for vector in batch]
+            headers = getattr(e, "headers", None) or {}
+            delay = (parse_retry_after(headers.get("Retry-After"))
+                     or min(UPSERT_MAX_BACKOFF, 2.0 ** attempt) * random.uniform(0.5, 1.0))
+            logger.warning(f"Erreur lors de l'insertion d'un lot dans Pinecone ({e}), "
+                           f"nouvelle tentative dans {delay:.1f}s ({attempt + 1}/{PINECONE_UPSERT_MAX_RETRIES})")
+            time.sleep(delay)
+
+def upsert_to_pinecone(index, vectors, namespace):
+    """
+    Insère des vecteurs dans Pinecone en utilisant l'API V2, en requêtes
+    dimensionnées par payload_batches (voir _upsert_with_retry pour les relances).
+    Renvoie les IDs des vecteurs qui n'ont pas pu être insérés.
+    """
+    failed_ids = []
+    for batch in payload_batches(vectors):
+        # Convertir au format attendu par Pinecone V2
+        pinecone_vectors = [{"id": vec_id, "values": embedding, "metadata": metadata}
+                            for vec_id, embedding, metadata in batch]
+        failed_ids.extend(_upsert_with_retry(index, pinecone_vectors, namespace))
+    return failed_ids
+
+def peak_rss_mb():
+    """Pic de mémoire résidente du processus (Mo), None si indisponible sur le système."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Octets sous macOS, kilo-octets sous Linux
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
 
-def run_embedding(base_folder, fixed_thematique, skip_cleanup=False):
-    base_folder = os.path.abspath(base_folder)
+def _produce_batches(documents, batches, stop):
+    """
+    Étape de chargement : regroupe les Documents en lots par namespace, d'au
+    plus une requête d'embedding chacun (EMBEDDING_MAX_TOKENS_PER_REQUEST
+    tokens, EMBEDDING_MAX_ITEMS_PER_REQUEST chunks), et les dépose dans la
+    file bornée batches (None en fin de flux, l'exception en cas d'erreur).
+    S'arrête si stop est positionné par le consommateur.
+    """
+    def put(item):
+        while not stop.is_set():
+            try:
+                batches.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    try:
+        pending: Dict[str, list] = {}
+        pending_tokens: Dict[str, int] = {}
+        for doc in documents:
+            ns = doc.metadata["namespace"]
+            tokens = count_tokens(doc.page_content)
+            batch = pending.setdefault(ns, [])
+            if batch and (pending_tokens[ns] + tokens > EMBEDDING_MAX_TOKENS_PER_REQUEST
+                          or len(batch) >= EMBEDDING_MAX_ITEMS_PER_REQUEST):
+                pending[ns] = []
+                if not put((ns, batch)):
+                    return
+                batch = pending[ns]
+            if not batch:
+                pending_tokens[ns] = 0
+            batch.append(doc)
+            pending_tokens[ns] += tokens
+        for ns, batch in pending.items():
+            if batch and not put((ns, batch)):
+                return
+        put(None)
+    except BaseException as e:
+        put(e)
+    finally:
+        # Arrêt anticipé : libérer les processus de chargement
+        documents.close()
+
+def run_embedding(base_folder, fixed_thematique, skip_cleanup=False, loader_workers=0, sync=False):
+    """
+    Pipeline en flux : chargement/découpage -> embedding -> upsert. Le
+    chargement (thread dédié, et processus si loader_workers > 0) dépose des
+    lots de documents dans une file bornée de EMBED_QUEUE_DEPTH lots ;
+    l'embedding des premiers lots commence pendant le chargement des
+    suivants, et la mémoire dépend de la profondeur de la file, pas de la
+    taille du corpus. Un namespace est nettoyé juste avant son premier lot.
+    sync: synchronisation différentielle avec le manifeste local des vecteurs
+    (VECTOR_MANIFEST_PATH) au lieu du nettoyage des namespaces : seuls les
+    chunks nouveaux ou modifiés (texte ou métadonnées) sont insérés, puis les IDs
+    obsolètes sont supprimés en fin de run. Un namespace absent du manifeste
+    est nettoyé une première fois.
+    Renvoie le rapport de fin envoyé au webhook (status "completed_with_errors"
+    si des vecteurs n'ont pas pu être insérés), None si base_folder n'existe pas.
+    """
+    # Résoudre une seule fois le lien vers la génération courante : la lecture
+    # reste cohérente même si une nouvelle génération est publiée entre-temps
+    base_folder = os.path.realpath(base_folder)
     if not os.path.exists(base_folder):
         logger.error(f"Le dossier '{base_folder}' n'existe pas.")
         return
     
+    index = get_index()
     start_time = time.time()
     start_iso = datetime.now(timezone.utc).isoformat()
     errors: List[str] = []
 
     # Compter les pages sources (fichiers scrappés)
     pages_paths = glob.glob(os.path.join(base_folder, '**', '*.txt'), recursive=True)
-    total_pages = len(pages_paths)
+    total_pages = len(pages_paths) + len(load_corpus_index(base_folder))
 
-    logger.info("Chargement et découpage des documents avec conversion HTML->texte enrichi...")
-    documents = load_and_split_documents(base_folder, fixed_thematique)
+    logger.info("Chargement et découpage des documents avec conversion HTML->texte enrichi (en flux)...")
+    batches = queue.Queue(maxsize=EMBED_QUEUE_DEPTH)
+    stop = threading.Event()
+    producer = threading.Thread(
+        target=_produce_batches,
+        args=(iter_documents(base_folder, fixed_thematique, loader_workers), batches, stop),
+        daemon=True,
+    )
+    producer.start()
     
     # Initialiser le modèle d'embeddings
-    embeddings_model = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
+    # (chunk_size : langchain ne redécoupe pas les requêtes déjà groupées par tokens)
+    # (max_retries=0 : rate limiting et erreurs transitoires sont relancés par _embed_request,
+    # les pauses de rate limiting étant partagées via le RateLimiter)
+    embeddings_model = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY, chunk_size=EMBEDDING_MAX_ITEMS_PER_REQUEST,
+                                        max_retries=0)
+    limiter = RateLimiter(OPENAI_REQUESTS_PER_MINUTE, OPENAI_TOKENS_PER_MINUTE)
+    embedding_cache = None
+    if EMBEDDING_CACHE_PATH:
+        embedding_cache = EmbeddingCache(EMBEDDING_CACHE_PATH, max_bytes=EMBEDDING_CACHE_MAX_MB * 1024 * 1024)
     
-    # Regrouper les documents par namespace
-    namespaces = set(doc.metadata["namespace"] for doc in documents)
     per_namespace_stats: Dict[str, Dict[str, int]] = {}
+    embedding_stats: Dict[str, int] = {"embedding_requests": 0}
     total_vectors_upserted = 0
-    for ns in namespaces:
-        docs_in_ns = [doc for doc in documents if doc.metadata["namespace"] == ns]
-        if not docs_in_ns:
-            continue
-        
-        logger.info(f"Traitement du namespace '{ns}' avec {len(docs_in_ns)} documents.")
-        
-        # Vérifier et nettoyer le namespace si nécessaire
-        if not skip_cleanup and namespace_exists(index, ns):
-            logger.info(f"Nettoyage du namespace '{ns}' existant...")
-            delete_namespace_vectors_with_rate_limit(
-                index, 
-                ns, 
-                batch_size=1000,  # Réduire la taille des lots pour éviter le rate limiting
-                delay=1.5  # Augmenter le délai entre les lots
-            )
-        
-        # Traiter les documents par lots
-        logger.info(f"Génération des embeddings et insertion des documents dans le namespace '{ns}'...")
-        batch_size = 20  # Revenu à 20 voir si 50 ? pour respecter la limite OpenAI de 300k tokens
-        total_processed = 0
-        
-        # Traiter par lots pour éviter les limites d'API
-        for batch in batch_documents(docs_in_ns, batch_size):
-            # Créer les vecteurs pour ce lot
-            vectors = create_pinecone_vectors(batch, embeddings_model)
+    total_chunks = 0
+    # Mode sync : manifeste du run précédent et IDs vus pendant ce run
+    previous_manifest = load_vector_manifest(VECTOR_MANIFEST_PATH, PINECONE_INDEX_NAME) if sync else {}
+    previous_ids = {ns: manifest_ids(pages) for ns, pages in previous_manifest.items()}
+    previous_hashes = {ns: manifest_hashes(pages) for ns, pages in previous_manifest.items()}
+    new_manifest: Dict[str, Dict[str, Dict[str, str]]] = {}
+    failed_ids = set()
+    stats_lock = threading.Lock()
+    total_unchanged = 0
+    total_deleted = 0
+    
+    def embed(ns, batch):
+        """Embedding d'un lot (pool d'embedding) ; renvoie (ns, vecteurs, stats)."""
+        stats: Dict[str, int] = {}
+        return ns, create_pinecone_vectors(batch, embeddings_model, embedding_cache, stats, limiter), stats
+    
+    def upsert(ns, vectors):
+        """Upsert d'une requête (pool d'upsert) ; renvoie (ns, taille, IDs en échec, erreur)."""
+        try:
+            return ns, len(vectors), upsert_to_pinecone(index, vectors, ns) or [], None
+        except Exception as e:
+            return ns, len(vectors), [vec_id for vec_id, _, _ in vectors], f"Erreur d'upsert namespace='{ns}': {e}"
+    
+    def collect_embedded(future):
+        """Envoie les vecteurs d'un lot embeddé au pool d'upsert (une erreur d'embedding interrompt le run)."""
+        ns, vectors, stats = future.result()
+        embedding_stats["embedding_requests"] += stats.get("embedding_requests", 0)
+        for request in payload_batches(vectors):
+            upserts_in_flight.add(upsert_workers.submit(upsert, ns, request))
+    
+    def collect_upserted(future):
+        nonlocal total_vectors_upserted
+        ns, size, batch_failed_ids, error = future.result()
+        if batch_failed_ids and not error:
+            # Vecteurs refusés après toutes les relances : absents de l'index
+            error = f"{len(batch_failed_ids)} vecteurs non insérés dans le namespace '{ns}' après relances"
+        if error:
+            logger.error(error)
+        with stats_lock:
+            failed_ids.update(batch_failed_ids)
+            if error:
+                errors.append(error)
+            # Seuls les vecteurs effectivement insérés sont comptés
+            per_namespace_stats[ns]["vectors_upserted"] += size - len(batch_failed_ids)
+            per_namespace_stats[ns]["vectors_failed"] += len(batch_failed_ids)
+            total_vectors_upserted += size - len(batch_failed_ids)
+        logger.info(f"Progression: {per_namespace_stats[ns]['vectors_upserted']} documents traités dans le namespace '{ns}' "
+                    f"({batches.qsize()}/{EMBED_QUEUE_DEPTH} lots en attente)")
+    
+    def drain(max_embeds, max_upserts):
+        """Attend les lots terminés jusqu'à revenir sous les limites d'embeddings et d'upserts en cours."""
+        while len(embeds_in_flight) > max_embeds or len(upserts_in_flight) > max_upserts:
+            done, _ = wait(embeds_in_flight | upserts_in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in embeds_in_flight:
+                    embeds_in_flight.discard(future)
+                    collect_embedded(future)
+                else:
+                    upserts_in_flight.discard(future)
+                    collect_upserted(future)
+    
+    # Deux étages en parallèle : embedding des lots (quotas OpenAI appliqués par
+    # le RateLimiter) et upsert de leurs vecteurs pendant l'embedding des suivants
+    embed_workers = ThreadPoolExecutor(max_workers=EMBEDDING_WORKERS)
+    upsert_workers = ThreadPoolExecutor(max_workers=PINECONE_UPSERT_WORKERS)
+    embeds_in_flight = set()
+    upserts_in_flight = set()
+    try:
+        while True:
+            item = batches.get()
+            if item is None:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            ns, batch = item
             
-            # Insérer dans Pinecone
-            try:
-                upsert_to_pinecone(index, vectors, ns)
-            except Exception as e:
-                msg = f"Erreur d'upsert namespace='{ns}': {e}"
-                logger.error(msg)
-                errors.append(msg)
+            if ns not in per_namespace_stats:
+                logger.info(f"Traitement du namespace '{ns}'.")
+                # Vérifier et nettoyer le namespace si nécessaire, avant son premier lot
+                # (en mode sync, seulement s'il n'est pas encore suivi par le manifeste)
+                if not skip_cleanup and not (sync and ns in previous_manifest) and namespace_exists(index, ns):
+                    logger.info(f"Nettoyage du namespace '{ns}' existant...")
+                    delete_namespace_vectors_with_rate_limit(
+                        index, 
+                        ns, 
+                        batch_size=1000,  # Réduire la taille des lots pour éviter le rate limiting
+                        delay=1.5  # Augmenter le délai entre les lots
+                    )
+                logger.info(f"Génération des embeddings et insertion des documents dans le namespace '{ns}'...")
+                per_namespace_stats[ns] = {"documents_chunks": 0, "vectors_upserted": 0, "vectors_failed": 0}
+            stats = per_namespace_stats[ns]
+            stats["documents_chunks"] += len(batch)
+            total_chunks += len(batch)
             
-            total_processed += len(batch)
-            total_vectors_upserted += len(batch)
-            logger.info(f"Progression: {total_processed}/{len(docs_in_ns)} documents traités")
+            if sync:
+                # Un chunk dont l'ID et le hash des métadonnées figurent déjà dans le manifeste est inchangé
+                known_hashes = previous_hashes.get(ns, {})
+                pages = new_manifest.setdefault(ns, {})
+                to_send = []
+                for doc in batch:
+                    vec_id = vector_id(page_key(doc.metadata), doc.metadata["chunk"], doc.page_content)
+                    digest = metadata_hash(doc.metadata)
+                    pages.setdefault(page_key(doc.metadata), {})[vec_id] = digest
+                    if known_hashes.get(vec_id) != digest:
+                        to_send.append(doc)
+                total_unchanged += len(batch) - len(to_send)
+                batch = to_send
+                if not batch:
+                    continue
             
-            # Petite pause pour éviter rate limiting
-            time.sleep(0.5)
+            # Lots en cours bornés dans les deux étages : la mémoire reste bornée
+            drain(EMBEDDING_WORKERS - 1, UPSERT_QUEUE_DEPTH)
+            embeds_in_flight.add(embed_workers.submit(embed, ns, batch))
         
-        logger.info(f"Total de {total_processed} documents insérés dans le namespace '{ns}'.")
-        per_namespace_stats[ns] = {
-            "documents_chunks": len(docs_in_ns),
-            "vectors_upserted": total_processed,
-        }
+        drain(0, 0)
+    finally:
+        stop.set()
+        for future in embeds_in_flight | upserts_in_flight:
+            future.cancel()
+        embed_workers.shutdown(wait=True)
+        upsert_workers.shutdown(wait=True)
+        producer.join()
+        logger.info(f"Quotas OpenAI : {limiter.summary()}")
+        if embedding_cache is not None:
+            embedding_cache.close()
+            logger.info(f"Cache d'embeddings : {embedding_cache.summary()}")
+    
+    if sync:
+        if total_chunks == 0:
+            # Aucun document chargé (dossier vide ?) : ne rien supprimer sur cette base
+            logger.warning("Aucun chunk chargé : suppression des vecteurs obsolètes ignorée.")
+        else:
+            for ns in set(previous_ids) | set(new_manifest):
+                pages = new_manifest.setdefault(ns, {})
+                known_hashes = previous_hashes.get(ns, {})
+                # Vecteurs en échec : un vecteur déjà présent garde son entrée précédente (il reste
+                # valide et n'est pas supprimé), un nouveau n'est pas mémorisé ; tous deux seront
+                # renvoyés au prochain run
+                for page, ids in pages.items():
+                    pages[page] = {vec_id: known_hashes[vec_id] if vec_id in failed_ids else digest
+                                   for vec_id, digest in ids.items()
+                                   if vec_id not in failed_ids or vec_id in known_hashes}
+                stale_ids = previous_ids.get(ns, set()) - manifest_ids(pages) - failed_ids
+                if not stale_ids:
+                    continue
+                logger.info(f"Suppression de {len(stale_ids)} vecteurs obsolètes du namespace '{ns}'...")
+                try:
+                    total_deleted += delete_vector_ids(index, stale_ids, ns)
+                except Exception as e:
+                    msg = f"Erreur de suppression namespace='{ns}': {e}"
+                    logger.error(msg)
+                    errors.append(msg)
+                    # Gardés dans le manifeste (sans page) : nouvelle tentative au prochain run
+                    pages[""] = dict.fromkeys(sorted(stale_ids))
+            save_vector_manifest(VECTOR_MANIFEST_PATH, PINECONE_INDEX_NAME,
+                                 {ns: pages for ns, pages in new_manifest.items() if pages})
+        logger.info(f"Synchronisation : {total_vectors_upserted} vecteurs insérés, {total_unchanged} inchangés, "
+                    f"{total_deleted} obsolètes supprimés.")
     
+    for ns, stats in per_namespace_stats.items():
+        logger.info(f"Total de {stats['vectors_upserted']} documents insérés dans le namespace '{ns}'.")
+    logger.info(f"{total_chunks} chunks générés après splitting, "
+                f"{embedding_stats['embedding_requests']} requêtes d'embedding envoyées.")
+    peak_rss = peak_rss_mb()
+    if peak_rss is not None:
+        logger.info(f"Pic de mémoire résidente : {peak_rss} Mo")
     logger.info("Traitement des embeddings terminé.")
 
     # Rapport webhook
@@ -490,10 +884,18 @@ def run_embedding(base_folder, fixed_thematique, skip_cleanup=False):
         "pinecone_index": PINECONE_INDEX_NAME,
         "metrics": {
             "pages_scraped": total_pages,
-            "documents_chunks": len(documents),
+            "documents_chunks": total_chunks,
             "vectors_upserted": total_vectors_upserted,
+            "vectors_failed": len(failed_ids),
             "namespaces": per_namespace_stats,
             "unique_namespaces": len(per_namespace_stats),
+            "peak_rss_mb": peak_rss,
+            "embedding_cache_hits": embedding_cache.hits if embedding_cache else 0,
+            "embedding_cache_misses": embedding_cache.misses if embedding_cache else 0,
+            "vectors_unchanged": total_unchanged,
+            "vectors_deleted": total_deleted,
+            "embedding_requests": embedding_stats["embedding_requests"],
+            "embedding_rate_limited": limiter.backoffs,
         },
         "errors": errors,
         "started_at": start_iso,
@@ -502,6 +904,7 @@ def run_embedding(base_folder, fixed_thematique, skip_cleanup=False):
     }
     logger.info(f"Envoi du rapport de fin au webhook: {WEBHOOK_URL}")
     send_webhook_report(payload, method="GET")
+    return payload
 
 if __name__ == "__main__":
     if len(sys.argv) > 2:
@@ -514,4 +917,13 @@ if __name__ == "__main__":
     # Option pour ignorer le nettoyage (utile pour les tests)
     skip_cleanup = "--skip-cleanup" in sys.argv
     
-    run_embedding(base_folder, fixed_thematique, skip_cleanup)
\ No newline at end of file
+    # Option --sync : synchronisation différentielle (manifeste) au lieu du nettoyage des namespaces
+    sync = "--sync" in sys.argv
+    
+    # Option --loader-workers=N : chargement des documents dans N processus
+    loader_workers = 0
+    for arg in sys.argv:
+        if arg.startswith("--loader-workers="):
+            loader_workers = int(arg.split("=", 1)[1])
+    
+    run_embedding(base_folder, fixed_thematique, skip_cleanup, loader_workers, sync)
\ No newline at end of file
@@ -0,0 +1,158 @@
+#enriched_text.py
+import json
+import os
+import re
+
+from bs4 import CData, NavigableString
+
+from html_parsing import parse_html
+
+# Texte enrichi (liens "texte [URL]", titres en #, listes) produit au scraping à
+# partir de l'arbre déjà analysé : l'embedding le lit sans réanalyser le HTML.
+# En mode fichiers, il accompagne chaque page .txt dans un fichier voisin.
+ENRICHED_SUFFIX = ".enriched.json"
+
+def enriched_sidecar_path(page_path):
+    """Fichier du texte enrichi associé à une page .txt."""
+    return page_path[:-len(".txt")] + ENRICHED_SUFFIX if page_path.endswith(".txt") else page_path + ENRICHED_SUFFIX
+
+def load_enriched_sidecar(page_path):
+    """Texte enrichi et métadonnées d'une page .txt, ou None s'il manque ou est plus ancien que la page."""
+    sidecar = enriched_sidecar_path(page_path)
+    try:
+        if os.path.getmtime(sidecar) < os.path.getmtime(page_path):
+            return None
+        with open(sidecar, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def enhanced_html_to_text(html_content, base_url="https://monservicepublic.gouv.mc"):
+    """
+    Convertit HTML en texte enrichi en préservant les liens et la structure.
+    """
+    return soup_to_enriched_text(parse_html(html_content), base_url)
+
+# Balises supprimées avec leur contenu
+_SKIPPED_TAGS = {"script", "style", "meta", "noscript"}
+# Chaînes prises en compte par get_text()
+_TEXT_TYPES = (NavigableString, CData)
+_HEADER_LEVELS = {f"h{i}": i for i in range(1, 7)}
+# Ordre des conversions : liens, titres h1 à h6, paragraphes, puis éléments
+# de listes <ul> et <ol>. Un élément converti devient une seule chaîne, calculée
+# à partir de son contenu où seuls les éléments d'un rang inférieur sont convertis.
+_LINK_RANK, _PARAGRAPH_RANK, _UL_ITEM_RANK, _OL_ITEM_RANK = 0, 7, 8, 9
+_NO_LIMIT = 10
+
+def _rank(tag):
+    """Rang de conversion d'un élément, None s'il n'est pas converti."""
+    name = tag.name
+    if name == "a":
+        return _LINK_RANK if tag.has_attr("href") else None
+    if name == "p":
+        return _PARAGRAPH_RANK
+    if name == "li" and tag.parent is not None:
+        if tag.parent.name == "ul":
+            return _UL_ITEM_RANK
+        if tag.parent.name == "ol":
+            return _OL_ITEM_RANK
+        return None
+    return _HEADER_LEVELS.get(name)
+
+class _Frame:
+    """Élément en cours de parcours : ses enfants restants et la liste où écrire leurs chaînes."""
+    __slots__ = ("children", "limit", "out", "position", "converting")
+
+    def __init__(self, node, limit, out, converting=None):
+        self.children = iter(node.children)
+        self.limit = limit
+        self.out = out
+        self.position = 0
+        # (élément, rang, position, frame parente) si le parcours calcule la conversion de l'élément
+        self.converting = converting
+
+class _EnrichedTextWriter:
+    """
+    Parcours unique du document, chaînes accumulées dans une liste. Le
+    parcours utilise une pile explicite : la profondeur d'imbrication des
+    pages n'est pas limitée par celle de la récursion Python.
+    """
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self._converted = {}  # id(élément) -> chaîne de remplacement (None si non converti)
+
+    def collect(self, node, limit, out):
+        """Ajoute à out les chaînes du contenu de node, éléments de rang < limit convertis."""
+        stack = [_Frame(node, limit, out)]
+        while stack:
+            frame = stack[-1]
+            child = next(frame.children, None)
+            if child is None:
+                stack.pop()
+                if frame.converting is not None:
+                    tag, rank, position, parent = frame.converting
+                    converted = self._finish(tag, rank, position, frame.out)
+                    if converted is not None:
+                        parent.out.append(converted)
+                    else:
+                        # Texte vide : l'élément reste tel quel, parcouru avec la limite du parent
+                        stack.append(_Frame(tag, parent.limit, parent.out))
+                continue
+            if type(child) in _TEXT_TYPES:
+                frame.out.append(child)
+                continue
+            if child.name is None or child.name in _SKIPPED_TAGS:
+                continue
+            if child.name == "li":
+                frame.position += 1
+            rank = _rank(child)
+            if rank is not None and rank < frame.limit:
+                key = id(child)
+                if key not in self._converted:
+                    stack.append(_Frame(child, rank, [], (child, rank, frame.position, frame)))
+                    continue
+                if self._converted[key] is not None:
+                    frame.out.append(self._converted[key])
+                    continue
+            stack.append(_Frame(child, frame.limit, frame.out))
+
+    def _finish(self, tag, rank, position, strings):
+        """Chaîne remplaçant l'élément d'après les chaînes de son contenu, ou None s'il reste tel quel (texte vide)."""
+        # Équivalent de get_text(strip=True) sur l'élément
+        text = "".join(stripped for stripped in (string.strip() for string in strings) if stripped)
+        converted = None
+        if rank == _LINK_RANK:
+            href = tag.get("href", "")
+            # Convertir les URLs relatives en URLs absolues
+            if href and not href.startswith(("http://", "https://", "mailto:", "tel:")):
+                href = self.base_url + href if href.startswith("/") else f"{self.base_url}/{href}"
+            if text and href:
+                converted = f"{text} [{href}]"
+        elif rank < _PARAGRAPH_RANK:
+            converted = f"\n\n{'#' * rank} {text}\n\n"
+        elif text:
+            if rank == _PARAGRAPH_RANK:
+                converted = f"\n{text}\n"
+            elif rank == _UL_ITEM_RANK:
+                converted = f"\n- {text}"
+            else:
+                converted = f"\n{position}. {text}"
+        self._converted[id(tag)] = converted
+        return converted
+
+def soup_to_enriched_text(soup, base_url="https://monservicepublic.gouv.mc"):
+    """
+    Comme enhanced_html_to_text, à partir d'un document déjà analysé (non
+    modifié) : liens "texte [URL]", titres préfixés de #, paragraphes et
+    éléments de listes sur leurs propres lignes, en un seul parcours.
+    """
+    strings = []
+    _EnrichedTextWriter(base_url).collect(soup, _NO_LIMIT, strings)
+    text = "\n".join(strings)
+    
+    # Nettoyer les espaces multiples et les sauts de ligne excessifs
+    text = re.sub(r'\n{3,}', '\n\n', text)
+    text = re.sub(r' {2,}', ' ', text)
+    
+    return text.strip()
@@ -0,0 +1,199 @@
+#host_throttle.py
+import asyncio
+import email.utils
+import threading
+import time
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+import requests
+
+# Statuts indiquant que le serveur nous demande de ralentir
+BACKOFF_STATUSES = (429, 503)
+# Délai Retry-After maximal pris en compte (secondes)
+MAX_RETRY_AFTER = 300.0
+ROBOTS_TIMEOUT = 10.0
+
+def parse_retry_after(value):
+    """Retry-After en secondes (nombre ou date HTTP), ou None."""
+    if not value:
+        return None
+    try:
+        delay = float(value)
+    except ValueError:
+        try:
+            date = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        delay = date.timestamp() - time.time()
+    return min(max(delay, 0.0), MAX_RETRY_AFTER)
+
+class _HostState:
+    def __init__(self, limit):
+        self.limit = float(limit)
+        self.in_flight = 0
+        self.crawl_delay = 0.0
+        self.next_start = 0.0      # Prochain départ autorisé (crawl-delay)
+        self.blocked_until = 0.0   # Pause imposée par Retry-After
+        self.latency = None        # Moyenne glissante de la latence
+        self.baseline = None       # Meilleure latence moyenne observée
+        self.last_decrease = 0.0
+        self.backoffs = 0
+        self.requests = 0
+        self.robots_loaded = False
+        self.robots_lock = threading.Lock()
+
+class HostThrottle:
+    """
+    Contrôle de concurrence adaptatif par hôte (AIMD).
+
+    Le nombre de requêtes simultanées vers un hôte augmente d'environ une
+    unité par "fenêtre" de réponses tant que la latence reste proche de la
+    meilleure latence observée, et il est divisé par deux sur un 429/503 ou
+    une erreur réseau. Retry-After suspend les départs vers l'hôte et le
+    Crawl-delay de robots.txt espace les requêtes.
+
+    Le contrôleur est thread-safe et utilisable depuis plusieurs boucles
+    asyncio : le scraping HTTP et le crawl Playwright de l'annuaire partagent
+    ainsi le même budget.
+    """
+
+    def __init__(self, initial_limit=4, max_limit=32, min_limit=1, latency_factor=2.0, respect_robots=True,
+                 user_agent="*"):
+        self.initial_limit = initial_limit
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.latency_factor = latency_factor
+        self.respect_robots = respect_robots
+        self.user_agent = user_agent
+        self._hosts = {}
+        self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
+
+    def _host(self, url):
+        parsed = urlparse(url)
+        key = f"{parsed.scheme}://{parsed.netloc}"
+        with self._lock:
+            state = self._hosts.get(key)
+            if state is None:
+                state = _HostState(self.initial_limit)
+                self._hosts[key] = state
+        return key, state
+
+    def _ensure_robots(self, key, state):
+        """Lit le Crawl-delay de robots.txt à la première requête vers l'hôte."""
+        if state.robots_loaded:
+            return
+        with state.robots_lock:
+            if state.robots_loaded:
+                return
+            crawl_delay = None
+            if self.respect_robots:
+                try:
+                    response = requests.get(f"{key}/robots.txt", timeout=ROBOTS_TIMEOUT, verify=False)
+                    if response.status_code == 200:
+                        parser = RobotFileParser()
+                        parser.parse(response.text.splitlines())
+                        crawl_delay = parser.crawl_delay(self.user_agent)
+                except Exception as e:
+                    print(f"[AVERT] robots.txt illisible pour {key} : {e}")
+            with self._lock:
+                if crawl_delay:
+                    state.crawl_delay = float(crawl_delay)
+                    print(f"[INFO] Crawl-delay de {crawl_delay}s respecté pour {key}")
+                state.robots_loaded = True
+
+    def _try_acquire(self, state):
+        """Réserve un créneau si possible ; sinon renvoie le temps d'attente conseillé."""
+        now = time.monotonic()
+        wait = max(state.blocked_until, state.next_start) - now
+        if wait > 0:
+            return wait
+        if state.in_flight >= max(int(state.limit), self.min_limit):
+            return None
+        state.in_flight += 1
+        state.requests += 1
+        if state.crawl_delay:
+            state.next_start = now + state.crawl_delay
+        return 0
+
+    def acquire(self, url):
+        """Attend (bloquant) un créneau pour l'hôte de l'URL."""
+        key, state = self._host(url)
+        self._ensure_robots(key, state)
+        with self._condition:
+            while True:
+                wait = self._try_acquire(state)
+                if wait == 0:
+                    return
+                self._condition.wait(timeout=wait)
+
+    async def acquire_async(self, url, poll_interval=0.05):
+        """Équivalent asynchrone d'acquire, sans bloquer la boucle d'événements."""
+        key, state = self._host(url)
+        if not state.robots_loaded:
+            await asyncio.get_running_loop().run_in_executor(None, self._ensure_robots, key, state)
+        while True:
+            with self._lock:
+                wait = self._try_acquire(state)
+            if wait == 0:
+                return
+            await asyncio.sleep(wait if wait is not None else poll_interval)
+
+    def release(self, url, status=None, latency=None, retry_after=None, error=False):
+        """
+        Libère le créneau et ajuste la limite de l'hôte selon la réponse.
+        status: code HTTP (None en cas d'erreur réseau).
+        latency: durée de la requête en secondes.
+        retry_after: valeur brute de l'en-tête Retry-After.
+        """
+        key, state = self._host(url)
+        now = time.monotonic()
+        with self._condition:
+            state.in_flight -= 1
+            if error or status in BACKOFF_STATUSES:
+                # Décroissance multiplicative, une fois par fenêtre de réponses
+                window = max(state.latency or 0.0, 1.0)
+                if now - state.last_decrease >= window:
+                    state.limit = max(self.min_limit, state.limit / 2)
+                    state.last_decrease = now
+                    state.backoffs += 1
+                delay = parse_retry_after(retry_after)
+                if delay:
+                    state.blocked_until = max(state.blocked_until, now + delay)
+            elif latency is not None and status is not None and status < 500:
+                state.latency = latency if state.latency is None else 0.8 * state.latency + 0.2 * latency
+                if state.baseline is None or state.latency < state.baseline:
+                    state.baseline = state.latency
+                # Croissance additive tant que la latence reste saine
+                if state.latency <= self.latency_factor * state.baseline:
+                    state.limit = min(self.max_limit, state.limit + 1 / state.limit)
+            self._condition.notify_all()
+
+    def summary(self):
+        """Une ligne par hôte : limite atteinte, requêtes et ralentissements."""
+        with self._lock:
+            return [
+                f"{key} : concurrence {state.limit:.1f}, {state.requests} requêtes, "
+                f"{state.backoffs} ralentissement(s)"
+                + (f", crawl-delay {state.crawl_delay}s" if state.crawl_delay else "")
+                for key, state in self._hosts.items()
+            ]
+
+_throttle = None
+_throttle_lock = threading.Lock()
+
+def get_host_throttle():
+    """Contrôleur partagé par tout le processus, ou None si désactivé dans config.py."""
+    global _throttle
+    import config
+    if not config.ADAPTIVE_CONCURRENCY:
+        return None
+    with _throttle_lock:
+        if _throttle is None:
+            _throttle = HostThrottle(
+                initial_limit=config.HOST_INITIAL_CONCURRENCY,
+                max_limit=config.HOST_MAX_CONCURRENCY,
+                respect_robots=config.RESPECT_ROBOTS_TXT,
+            )
+    return _throttle
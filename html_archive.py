@@ -0,0 +1,150 @@
+#html_archive.py
+import hashlib
+import json
+import os
+import threading
+import zlib
+from datetime import datetime, timezone
+
+# Compression zstd si le paquet optionnel "zstandard" est installé, zlib sinon.
+# Le codec est enregistré pour chaque contenu : une archive reste lisible
+# quel que soit l'environnement qui l'a produite (zstd requis pour relire du zstd).
+try:
+    import zstandard
+    zstd_available = True
+except ImportError:
+    zstd_available = False
+
+DEFAULT_SHARD_SIZE = 64 * 1024 * 1024
+ZSTD_LEVEL = 3
+
+def compress(body):
+    if zstd_available:
+        return "zstd", zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    return "zlib", zlib.compress(body, 6)
+
+def decompress(codec, frame):
+    if codec == "zstd":
+        if not zstd_available:
+            raise RuntimeError("Archive compressée en zstd : installer le paquet zstandard pour la relire.")
+        return zstandard.ZstdDecompressor().decompress(frame)
+    return zlib.decompress(frame)
+
+def read_blob(archive_dir, location):
+    """Relit un contenu à partir de sa position [shard, offset, longueur, codec]."""
+    shard, offset, length, codec = location
+    with open(os.path.join(archive_dir, shard), "rb") as f:
+        f.seek(offset)
+        return decompress(codec, f.read(length))
+
+class RawArchive:
+    """
+    Archive des réponses HTML brutes, adressée par contenu.
+
+    Chaque corps de réponse est compressé individuellement et ajouté à la fin
+    du shard courant (shard-00000.bin, ...). L'index (index.json) associe
+    l'empreinte SHA-256 d'un contenu à sa position, et chaque URL à
+    l'empreinte de sa dernière version : un contenu identique n'est stocké
+    qu'une fois.
+    """
+
+    def __init__(self, archive_dir, shard_size=DEFAULT_SHARD_SIZE):
+        self.archive_dir = archive_dir
+        self.shard_size = shard_size
+        self.index_path = os.path.join(archive_dir, "index.json")
+        self._lock = threading.Lock()
+        self._blobs = {}
+        self._urls = {}
+        self._shard = None
+        self._shard_file = None
+        self._shard_offset = 0
+        self.added = 0
+        self.deduplicated = 0
+        os.makedirs(archive_dir, exist_ok=True)
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    index = json.load(f)
+                self._blobs = index.get("blobs", {})
+                self._urls = index.get("urls", {})
+            except (OSError, ValueError) as e:
+                print(f"[AVERT] Index de l'archive HTML illisible, archive repartant de zéro : {e}")
+
+    def __len__(self):
+        return len(self._urls)
+
+    def urls(self):
+        return list(self._urls)
+
+    def _shard_names(self):
+        return sorted(name for name in os.listdir(self.archive_dir)
+                      if name.startswith("shard-") and name.endswith(".bin"))
+
+    def _open_shard(self, frame_size):
+        """Prépare le shard dans lequel écrire le prochain contenu (appelé sous verrou)."""
+        if self._shard_file is not None:
+            # Un contenu plus gros qu'un shard occupe un shard à lui seul
+            if self._shard_offset == 0 or self._shard_offset + frame_size <= self.shard_size:
+                return
+            self._shard_file.close()
+            self._shard_file = None
+            name = f"shard-{len(self._shard_names()):05d}.bin"
+        else:
+            # Reprendre le dernier shard du run précédent s'il n'est pas plein
+            names = self._shard_names()
+            if names and os.path.getsize(os.path.join(self.archive_dir, names[-1])) < self.shard_size:
+                name = names[-1]
+            else:
+                name = f"shard-{len(names):05d}.bin"
+        path = os.path.join(self.archive_dir, name)
+        self._shard = name
+        self._shard_offset = os.path.getsize(path) if os.path.exists(path) else 0
+        self._shard_file = open(path, "ab")
+
+    def add(self, url, body):
+        """Archive le corps brut (bytes) d'une réponse 200."""
+        digest = hashlib.sha256(body).hexdigest()
+        fetched_at = datetime.now(timezone.utc).isoformat()
+        with self._lock:
+            if digest in self._blobs:
+                self._urls[url] = {"digest": digest, "fetched_at": fetched_at}
+                self.deduplicated += 1
+                return
+        # Compression hors verrou (coûteuse en CPU)
+        codec, frame = compress(body)
+        with self._lock:
+            if digest not in self._blobs:
+                self._open_shard(len(frame))
+                self._shard_file.write(frame)
+                self._blobs[digest] = [self._shard, self._shard_offset, len(frame), codec]
+                self._shard_offset += len(frame)
+                self.added += 1
+            self._urls[url] = {"digest": digest, "fetched_at": fetched_at}
+
+    def location(self, url):
+        """Position [shard, offset, longueur, codec] du dernier contenu archivé pour l'URL."""
+        entry = self._urls.get(url)
+        return self._blobs.get(entry["digest"]) if entry else None
+
+    def load(self, url):
+        location = self.location(url)
+        return read_blob(self.archive_dir, location) if location else None
+
+    def save(self):
+        """Vide le shard courant sur disque puis écrit l'index de manière atomique."""
+        with self._lock:
+            if self._shard_file is not None:
+                self._shard_file.flush()
+                os.fsync(self._shard_file.fileno())
+            tmp_path = f"{self.index_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"blobs": self._blobs, "urls": self._urls}, f)
+            os.replace(tmp_path, self.index_path)
+
+    def close(self):
+        self.save()
+        with self._lock:
+            if self._shard_file is not None:
+                self._shard_file.close()
+                self._shard_file = None
+                self._shard = None
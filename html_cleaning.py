@@ -0,0 +1,436 @@
+#html_cleaning.py
+import re
+from urllib.parse import urljoin, urlparse
+
+from bs4 import BeautifulSoup
+from bs4.element import Tag, NavigableString, CData
+
+from html_archive import read_blob
+from html_parsing import parse_html, parse_main_only, serialize_compact, extract_title
+from enriched_text import soup_to_enriched_text
+from config import PARTIAL_PARSE, SITE_PROFILES, HTML_SERIALIZATION
+
+# Nettoyage du HTML des pages. Le module n'a aucun effet de bord à l'import :
+# les processus du pool de nettoyage, démarrés à neuf (spawn), l'importent
+# sans charger le scraper (sessions HTTP, module d'annuaire).
+
+# --- Fonctions de nettoyage du HTML ---
+def _is_text(node):
+    """Chaînes prises en compte par get_text() (ni commentaires, ni scripts, ni styles)."""
+    return type(node) in (NavigableString, CData)
+
+def _select_outermost(soup, predicate):
+    """
+    Parcourt l'arbre une seule fois et renvoie les éléments satisfaisant
+    predicate, sans descendre dans ceux déjà retenus (leur sous-arbre
+    disparaîtra avec eux).
+    """
+    selected = []
+    stack = [soup]
+    while stack:
+        for child in stack.pop().children:
+            if isinstance(child, Tag):
+                if predicate(child):
+                    selected.append(child)
+                else:
+                    stack.append(child)
+    return selected
+
+def _subtree_stats(soup):
+    """
+    Calcule en un parcours ascendant, pour chaque élément (clé id()) :
+    [longueur du texte get_text(strip=True), nb de <a>, nb de <span>, nb d'autres tags descendants].
+    """
+    stats = {}
+    # Pré-ordre inversé : chaque nœud est visité après tous ses descendants
+    for node in reversed(list(soup.descendants)):
+        parent_stats = stats.setdefault(id(node.parent), [0, 0, 0, 0])
+        if isinstance(node, Tag):
+            node_stats = stats.setdefault(id(node), [0, 0, 0, 0])
+            for i in range(4):
+                parent_stats[i] += node_stats[i]
+            if node.name == "a":
+                parent_stats[1] += 1
+            if node.name == "span":
+                parent_stats[2] += 1
+            else:
+                parent_stats[3] += 1
+        elif _is_text(node):
+            parent_stats[0] += len(node.strip())
+    return stats
+
+def remove_cookie_banner(soup):
+    cookie_div = soup.find("div", id="cmplz-cookiebanner-container")
+    if cookie_div:
+        cookie_div.decompose()
+
+    for el in soup.find_all(lambda tag: any(
+        (val and "cmplz" in val.lower())
+        for val in tag.attrs.values() if isinstance(val, str)
+    )):
+        el.decompose()
+
+    for btn in soup.find_all("button"):
+        if "gérer le consentement" in btn.get_text(strip=True).lower():
+            btn.decompose()
+
+def remove_footer_shortcodes(soup):
+    FOOTER_KEYWORDS = []  # À compléter si nécessaire
+    for sc in soup.find_all("div", class_="elementor-shortcode"):
+        txt = sc.get_text(strip=True).lower()
+        if any(kw in txt for kw in FOOTER_KEYWORDS):
+            sc.decompose()
+
+    for sec in soup.find_all("section", class_=lambda c: c and "elementor-top-section" in c):
+        txt = sec.get_text(strip=True).lower()
+        if any(kw in txt for kw in FOOTER_KEYWORDS):
+            sec.decompose()
+
+def remove_useless_tags(soup):
+    """
+    Supprime uniquement les éléments vraiment inutiles, 
+    en préservant le contenu interactif et structuré
+    """
+    # Supprimer les scripts, styles et méta
+    for tag in soup(["script", "style", "meta", "noscript", "link"]):
+        tag.decompose()
+    
+    # Supprimer les SVG et iframes (généralement décoratifs)
+    for tag in soup(["svg", "iframe"]):
+        tag.decompose()
+    
+    # Pour les images, vérifier si elles ont un alt text informatif
+    for img in soup.find_all("img"):
+        alt_text = img.get("alt", "").strip()
+        # Garder seulement les images avec un alt text informatif
+        if not alt_text or len(alt_text) < 5:
+            img.decompose()
+    
+    # Analyser headers, footers, nav et aside individuellement
+    for tag_name in ["header", "footer", "nav", "aside"]:
+        for element in soup.find_all(tag_name):
+            # Compter le contenu textuel significatif
+            text_content = element.get_text(strip=True)
+            # Compter les liens utiles (non navigation)
+            useful_links = 0
+            for link in element.find_all("a", href=True):
+                href = link.get("href", "")
+                link_text = link.get_text(strip=True)
+                # Ignorer les liens de navigation typiques
+                if not any(nav_word in link_text.lower() for nav_word in ["accueil", "home", "menu", "connexion", "login", "contact"]):
+                    if len(link_text) > 10:  # Lien avec du texte substantiel
+                        useful_links += 1
+            
+            # Garder si contient du texte substantiel ou des liens utiles
+            if len(text_content) < 100 and useful_links == 0:
+                element.decompose()
+    
+    # Supprimer les éléments vides
+    remove_empty_elements(soup)
+
+def remove_empty_elements(soup):
+    """
+    Supprime les éléments vides qui n'apportent pas de structure.
+    Un seul parcours ascendant suffit : supprimer un élément vide ne change
+    ni le texte ni les images de ses ancêtres.
+    """
+    # Tags qui peuvent être supprimés s'ils sont vides
+    removable_if_empty = {"div", "span", "section", "article", "aside"}
+    # Un élément qui contient un de ces tags n'est jamais considéré vide
+    content_tags = {"img", "input", "button"}
+    
+    non_empty = set()
+    to_remove = []
+    for node in reversed(list(soup.descendants)):
+        if isinstance(node, Tag):
+            has_content = id(node) in non_empty
+            if not has_content and node.name in removable_if_empty:
+                to_remove.append(node)
+            if has_content or node.name in content_tags:
+                non_empty.add(id(node.parent))
+        elif _is_text(node) and node.strip():
+            non_empty.add(id(node.parent))
+    
+    # Ordre ascendant : les descendants sont supprimés avant leurs ancêtres
+    for element in to_remove:
+        element.decompose()
+    
+    # Supprimer les <br> multiples
+    br_tags = soup.find_all("br")
+    for i in range(len(br_tags)-1, 0, -1):
+        if br_tags[i].find_previous_sibling() and br_tags[i].find_previous_sibling().name == "br":
+            br_tags[i].decompose()
+
+def clean_attributes(soup):
+    """
+    Supprime tous les attributs sauf href pour les liens
+    """
+    for tag in soup.find_all(True):
+        if tag.name == "a":
+            # Garder seulement href pour les liens
+            keep = {}
+            if "href" in tag.attrs:
+                keep["href"] = tag.attrs["href"]
+            tag.attrs = keep
+        else:
+            # Supprimer tous les attributs pour les autres tags
+            tag.attrs = {}
+
+def simplify_structure(soup):
+    """
+    Simplifie la structure HTML en supprimant les div imbriqués inutiles
+    et convertit les boutons d'accordéon en titres.
+    Un seul parcours ascendant : quand un élément est traité, ses
+    descendants sont déjà simplifiés.
+    """
+    for node in reversed(list(soup.descendants)):
+        if not isinstance(node, Tag):
+            continue
+        
+        if node.name == "div":
+            # Si le div n'a qu'un seul enfant direct qui est aussi un div
+            children = [child for child in node.children if child.name]
+            if len(children) == 1 and children[0].name == "div":
+                # Remplacer le parent par l'enfant
+                node.replace_with(children[0])
+        
+        # Convertir les buttons avec du texte en simples textes (pour les accordéons)
+        elif node.name == "button" and node.find_parent("button") is None:
+            button_text = node.get_text(strip=True)
+            if button_text:
+                # Rechercher les numéros au début du texte et ajouter un espace
+                button_text = re.sub(r'^(\d+)([A-Za-z])', r'\1 \2', button_text)
+                
+                # Créer un h3 pour les titres d'accordéon
+                new_h3 = soup.new_tag("h3")
+                new_h3.string = button_text
+                node.replace_with(new_h3)
+
+def convert_relative_urls(soup, base_url):
+    for tag in soup.find_all(True):
+        if tag.has_attr("href"):
+            tag['href'] = urljoin(base_url, tag['href'])
+        if tag.has_attr("src"):
+            tag['src'] = urljoin(base_url, tag['src'])
+    return soup
+
+NAV_TAGS = {'nav', 'header', 'footer'}
+NAV_ROLES = {'navigation', 'banner', 'contentinfo'}
+NAV_PATTERNS = [
+    'nav', 'navigation', 'menu', 'header', 'footer', 'sidebar', 'aside',
+    'breadcrumb', 'skip', 'search', 'lang', 'cookie', 'banner'
+]
+
+def is_navigation_element(tag):
+    """Vrai si le tag est un élément de navigation à supprimer du contenu."""
+    if tag.name in NAV_TAGS or tag.get('role') in NAV_ROLES:
+        return True
+    classes = tag.get('class')
+    if classes:
+        if isinstance(classes, str):
+            classes = [classes]
+        class_text = " ".join(classes).lower()
+        if any(pattern in class_text for pattern in NAV_PATTERNS):
+            return True
+    element_id = tag.get('id')
+    if element_id:
+        element_id = str(element_id).lower()
+        if any(pattern in element_id for pattern in NAV_PATTERNS):
+            return True
+    return False
+
+def extract_main_content_only(soup):
+    """
+    Extrait uniquement le contenu principal en supprimant complètement
+    navigation, header, footer et autres éléments non informatifs
+    """
+    # Supprimer en un seul parcours les éléments de navigation
+    # (tags, rôles ARIA, classes/ids typiques)
+    for element in _select_outermost(soup, is_navigation_element):
+        element.decompose()
+    
+    # Chercher le contenu principal dans l'ordre de priorité
+    main_selectors = [
+        'main',
+        '[role="main"]',
+        '.main-content',
+        '.content',
+        '.page-content',
+        'article',
+        '.article-content'
+    ]
+    
+    main_content = None
+    for selector in main_selectors:
+        main_content = soup.select_one(selector)
+        if main_content:
+            break
+    
+    if main_content:
+        return main_content
+    
+    # Si pas de contenu principal identifié, chercher le plus gros bloc de contenu
+    # en excluant les éléments de petite taille
+    content_blocks = []
+    nav_words = ['accueil', 'menu', 'navigation', 'connexion', 'rechercher', 'thematiques', 'actualités', 'evenements']
+    
+    for div in soup.find_all('div'):
+        text = div.get_text(strip=True)
+        if len(text) > 500:  # Seuil minimum de contenu plus élevé
+            # Vérifier que ce n'est pas principalement de la navigation
+            text_lower = text.lower()
+            # Si moins de 3 mots de navigation détectés, c'est probablement du contenu
+            nav_count = sum(1 for word in nav_words if word in text_lower)
+            if nav_count < 3:
+                content_blocks.append((div, len(text)))
+    
+    if content_blocks:
+        # Prendre le bloc avec le plus de contenu
+        content_blocks.sort(key=lambda x: x[1], reverse=True)
+        return content_blocks[0][0]
+    
+    return soup
+
+def remove_breadcrumbs_and_navigation(soup):
+    """
+    Supprime les fils d'Ariane et autres éléments de navigation 
+    qui peuvent rester dans le contenu principal
+    """
+    # Supprimer les listes de navigation (souvent des fils d'Ariane)
+    for ul in soup.find_all('ul'):
+        links = ul.find_all('a')
+        if len(links) >= 3:  # Probable fil d'Ariane si 3+ liens
+            # Vérifier si contient des mots typiques de navigation
+            ul_text = ul.get_text().lower()
+            if any(word in ul_text for word in ['accueil', 'thématiques', 'home']):
+                ul.decompose()
+                continue
+    
+    # Supprimer les éléments avec peu de contenu mais beaucoup de liens
+    # (plus de liens que de contenu = probablement navigation)
+    stats = _subtree_stats(soup)
+    def is_link_block(tag):
+        text_len, links, _, _ = stats.get(id(tag), (0, 0, 0, 0))
+        return tag.name == 'div' and text_len < 200 and links > 2
+    for div in _select_outermost(soup, is_link_block):
+        div.decompose()
+    
+    # Supprimer les divs qui ne contiennent que des spans avec peu de texte
+    stats = _subtree_stats(soup)
+    def is_span_only_label(tag):
+        text_len, _, spans, others = stats.get(id(tag), (0, 0, 0, 0))
+        if tag.name != 'div' or spans == 0 or others > 0 or text_len >= 100:
+            return False
+        text = tag.get_text(strip=True).lower()
+        return any(word in text for word in ['démarche', 'mise à jour', 'transports'])
+    for div in _select_outermost(soup, is_span_only_label):
+        div.decompose()
+
+def parse_page(html, parser=None, partial_parse=None):
+    """
+    Analyse une page avec le parseur configuré. En mode partiel, seul <main>
+    est construit ; repli sur l'analyse complète si la page n'a pas de <main>
+    ou si celui-ci serait lui-même supprimé comme élément de navigation.
+    """
+    if partial_parse is None:
+        partial_parse = PARTIAL_PARSE
+    if partial_parse:
+        soup = parse_main_only(html, parser)
+        if soup is not None and not is_navigation_element(soup.find("main")):
+            return soup
+    return parse_html(html, parser)
+
+def extract_with_site_profile(soup, page_url):
+    """
+    Extraction rapide pour les sites au gabarit connu (config.SITE_PROFILES) :
+    le conteneur principal est pris directement et les éléments parasites
+    connus en sont retirés en une seule requête CSS.
+    Renvoie None si la page ne correspond pas au gabarit.
+    """
+    profile = SITE_PROFILES.get(urlparse(page_url).netloc)
+    if not profile:
+        return None
+    matches = soup.select(profile["content_selector"], limit=2)
+    if len(matches) != 1:
+        return None
+    main_content = matches[0]
+    if len(main_content.get_text(strip=True)) < profile["min_text_length"]:
+        return None
+    for element in main_content.select(", ".join(profile["remove_selectors"])):
+        element.decompose()
+    return main_content
+
+def clean_html_with_stats(html, page_url, parser=None, partial_parse=None):
+    """
+    Comme clean_html_content, mais renvoie (html_nettoyé, fast_path, enrichi)
+    où fast_path indique si le gabarit du site a été reconnu et enrichi est le
+    dict {"url", "title", "text"} du texte enrichi destiné à l'embedding,
+    produit à partir de l'arbre nettoyé sans nouvelle analyse.
+    """
+    soup = parse_page(html, parser, partial_parse)
+    # L'analyse partielle ne construit pas <head> : le titre est alors lu directement
+    page_title = soup.title.get_text(strip=True) if soup.title else extract_title(html)
+    
+    # Gabarit connu : extraction directe, sans les heuristiques génériques
+    main_content = extract_with_site_profile(soup, page_url)
+    fast_path = main_content is not None
+    
+    if not fast_path:
+        # Nettoyages basiques
+        remove_cookie_banner(soup)
+        remove_footer_shortcodes(soup)
+        
+        # NOUVEAU: Extraire uniquement le contenu principal
+        main_content = extract_main_content_only(soup)
+    
+    # Créer un nouveau document avec seulement le contenu principal
+    new_soup = BeautifulSoup("", "html.parser")
+    new_html = new_soup.new_tag("html")
+    new_head = new_soup.new_tag("head")
+    new_title = new_soup.new_tag("title")
+    new_title.string = page_url
+    new_head.append(new_title)
+    new_body = new_soup.new_tag("body")
+    
+    if main_content:
+        # Copier le contenu principal
+        new_body.append(main_content)
+    
+    new_html.append(new_head)
+    new_html.append(new_body)
+    new_soup.append(new_html)
+    
+    # Appliquer les nettoyages sur le nouveau document
+    remove_useless_tags(new_soup)
+    if not fast_path:
+        remove_breadcrumbs_and_navigation(new_soup)  # NOUVEAU: Nettoyage des fils d'Ariane
+    clean_attributes(new_soup)
+    simplify_structure(new_soup)
+    convert_relative_urls(new_soup, page_url)
+
+    if HTML_SERIALIZATION == "compact":
+        minimal_html = serialize_compact(new_soup)
+    else:
+        minimal_html = (
+            "<!DOCTYPE html>\n"
+            f"{new_soup.prettify()}\n"
+        )
+    # Après la sérialisation, qui réduit les espaces : le texte correspond à la page écrite
+    enriched = {"url": page_url, "title": page_title or None, "text": soup_to_enriched_text(new_soup, page_url)}
+    return minimal_html, fast_path, enriched
+
+def clean_html_content(html, page_url, parser=None, partial_parse=None):
+    minimal_html, _, _ = clean_html_with_stats(html, page_url, parser, partial_parse)
+    return minimal_html
+
+def clean_archived_page(archive_dir, location, url):
+    """
+    Tâche du pool de processus du replay : relit le HTML brut archivé et le
+    nettoie. Renvoie (html_nettoyé, fast_path, enrichi, message d'erreur).
+    """
+    try:
+        minimal_html, fast_path, enriched = clean_html_with_stats(read_blob(archive_dir, location), url)
+        return minimal_html, fast_path, enriched, None
+    except Exception as e:
+        # Message lisible même pour une exception sans message
+        return None, False, None, str(e) or type(e).__name__
@@ -0,0 +1,96 @@
+#html_parsing.py
+import html
+import re
+
+from bs4 import BeautifulSoup, NavigableString, SoupStrainer
+
+from config import HTML_PARSER
+
+try:
+    import lxml  # noqa: F401
+    lxml_available = True
+except ImportError:
+    lxml_available = False
+    if HTML_PARSER == "lxml":
+        print("[INFO] lxml non disponible. Utilisation du parseur html.parser (plus lent).")
+
+def resolve_parser(parser=None):
+    """Parseur BeautifulSoup à utiliser (celui de la config par défaut, html.parser si lxml manque)."""
+    parser = parser or HTML_PARSER
+    if parser == "lxml" and not lxml_available:
+        return "html.parser"
+    return parser
+
+def parse_html(html, parser=None, parse_only=None):
+    return BeautifulSoup(html, resolve_parser(parser), parse_only=parse_only)
+
+def parse_main_only(html, parser=None):
+    """
+    Analyse partielle : seul le sous-arbre <main> est construit.
+    Renvoie None si la page n'a pas de <main>.
+    """
+    soup = parse_html(html, parser, parse_only=SoupStrainer("main"))
+    if soup.find("main") is None:
+        return None
+    return soup
+
+# <title> du document, lu sans analyse quand l'analyse partielle ne construit que <main>
+_TITLE = re.compile(r"<title\b[^>]*>(.*?)</title\s*>", re.IGNORECASE | re.DOTALL)
+_TITLE_BYTES = re.compile(_TITLE.pattern.encode("ascii"), re.IGNORECASE | re.DOTALL)
+
+def extract_title(content):
+    """Titre (<title>) d'un document HTML (str ou bytes) sans l'analyser, None s'il est absent ou vide."""
+    if isinstance(content, bytes):
+        match = _TITLE_BYTES.search(content)
+        if match is None:
+            return None
+        try:
+            title = match.group(1).decode("utf-8")
+        except UnicodeDecodeError:
+            title = match.group(1).decode("cp1252", errors="replace")
+    else:
+        match = _TITLE.search(content)
+        if match is None:
+            return None
+        title = match.group(1)
+    return html.unescape(title).strip() or None
+
+# Pages nettoyées en sérialisation compacte : elles commencent toujours ainsi,
+# ce qui permet au chargement de l'embedding de lire le titre (l'URL) sans analyse.
+COMPACT_PREFIX = "<!DOCTYPE html><html><head><title>"
+_WHITESPACE = re.compile(r"\s+")
+_PRESERVE_WHITESPACE = {"pre", "textarea"}
+
+def _collapse_whitespace(match):
+    return "\n" if "\n" in match.group() else " "
+
+def serialize_compact(soup):
+    """
+    Sérialise le document sans l'indentation de prettify() : chaque suite
+    d'espaces d'un texte est réduite à un seul espace (ou saut de ligne),
+    sauf dans <pre> et <textarea>.
+    """
+    # Un seul parcours des descendants (plus rapide que find_all(string=True))
+    texts = []
+    preserve = False
+    for node in soup.descendants:
+        if type(node) is NavigableString:  # ni commentaires ni doctype
+            texts.append(node)
+        elif node.name in _PRESERVE_WHITESPACE:
+            preserve = True
+    for text in texts:
+        if preserve and any(parent.name in _PRESERVE_WHITESPACE for parent in text.parents):
+            continue
+        collapsed = _WHITESPACE.sub(_collapse_whitespace, text)
+        if collapsed != text:
+            text.replace_with(collapsed)
+    return "<!DOCTYPE html>" + soup.decode()
+
+def compact_title(content):
+    """Titre d'une page en sérialisation compacte, None si la page n'est pas compacte."""
+    if not content.startswith(COMPACT_PREFIX):
+        return None
+    end = content.find("</title>", len(COMPACT_PREFIX))
+    if end < 0:
+        return None
+    return html.unescape(content[len(COMPACT_PREFIX):end]).strip()
@@ -0,0 +1,102 @@
+#http_cache.py
+import hashlib
+import json
+import os
+import threading
+
+class ValidatorCache:
+    """
+    Cache disque des validateurs HTTP (ETag / Last-Modified).
+
+    Pour chaque URL on conserve les validateurs de la dernière réponse 200
+    ainsi que le contenu associé (HTML nettoyé pour les pages, XML brut pour
+    les sitemaps), réutilisé tel quel quand le serveur répond 304, et ses
+    métadonnées éventuelles (texte enrichi et titre des pages).
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.bodies_dir = os.path.join(cache_dir, "bodies")
+        self.index_path = os.path.join(cache_dir, "index.json")
+        self._lock = threading.Lock()
+        self._entries = {}
+        self.hits = 0
+        self.stored = 0
+        os.makedirs(self.bodies_dir, exist_ok=True)
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"[AVERT] Index du cache HTTP illisible, cache ignoré : {e}")
+
+    def _body_path(self, url):
+        return os.path.join(self.bodies_dir, hashlib.sha1(url.encode("utf-8")).hexdigest())
+
+    def _metadata_path(self, url):
+        return self._body_path(url) + ".json"
+
+    def request_headers(self, url):
+        """En-têtes conditionnels à envoyer pour cette URL."""
+        entry = self._entries.get(url)
+        headers = {}
+        if entry and os.path.exists(self._body_path(url)):
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(self, url, response_headers, body, metadata=None):
+        """
+        Enregistre les validateurs d'une réponse 200 et le contenu associé
+        (bytes), avec metadata (dict sérialisable en JSON) s'il est fourni.
+        """
+        etag = response_headers.get("ETag")
+        last_modified = response_headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return
+        path = self._body_path(url)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+        metadata_path = self._metadata_path(url)
+        if metadata is not None:
+            tmp_path = f"{metadata_path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(metadata, f, ensure_ascii=False)
+            os.replace(tmp_path, metadata_path)
+        elif os.path.exists(metadata_path):
+            # Métadonnées d'un contenu précédent
+            os.remove(metadata_path)
+        with self._lock:
+            self._entries[url] = {"etag": etag, "last_modified": last_modified}
+            self.stored += 1
+
+    def load(self, url):
+        """Contenu associé à l'URL après une réponse 304, ou None s'il a disparu."""
+        try:
+            with open(self._body_path(url), "rb") as f:
+                body = f.read()
+        except OSError:
+            return None
+        with self._lock:
+            self.hits += 1
+        return body
+
+    def load_metadata(self, url):
+        """Métadonnées enregistrées avec le contenu de l'URL, ou None (absentes ou illisibles)."""
+        try:
+            with open(self._metadata_path(url), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self):
+        """Écrit l'index de manière atomique."""
+        with self._lock:
+            tmp_path = f"{self.index_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self.index_path)
@@ -0,0 +1,18 @@
+#output_files.py
+import os
+
+from enriched_text import ENRICHED_SUFFIX
+
+# Fichiers de suivi écrits par le scraping dans le dossier de sortie, à côté des
+# pages : ils ne comptent pas parmi les fichiers générés
+FAILURE_MANIFEST_FILENAME = ".failed_urls.json"
+CRAWL_STATE_FILENAME = ".crawl_state.json"
+BOOKKEEPING_FILENAMES = (FAILURE_MANIFEST_FILENAME, CRAWL_STATE_FILENAME)
+BOOKKEEPING_SUFFIXES = (ENRICHED_SUFFIX,)
+
+def is_bookkeeping_file(filename):
+    return filename in BOOKKEEPING_FILENAMES or filename.endswith(BOOKKEEPING_SUFFIXES)
+
+def count_output_files(output_folder):
+    """Nombre de fichiers du dossier de sortie, hors fichiers de suivi."""
+    return sum(len([f for f in files if not is_bookkeeping_file(f)]) for _, _, files in os.walk(output_folder))
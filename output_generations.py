@@ -0,0 +1,132 @@
+#output_generations.py
+import os
+import shutil
+from datetime import datetime, timezone
+
+# Les générations d'un dossier de sortie "output" sont rangées dans
+# "output.generations/gen-<horodatage>" ; "output" est un lien symbolique vers
+# la génération courante, remplacé atomiquement quand un scraping réussit.
+GENERATIONS_SUFFIX = ".generations"
+GENERATION_PREFIX = "gen-"
+# Marqueur "output.generations/.gen-<horodatage>.building" d'une génération en
+# cours d'écriture, retiré à sa publication
+BUILDING_SUFFIX = ".building"
+
+def generations_root(output_folder):
+    return os.path.abspath(output_folder) + GENERATIONS_SUFFIX
+
+def current_generation(output_folder):
+    """Chemin de la génération courante, ou None si le dossier n'est pas géré par générations."""
+    if os.path.islink(output_folder):
+        return os.path.realpath(output_folder)
+    return None
+
+def list_generations(output_folder):
+    """Générations existantes, de la plus ancienne à la plus récente."""
+    root = generations_root(output_folder)
+    if not os.path.isdir(root):
+        return []
+    return [os.path.join(root, name) for name in sorted(os.listdir(root)) if name.startswith(GENERATION_PREFIX)]
+
+def _new_generation_path(output_folder):
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    return os.path.join(generations_root(output_folder), f"{GENERATION_PREFIX}{stamp}")
+
+def _building_marker(generation_dir):
+    return os.path.join(os.path.dirname(generation_dir), f".{os.path.basename(generation_dir)}{BUILDING_SUFFIX}")
+
+def is_building(generation_dir):
+    """Génération en cours d'écriture par un scraping (non encore publiée ni abandonnée)."""
+    return os.path.exists(_building_marker(generation_dir))
+
+def _point_to(output_folder, generation_dir):
+    """Remplace atomiquement le lien output_folder par un lien vers generation_dir."""
+    output_path = os.path.abspath(output_folder)
+    tmp_link = f"{output_path}.tmp-link"
+    if os.path.lexists(tmp_link):
+        os.remove(tmp_link)
+    os.symlink(os.path.relpath(generation_dir, os.path.dirname(output_path)), tmp_link)
+    os.replace(tmp_link, output_path)
+
+def _clone_with_hardlinks(source, destination):
+    """Copie l'arborescence en liens physiques (copie classique si le système ne les permet pas)."""
+    for dirpath, _, filenames in os.walk(source):
+        target_dir = os.path.join(destination, os.path.relpath(dirpath, source))
+        os.makedirs(target_dir, exist_ok=True)
+        for filename in filenames:
+            src = os.path.join(dirpath, filename)
+            dst = os.path.join(target_dir, filename)
+            try:
+                os.link(src, dst)
+            except OSError:
+                shutil.copy2(src, dst)
+
+def begin_generation(output_folder, clone=False):
+    """
+    Crée la génération dans laquelle écrire le prochain scraping.
+    clone: partir du contenu de la génération courante (liens physiques),
+    pour les runs incrémentaux ; sinon la génération est vide.
+    Un dossier de sortie classique existant devient la première génération.
+    """
+    os.makedirs(generations_root(output_folder), exist_ok=True)
+    if os.path.isdir(output_folder) and not os.path.islink(output_folder):
+        legacy = _new_generation_path(output_folder)
+        os.rename(output_folder, legacy)
+        _point_to(output_folder, legacy)
+        print(f"[INFO] Dossier de sortie existant converti en génération : {legacy}")
+
+    generation_dir = _new_generation_path(output_folder)
+    with open(_building_marker(generation_dir), "w"):
+        pass
+    current = current_generation(output_folder)
+    if clone and current is not None and os.path.isdir(current):
+        _clone_with_hardlinks(current, generation_dir)
+    else:
+        os.makedirs(generation_dir)
+    return generation_dir
+
+def promote_generation(output_folder, generation_dir, keep=3):
+    """Publie la génération (échange atomique du lien) puis ne garde que les keep précédentes."""
+    _point_to(output_folder, generation_dir)
+    _remove_marker(generation_dir)
+    print(f"[INFO] Génération publiée : {output_folder} -> {generation_dir}")
+    prune_generations(output_folder, keep)
+
+def discard_generation(generation_dir):
+    """Supprime une génération abandonnée (scraping en échec) avant sa publication."""
+    shutil.rmtree(generation_dir, ignore_errors=True)
+    _remove_marker(generation_dir)
+
+def _remove_marker(generation_dir):
+    try:
+        os.remove(_building_marker(generation_dir))
+    except FileNotFoundError:
+        pass
+
+def prune_generations(output_folder, keep):
+    """
+    Supprime les générations plus anciennes que les keep précédant la
+    courante. Celles plus récentes qu'elle et celles encore en cours
+    d'écriture (scrapings concurrents) ne sont jamais supprimées.
+    """
+    current = current_generation(output_folder)
+    generations = [os.path.realpath(generation) for generation in list_generations(output_folder)]
+    if current not in generations:
+        return
+    position = generations.index(current)
+    for generation in generations[:max(0, position - keep)]:
+        if is_building(generation):
+            continue
+        shutil.rmtree(generation, ignore_errors=True)
+
+def rollback_generation(output_folder):
+    """Republie la génération précédant la génération courante."""
+    current = current_generation(output_folder)
+    generations = [os.path.realpath(generation) for generation in list_generations(output_folder)]
+    if current not in generations or generations.index(current) == 0:
+        print(f"[ERREUR] Aucune génération précédente pour {output_folder}")
+        return None
+    previous = generations[generations.index(current) - 1]
+    _point_to(output_folder, previous)
+    print(f"[INFO] Retour à la génération précédente : {output_folder} -> {previous}")
+    return previous
@@ -0,0 +1,135 @@
+#rate_limiter.py
+import random
+import re
+import threading
+import time
+
+from host_throttle import parse_retry_after
+
+# Pause maximale après un refus pour rate limiting (secondes)
+MAX_BACKOFF = 60.0
+# Rafale autorisée, en secondes de quota : les API appliquent souvent leurs
+# quotas par minute sur des fenêtres plus courtes
+BURST_SECONDS = 1.0
+# Durées des en-têtes x-ratelimit-reset-* d'OpenAI : "1s", "6m0s", "59.6ms"
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+def parse_reset_duration(value):
+    """Durée d'un en-tête x-ratelimit-reset-* en secondes, ou None."""
+    if not value:
+        return None
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+def _header_number(headers, name):
+    try:
+        return float(headers.get(name))
+    except (TypeError, ValueError):
+        return None
+
+class _Bucket:
+    """
+    Seau à jetons rempli en continu au débit per_minute, jusqu'à BURST_SECONDS
+    de quota. Une dépense plus grosse que le seau l'attend plein puis le met
+    en négatif : le débit moyen reste celui du quota.
+    """
+
+    def __init__(self, per_minute):
+        self.set_rate(per_minute)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def set_rate(self, per_minute):
+        self.per_minute = float(per_minute)
+        self.capacity = self.per_minute * BURST_SECONDS / 60.0
+
+    def refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.per_minute / 60.0)
+        self.updated = now
+
+    def wait_for(self, amount):
+        """Temps avant de pouvoir dépenser amount jetons (0 si possible)."""
+        return max(0.0, (min(amount, self.capacity) - self.level) * 60.0 / self.per_minute)
+
+class RateLimiter:
+    """
+    Quotas d'une API par minute (requêtes et tokens), partagés par les
+    threads qui l'appellent.
+
+    Chaque requête réserve un jeton "requête" et autant de jetons "token"
+    qu'elle en consomme, et attend que les deux seaux les contiennent. Un refus
+    pour rate limiting suspend tous les départs selon les en-têtes de la
+    réponse (retry-after, x-ratelimit-reset-*), ou à défaut par backoff
+    exponentiel, et ramène les quotas aux limites annoncées par l'API
+    (x-ratelimit-limit-*) si elles sont plus basses que la configuration.
+    """
+
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self._requests = _Bucket(requests_per_minute)
+        self._tokens = _Bucket(tokens_per_minute)
+        self._condition = threading.Condition()
+        self.blocked_until = 0.0
+        self.acquired = 0
+        self.backoffs = 0
+        self.waited = 0.0
+
+    def acquire(self, tokens):
+        """Attend (bloquant) de pouvoir envoyer une requête de tokens tokens."""
+        started = time.monotonic()
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                self._requests.refill(now)
+                self._tokens.refill(now)
+                wait = max(self.blocked_until - now, self._requests.wait_for(1.0), self._tokens.wait_for(tokens))
+                if wait <= 0:
+                    self._requests.level -= 1.0
+                    self._tokens.level -= tokens
+                    self.acquired += 1
+                    self.waited += now - started
+                    return
+                self._condition.wait(timeout=wait)
+
+    def backoff(self, headers=None, attempt=0):
+        """
+        Suspend les départs après un refus pour rate limiting et renvoie la
+        pause appliquée (secondes). headers: en-têtes de la réponse refusée.
+        """
+        headers = headers or {}
+        delay = None
+        retry_after_ms = _header_number(headers, "retry-after-ms")
+        if retry_after_ms is not None:
+            delay = retry_after_ms / 1000.0
+        if delay is None:
+            delay = parse_retry_after(headers.get("retry-after"))
+        if delay is None:
+            # Réinitialisation du quota épuisé
+            resets = [parse_reset_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+                      for kind in ("requests", "tokens")
+                      if _header_number(headers, f"x-ratelimit-remaining-{kind}") == 0]
+            resets = [reset for reset in resets if reset is not None]
+            delay = max(resets) if resets else None
+        if delay is None:
+            delay = min(MAX_BACKOFF, 2.0 ** attempt) * random.uniform(0.5, 1.0)
+        delay = min(delay, MAX_BACKOFF)
+        with self._condition:
+            now = time.monotonic()
+            for bucket, kind in ((self._requests, "requests"), (self._tokens, "tokens")):
+                limit = _header_number(headers, f"x-ratelimit-limit-{kind}")
+                if limit and limit < bucket.per_minute:
+                    bucket.set_rate(limit)
+                bucket.refill(now)
+                bucket.level = min(bucket.level, 0.0)
+            self.blocked_until = max(self.blocked_until, now + delay)
+            self.backoffs += 1
+            self._condition.notify_all()
+        return delay
+
+    def summary(self):
+        with self._condition:
+            return (f"{self.acquired} requêtes, {self.backoffs} refus pour rate limiting, "
+                    f"{self.waited:.1f}s d'attente cumulée (quotas {self._requests.per_minute:.0f} req/min, "
+                    f"{self._tokens.per_minute:.0f} tokens/min)")
@@ -1,23 +1,34 @@
 #run.py
 import argparse
-from upsert import run_upsert
-from embedding_pipeline import run_embedding
+from corpus import corpus_exists, load_corpus_index
+from output_files import count_output_files
 import os
 import time
 
-def run_full_process(sitemaps, output_folder, thematique, workers, skip_scraping, skip_embedding):
+def run_full_process(sitemaps, output_folder, thematique, workers, skip_scraping, skip_embedding,
+                     async_fetch=False, max_in_flight=32, http_cache_dir=None, incremental=False,
+                     cleaning_workers=0, retry_failed=False, archive_dir=None, replay=False,
+                     corpus_format=None, loader_workers=0, sync=False):
     start_time = time.time()
     
     if not skip_scraping:
+        # Imports différés : les processus démarrés par spawn réimportent ce script,
+        # sans avoir besoin du scraper ni de Pinecone
+        from upsert import run_upsert
         print("[INFO] Début du scraping...")
-        run_upsert(sitemaps, output_folder, workers=workers)
+        run_upsert(sitemaps, output_folder, workers=workers,
+                   async_fetch=async_fetch, max_in_flight=max_in_flight,
+                   http_cache_dir=http_cache_dir, incremental=incremental,
+                   cleaning_workers=cleaning_workers, retry_failed=retry_failed,
+                   archive_dir=archive_dir, replay=replay, corpus_format=corpus_format)
         print("[INFO] Scraping terminé.")
     else:
         print("[INFO] Scraping ignoré (--skip-scraping activé).")
     
     if not skip_embedding:
+        from embedding_pipeline import run_embedding
         print("[INFO] Début de l'embedding et vectorisation...")
-        run_embedding(output_folder, thematique)
+        run_embedding(output_folder, thematique, loader_workers=loader_workers, sync=sync)
         print("[INFO] Embedding terminé.")
     else:
         print("[INFO] Embedding ignoré (--skip-embedding activé).")
@@ -30,16 +41,19 @@ def run_full_process(sitemaps, output_folder, thematique, workers, skip_scraping
     
     # Compter les fichiers générés
     if os.path.exists(output_folder):
-        file_count = sum([len(files) for _, _, files in os.walk(output_folder)])
+        # Sans les fichiers de suivi (texte enrichi, échecs, état du crawl)
+        file_count = count_output_files(output_folder)
         dir_count = sum([len(dirs) for _, dirs, _ in os.walk(output_folder)]) - 1  # -1 pour ne pas compter le dossier racine
         print(f"Dossiers créés: {dir_count}")
         print(f"Fichiers générés: {file_count}")
+        if corpus_exists(output_folder):
+            print(f"Pages du corpus JSONL: {len(load_corpus_index(output_folder))}")
     
     print("="*50)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Pipeline complet de scraping et d'embedding.")
-    parser.add_argument("--sitemaps", "-s", nargs="+", required=True,
+    parser.add_argument("--sitemaps", "-s", nargs="+",
                         help="Liste de liens ou chemins vers des sitemaps XML.")
     parser.add_argument("--output", "-o", required=True,
                         help="Dossier de base pour sauvegarder les pages scrappées.")
@@ -47,11 +61,37 @@ if __name__ == "__main__":
                         help="Nom de la thématique à associer aux URL fixes (namespace 'general').")
     parser.add_argument("--workers", "-w", type=int, default=4,
                         help="Nombre de workers pour le scraping parallèle.")
+    parser.add_argument("--cleaning-workers", type=int, default=0,
+                        help="Nombre de processus dédiés au nettoyage HTML (0 = nettoyage dans les threads).")
+    parser.add_argument("--loader-workers", type=int, default=0,
+                        help="Nombre de processus pour le chargement et le découpage des documents avant l'embedding (0 = séquentiel).")
+    parser.add_argument("--sync", action="store_true",
+                        help="Embedding différentiel : n'insérer que les chunks nouveaux ou modifiés et supprimer les vecteurs obsolètes, sans vider les namespaces.")
+    parser.add_argument("--async-fetch", action="store_true",
+                        help="Télécharger les pages via un pool de connexions asynchrone (httpx).")
+    parser.add_argument("--max-in-flight", type=int, default=32,
+                        help="Nombre maximal de requêtes simultanées en mode asynchrone.")
+    parser.add_argument("--http-cache-dir", default=None,
+                        help="Dossier du cache ETag/Last-Modified (requêtes conditionnelles). Désactivé si absent.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Ne scraper que les URLs nouvelles ou dont le <lastmod> a changé depuis le run précédent.")
+    parser.add_argument("--retry-failed", action="store_true",
+                        help="Ne relancer que les URLs en échec du run précédent (manifeste du dossier de sortie).")
+    parser.add_argument("--archive-dir", default=None,
+                        help="Dossier de l'archive compressée du HTML brut (alimentée pendant le scraping).")
+    parser.add_argument("--replay", action="store_true",
+                        help="Renettoyer le HTML de l'archive (--archive-dir) sans accès réseau, au lieu de scraper.")
+    parser.add_argument("--corpus-format", choices=["files", "jsonl"], default=None,
+                        help="Format des pages : un .txt par page ou corpus JSONL compressé (défaut : config.py).")
     parser.add_argument("--skip-scraping", action="store_true",
                         help="Ignorer la phase de scraping.")
     parser.add_argument("--skip-embedding", action="store_true",
                         help="Ignorer la phase d'embedding.")
     args = parser.parse_args()
+    if args.replay and not args.archive_dir:
+        parser.error("--replay nécessite --archive-dir")
+    if not args.sitemaps and not (args.retry_failed or args.replay or args.skip_scraping):
+        parser.error("--sitemaps est requis (sauf avec --retry-failed, --replay ou --skip-scraping)")
 
     run_full_process(
         sitemaps=args.sitemaps,
@@ -59,5 +99,16 @@ if __name__ == "__main__":
         thematique=args.thematique,
         workers=args.workers,
         skip_scraping=args.skip_scraping,
-        skip_embedding=args.skip_embedding
+        skip_embedding=args.skip_embedding,
+        async_fetch=args.async_fetch,
+        max_in_flight=args.max_in_flight,
+        http_cache_dir=args.http_cache_dir,
+        incremental=args.incremental,
+        cleaning_workers=args.cleaning_workers,
+        retry_failed=args.retry_failed,
+        archive_dir=args.archive_dir,
+        replay=args.replay,
+        corpus_format=args.corpus_format,
+        loader_workers=args.loader_workers,
+        sync=args.sync
     )
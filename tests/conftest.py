@@ -0,0 +1,35 @@
+import os
+import sys
+
+import pytest
+
+# Modules à plat à la racine du dépôt
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+PAGES = os.path.join(FIXTURES, "pages")
+GOLDEN = os.path.join(FIXTURES, "golden")
+
+# URL de scraping de chaque page de test (le domaine décide du gabarit de site)
+PAGE_URLS = {
+    "elementor": "https://www.example.mc/logement/aides-jeunes",
+    "article_sidebar": "https://www.example.mc/education/allocation-rentree",
+    "largest_block": "https://www.example.mc/etat-civil/naissance",
+    "role_main": "https://www.example.mc/residence/carte",
+    "service_public_profile": "https://monservicepublic.gouv.mc/transports/permis",
+}
+
+def read_page(name):
+    with open(os.path.join(PAGES, f"{name}.html"), "r", encoding="utf-8") as f:
+        return f.read()
+
+def read_golden(kind, name, extension):
+    with open(os.path.join(GOLDEN, kind, f"{name}.{extension}"), "r", encoding="utf-8") as f:
+        return f.read()
+
+@pytest.fixture(params=sorted(PAGE_URLS))
+def page(request):
+    """(nom, URL, HTML) de chaque page de test."""
+    return request.param, PAGE_URLS[request.param], read_page(request.param)
@@ -0,0 +1,48 @@
+# Conversion en texte enrichi d'origine (plusieurs passes find_all modifiant
+# l'arbre, puis get_text) : référence des tests d'équivalence et du benchmark
+# de enriched_text.soup_to_enriched_text.
+import re
+
+def reference_soup_to_enriched_text(soup, base_url="https://monservicepublic.gouv.mc"):
+    """Texte enrichi calculé par l'implémentation d'origine (soup est modifié)."""
+    for tag in soup.find_all(['script', 'style', 'meta', 'noscript']):
+        tag.decompose()
+    
+    for a_tag in soup.find_all('a', href=True):
+        href = a_tag.get('href', '')
+        if href and not href.startswith(('http://', 'https://', 'mailto:', 'tel:')):
+            if href.startswith('/'):
+                href = base_url + href
+            else:
+                href = f"{base_url}/{href}"
+        link_text = a_tag.get_text(strip=True)
+        if link_text and href:
+            a_tag.string = f"{link_text} [{href}]"
+    
+    for i in range(1, 7):
+        for header in soup.find_all(f'h{i}'):
+            header_text = header.get_text(strip=True)
+            prefix = '#' * i
+            header.string = f"\n\n{prefix} {header_text}\n\n"
+    
+    for p in soup.find_all('p'):
+        p_text = p.get_text(strip=True)
+        if p_text:
+            p.string = f"\n{p_text}\n"
+    
+    for ul in soup.find_all('ul'):
+        for i, li in enumerate(ul.find_all('li', recursive=False)):
+            li_text = li.get_text(strip=True)
+            if li_text:
+                li.string = f"\n- {li_text}"
+    
+    for ol in soup.find_all('ol'):
+        for i, li in enumerate(ol.find_all('li', recursive=False)):
+            li_text = li.get_text(strip=True)
+            if li_text:
+                li.string = f"\n{i+1}. {li_text}"
+    
+    text = soup.get_text(separator="\n")
+    text = re.sub(r'\n{3,}', '\n\n', text)
+    text = re.sub(r' {2,}', ' ', text)
+    return text.strip()
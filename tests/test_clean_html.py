@@ -0,0 +1,45 @@
+from bs4 import BeautifulSoup
+
+import html_cleaning
+from conftest import read_golden
+
+def test_clean_html_content_matches_golden(page, monkeypatch):
+    """Sortie de clean_html_content figée sur les pages de test (lxml, sérialisation compacte)."""
+    name, url, html = page
+    monkeypatch.setattr(html_cleaning, "HTML_SERIALIZATION", "compact")
+    assert html_cleaning.clean_html_content(html, url, parser="lxml") == read_golden("clean", name, "html")
+
+def test_remove_empty_elements_single_pass():
+    soup = BeautifulSoup(
+        "<body><div><section><span> </span><div></div></section></div>"
+        "<div><span><img src='a.png'></span></div><p></p><br><br><br></body>",
+        "html.parser",
+    )
+    html_cleaning.remove_empty_elements(soup)
+    # Les conteneurs imbriqués vides disparaissent en un seul appel ; une image garde ses ancêtres
+    assert str(soup) == '<body><div><span><img src="a.png"/></span></div><p></p><br/></body>'
+
+def test_simplify_structure_collapses_div_chains_and_buttons():
+    soup = BeautifulSoup(
+        "<body><div><div><div><p>texte</p></div></div></div><button>2Conditions</button></body>",
+        "html.parser",
+    )
+    html_cleaning.simplify_structure(soup)
+    assert str(soup) == "<body><div><p>texte</p></div><h3>2 Conditions</h3></body>"
+
+def test_extract_main_content_only_drops_navigation():
+    soup = BeautifulSoup(
+        "<body><header>h</header><div class='sidebar'>s</div><div id='search-box'>r</div>"
+        "<div role='navigation'>n</div><main><p>contenu</p><nav>fil</nav></main></body>",
+        "html.parser",
+    )
+    main = html_cleaning.extract_main_content_only(soup)
+    assert str(main) == "<main><p>contenu</p></main>"
+
+def test_deeply_nested_markup():
+    """Imbrication très profonde (balisage Elementor/Tailwind) : nettoyage sans récursion ni coût quadratique."""
+    depth = 1500
+    html = "<html><body><main>" + "<div>" * depth + "<p>Texte au fond de la page.</p>" + "</div>" * depth + "</main></body></html>"
+    cleaned = html_cleaning.clean_html_content(html, "https://www.example.mc/profond", parser="html.parser")
+    assert "<p>Texte au fond de la page.</p>" in cleaned
+    assert cleaned.count("<div>") <= 1
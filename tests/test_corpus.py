@@ -0,0 +1,40 @@
+import os
+
+from corpus import CorpusWriter, corpus_dir, iter_corpus_records, load_corpus_index
+
+
+def _shards(output):
+    return [name for name in os.listdir(corpus_dir(output)) if name.startswith("shard-")]
+
+
+def test_save_after_removing_every_page(tmp_path):
+    output = str(tmp_path / "output")
+    corpus = CorpusWriter(output)
+    corpus.add("https://www.example.mc/a", "pages", "<p>a</p>")
+    corpus.add("https://www.example.mc/b", "pages", "<p>b</p>")
+    corpus.save()
+
+    corpus = CorpusWriter(output)
+    assert corpus.remove("https://www.example.mc/a")
+    assert corpus.remove("https://www.example.mc/b")
+    corpus.save()
+
+    assert load_corpus_index(output) == {}
+    assert _shards(output) == []
+
+
+def test_compaction_keeps_live_records(tmp_path):
+    output = str(tmp_path / "output")
+    corpus = CorpusWriter(output)
+    for i in range(4):
+        corpus.add(f"https://www.example.mc/{i}", "pages", f"<p>{i}</p>" * 50)
+    corpus.save()
+
+    corpus = CorpusWriter(output)
+    for i in range(3):
+        corpus.remove(f"https://www.example.mc/{i}")
+    corpus.save()
+
+    records = list(iter_corpus_records(output))
+    assert [record["url"] for record in records] == ["https://www.example.mc/3"]
+    assert records[0]["html"] == "<p>3</p>" * 50
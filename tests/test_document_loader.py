@@ -0,0 +1,43 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import ROOT
+
+# Script lancé comme le serait run.py : les processus du chargement parallèle
+# (spawn) réimportent ce script principal, donc embedding_pipeline
+LOADER_SCRIPT = """
+import sys
+import embedding_pipeline
+
+if __name__ == "__main__":
+    documents = list(embedding_pipeline.iter_documents(sys.argv[1], "default", loader_workers=2))
+    print(len(documents), sorted({doc.metadata["url"] for doc in documents}))
+"""
+
+PAGE = ("<html><head><title>https://www.example.mc/{name}</title></head>"
+        "<body><main><p>Contenu de la page {name}.</p></main></body></html>")
+
+
+def test_spawned_loader_without_pinecone_configuration(tmp_path):
+    for module in ("dotenv", "langchain", "langchain_openai", "langchain_text_splitters", "pinecone", "tqdm"):
+        pytest.importorskip(module)
+    folder = tmp_path / "output" / "general"
+    folder.mkdir(parents=True)
+    for name in ("a", "b", "c"):
+        (folder / f"{name}.txt").write_text(PAGE.format(name=name), encoding="utf-8")
+    script = tmp_path / "loader_script.py"
+    script.write_text(LOADER_SCRIPT, encoding="utf-8")
+    env = {key: value for key, value in os.environ.items()
+           if key not in ("OPENAI_API_KEY", "PINECONE_API_KEY", "PINECONE_ENV", "PINECONE_INDEX_NAME")}
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(ROOT), env.get("PYTHONPATH")]))
+
+    # Dossier de travail sans .env : aucune configuration Pinecone disponible
+    result = subprocess.run([sys.executable, str(script), str(tmp_path / "output")], cwd=tmp_path, env=env,
+                            capture_output=True, text=True, timeout=120)
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split("\n")[0] == ("3 ['https://www.example.mc/a', 'https://www.example.mc/b', "
+                                            "'https://www.example.mc/c']")
@@ -0,0 +1,112 @@
+import pytest
+
+for module in ("dotenv", "langchain", "langchain_openai", "langchain_text_splitters", "pinecone", "tqdm"):
+    pytest.importorskip(module)
+
+import embedding_pipeline
+
+PAGE = ("<html><head><title>https://www.example.mc/{name}</title></head>"
+        "<body><main><p>Contenu de la page {name}.</p></main></body></html>")
+
+
+class FakeEmbeddings:
+    def __init__(self, **kwargs):
+        pass
+
+    def embed_documents(self, texts):
+        return [[0.1, 0.2, 0.3] for _ in texts]
+
+
+class UpsertError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class RejectingIndex:
+    """Index acceptant un vecteur par requête et refusant ceux des URLs rejected."""
+
+    def __init__(self, rejected):
+        self.rejected = rejected
+        self.vectors = {}
+
+    def upsert(self, vectors, namespace):
+        if len(vectors) > 1:
+            raise UpsertError(413, "Request too large")
+        vector = vectors[0]
+        if vector["metadata"]["url"] in self.rejected:
+            raise UpsertError(400, f"Vecteur refusé : {vector['id']}")
+        self.vectors[(namespace, vector["id"])] = vector
+
+    def delete(self, ids, namespace):
+        for vec_id in ids:
+            self.vectors.pop((namespace, vec_id), None)
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    folder = tmp_path / "output" / "general"
+    folder.mkdir(parents=True)
+    for name in ("a", "b", "c"):
+        (folder / f"{name}.txt").write_text(PAGE.format(name=name), encoding="utf-8")
+    index = RejectingIndex({"https://www.example.mc/b"})
+    reports = []
+    monkeypatch.setattr(embedding_pipeline, "get_index", lambda: index)
+    monkeypatch.setattr(embedding_pipeline, "OpenAIEmbeddings", FakeEmbeddings)
+    monkeypatch.setattr(embedding_pipeline, "EMBEDDING_CACHE_PATH", None)
+    monkeypatch.setattr(embedding_pipeline, "VECTOR_MANIFEST_PATH", str(tmp_path / "vector_manifest.json"))
+    monkeypatch.setattr(embedding_pipeline, "PINECONE_INDEX_NAME", "test-index")
+    monkeypatch.setattr(embedding_pipeline, "send_webhook_report", lambda payload, method="GET": reports.append(payload))
+    return str(tmp_path / "output"), index, reports
+
+
+def test_rejected_vectors_are_not_counted_as_upserted(pipeline):
+    folder, index, reports = pipeline
+
+    report = embedding_pipeline.run_embedding(folder, "default", skip_cleanup=True)
+
+    assert reports == [report]
+    assert len(index.vectors) == 2
+    assert report["status"] == "completed_with_errors"
+    assert report["metrics"]["vectors_upserted"] == 2
+    assert report["metrics"]["vectors_failed"] == 1
+    assert report["metrics"]["namespaces"]["general"] == {"documents_chunks": 3, "vectors_upserted": 2,
+                                                          "vectors_failed": 1}
+    assert len(report["errors"]) == 1 and "1 vecteurs non insérés" in report["errors"][0]
+
+
+def test_all_vectors_upserted_reports_success(pipeline):
+    folder, index, reports = pipeline
+    index.rejected = set()
+
+    report = embedding_pipeline.run_embedding(folder, "default", skip_cleanup=True)
+
+    assert report["status"] == "success"
+    assert report["metrics"]["vectors_upserted"] == 3
+    assert report["metrics"]["vectors_failed"] == 0
+    assert report["errors"] == []
+
+
+def test_sync_keeps_existing_vector_when_metadata_update_fails(pipeline):
+    folder, index, reports = pipeline
+    index.rejected = set()
+    embedding_pipeline.run_embedding(folder, "default", skip_cleanup=True, sync=True)
+    assert len(index.vectors) == 3
+
+    # Nouvelle thématique (métadonnées seules) : la mise à jour de la page b échoue
+    index.rejected = {"https://www.example.mc/b"}
+    report = embedding_pipeline.run_embedding(folder, "autre", skip_cleanup=True, sync=True)
+
+    assert report["metrics"]["vectors_upserted"] == 2
+    assert report["metrics"]["vectors_deleted"] == 0
+    thematiques = {vector["metadata"]["url"]: vector["metadata"]["thematique"] for vector in index.vectors.values()}
+    assert thematiques == {"https://www.example.mc/a": "autre", "https://www.example.mc/b": "default",
+                           "https://www.example.mc/c": "autre"}
+
+    # Le run suivant renvoie la page b, toujours marquée avec son ancien hash
+    index.rejected = set()
+    report = embedding_pipeline.run_embedding(folder, "autre", skip_cleanup=True, sync=True)
+
+    assert report["metrics"]["vectors_upserted"] == 1
+    assert report["metrics"]["vectors_unchanged"] == 2
+    assert {vector["metadata"]["thematique"] for vector in index.vectors.values()} == {"autre"}
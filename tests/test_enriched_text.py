@@ -0,0 +1,89 @@
+import random
+
+import pytest
+
+from enriched_text import enhanced_html_to_text, soup_to_enriched_text
+from enriched_text_reference import reference_soup_to_enriched_text
+from html_parsing import parse_html
+from conftest import read_golden
+
+PARSERS = ["lxml", "html.parser"]
+
+def reference(html, base_url, parser):
+    return reference_soup_to_enriched_text(parse_html(html, parser), base_url)
+
+def test_cleaned_pages_match_golden(page):
+    """Texte enrichi des pages nettoyées, figé d'après l'implémentation d'origine."""
+    name, url, _ = page
+    cleaned = read_golden("clean", name, "html")
+    assert enhanced_html_to_text(cleaned, url) == read_golden("enriched", name, "txt")
+
+@pytest.mark.parametrize("parser", PARSERS)
+def test_raw_pages_match_reference(page, parser):
+    name, url, html = page
+    assert soup_to_enriched_text(parse_html(html, parser), url) == reference(html, url, parser)
+
+def test_soup_is_not_modified(page):
+    _, url, html = page
+    soup = parse_html(html)
+    before = str(soup)
+    soup_to_enriched_text(soup, url)
+    assert str(soup) == before
+
+EDGE_CASES = [
+    # Lien dans un titre, titre dans un lien, liens sans texte ou sans href
+    '<h2>Voir <a href="/aide">l\'aide</a></h2><a href="/x"><h3>Titre</h3></a><a href="/vide"> </a><a>ancre</a>',
+    # URLs relatives, absolues, mailto et tel
+    '<p><a href="page.html">a</a> <a href="https://ex.org/b">b</a> <a href="mailto:x@y.mc">c</a> <a href="tel:+377">d</a></p>',
+    # Listes imbriquées, <li> hors liste, paragraphes dans les éléments
+    '<ol><li>un<ul><li>a</li><li><p>b</p></li></ul></li><li></li><li>trois</li></ol><div><li>orphelin</li></div>',
+    # Paragraphes vides, scripts et styles dans le contenu, commentaires
+    '<p></p><p>  </p><p>texte<script>var x = 1;</script><!-- note --></p><style>p{}</style><noscript>js</noscript>',
+    # Titres vides et imbriqués, espaces multiples
+    '<h1></h1><h1>A <h2>B</h2></h1><p>x     y</p>\n\n\n\n<p>z</p>',
+    # Tableaux et texte hors balises
+    'avant<table><tr><td><a href="/t">cellule</a></td><td><p>p</p></td></tr></table>après',
+]
+
+@pytest.mark.parametrize("parser", PARSERS)
+@pytest.mark.parametrize("html", EDGE_CASES)
+def test_edge_cases_match_reference(html, parser):
+    url = "https://www.example.mc"
+    assert soup_to_enriched_text(parse_html(html, parser), url) == reference(html, url, parser)
+
+_TAGS = ["div", "span", "p", "a", "h1", "h2", "h3", "h4", "h5", "h6", "ul", "ol", "li", "strong", "em",
+         "section", "table", "td", "script", "style", "br"]
+_WORDS = ["logement", "aide", " ", "  ", "\n", "Monaco", "démarche", "", "formulaire  en ligne"]
+
+def random_html(rng, depth=0):
+    parts = []
+    for _ in range(rng.randint(0, 4 if depth < 5 else 1)):
+        if rng.random() < 0.4 or depth >= 7:
+            parts.append(rng.choice(_WORDS))
+            continue
+        tag = rng.choice(_TAGS)
+        if tag == "br":
+            parts.append("<br>")
+            continue
+        attrs = ""
+        if tag == "a" and rng.random() < 0.8:
+            attrs = f' href="{rng.choice(["/x", "y.html", "https://ex.org", "mailto:a@b.mc", ""])}"'
+        parts.append(f"<{tag}{attrs}>{random_html(rng, depth + 1)}</{tag}>")
+    return "".join(parts)
+
+@pytest.mark.parametrize("parser", PARSERS)
+def test_random_documents_match_reference(parser):
+    rng = random.Random(2024)
+    for _ in range(300):
+        html = f"<html><body>{random_html(rng)}</body></html>"
+        url = "https://monservicepublic.gouv.mc"
+        assert soup_to_enriched_text(parse_html(html, parser), url) == reference(html, url, parser), html
+
+@pytest.mark.parametrize("parser", PARSERS)
+def test_deeply_nested_page(parser):
+    """Pages imbriquées sur plus de niveaux que la limite de récursion de Python."""
+    depth = 1200
+    html = ("<html><body>" + "<div><span>" * depth + '<p>Au fond : <a href="/fond">lien</a></p>'
+            + "</span></div>" * depth + "</body></html>")
+    text = soup_to_enriched_text(parse_html(html, parser), "https://www.example.mc")
+    assert text == "Au fond :lien [https://www.example.mc/fond]"
@@ -0,0 +1,48 @@
+import pytest
+
+import html_cleaning
+from html_parsing import extract_title, parse_html, parse_main_only, resolve_parser
+from conftest import read_golden
+
+# Les goldens "html_parser" sont la sortie de clean_html_content avec le parseur
+# d'origine (html.parser, sérialisation prettify)
+
+@pytest.mark.parametrize("parser", ["html.parser", "lxml"])
+def test_full_parse_matches_html_parser_golden(page, parser, monkeypatch):
+    name, url, html = page
+    monkeypatch.setattr(html_cleaning, "HTML_SERIALIZATION", "pretty")
+    assert html_cleaning.clean_html_content(html, url, parser=parser) == read_golden("html_parser", name, "html")
+
+def test_partial_parse_matches_html_parser_golden(page, monkeypatch):
+    """Analyse limitée à <main> (repli sur l'analyse complète sans <main>)."""
+    name, url, html = page
+    monkeypatch.setattr(html_cleaning, "HTML_SERIALIZATION", "pretty")
+    assert (html_cleaning.clean_html_content(html, url, parser="lxml", partial_parse=True)
+            == read_golden("html_parser", name, "html"))
+
+def test_parse_main_only():
+    soup = parse_main_only("<html><body><nav>n</nav><main><p>contenu</p></main><footer>f</footer></body></html>")
+    assert soup is not None
+    assert soup.get_text() == "contenu"
+    assert parse_main_only("<html><body><div>pas de main</div></body></html>") is None
+
+def test_resolve_parser_defaults():
+    assert resolve_parser("html.parser") == "html.parser"
+    assert resolve_parser() in ("lxml", "html.parser")
+    assert parse_html("<p>x</p>").p.string == "x"
+
+def test_partial_parse_keeps_page_title(page):
+    """L'analyse limitée à <main> ne construit pas <head> : le titre de la page est conservé quand même."""
+    name, url, html = page
+    _, _, full = html_cleaning.clean_html_with_stats(html, url, parser="lxml", partial_parse=False)
+    _, _, partial = html_cleaning.clean_html_with_stats(html, url, parser="lxml", partial_parse=True)
+    _, _, from_bytes = html_cleaning.clean_html_with_stats(html.encode("utf-8"), url, parser="lxml",
+                                                           partial_parse=True)
+    assert full["title"]
+    assert partial["title"] == full["title"]
+    assert from_bytes["title"] == full["title"]
+
+def test_extract_title():
+    assert extract_title("<html><head><TITLE lang='fr'>\n Démarches &amp; aides </title></head></html>") == "Démarches & aides"
+    assert extract_title("<title>Carte de résident</title>".encode("utf-8")) == "Carte de résident"
+    assert extract_title("<html><body><main>sans titre</main></body></html>") is None
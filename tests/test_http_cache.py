@@ -0,0 +1,47 @@
+import json
+import os
+
+import upsert
+from enriched_text import enriched_sidecar_path
+from http_cache import ValidatorCache
+
+URL = "https://www.example.mc/article"
+HTML = ("<html><head><title>Titre de l'article</title></head>"
+        "<body><main><h1>Article</h1><p>Contenu de l'article.</p></main></body></html>")
+
+
+def test_metadata_stored_with_body(tmp_path):
+    cache = ValidatorCache(str(tmp_path / "cache"))
+    cache.store(URL, {"ETag": '"v1"'}, b"<p>v1</p>", metadata={"title": "Titre"})
+
+    assert cache.load(URL) == b"<p>v1</p>"
+    assert cache.load_metadata(URL) == {"title": "Titre"}
+
+    # Nouveau contenu sans métadonnées : celles du précédent ne sont pas réutilisées
+    cache.store(URL, {"ETag": '"v2"'}, b"<p>v2</p>")
+    assert cache.load_metadata(URL) is None
+
+
+def test_not_modified_page_keeps_enriched_title(tmp_path, monkeypatch):
+    cache = ValidatorCache(str(tmp_path / "cache"))
+    responses = []
+
+    def fake_fetch_page(url, headers=None):
+        responses.append(headers)
+        if headers and headers.get("If-None-Match") == '"v1"':
+            return 304, b"", {}
+        return 200, HTML.encode("utf-8"), {"ETag": '"v1"'}
+
+    monkeypatch.setattr(upsert, "fetch_page", fake_fetch_page)
+    sidecars = []
+    for run in ("200", "304"):
+        folder = str(tmp_path / run / "general")
+        upsert.process_single_url(URL, folder, silent=True, http_cache=cache)
+        page_path = os.path.join(folder, upsert.sanitize_url(URL) + ".txt")
+        with open(enriched_sidecar_path(page_path), encoding="utf-8") as f:
+            sidecars.append(json.load(f))
+
+    assert responses == [{}, {"If-None-Match": '"v1"'}]
+    assert cache.hits == 1
+    assert sidecars[0]["title"] == "Titre de l'article"
+    assert sidecars[1] == sidecars[0]
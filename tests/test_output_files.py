@@ -0,0 +1,13 @@
+import upsert
+from output_files import count_output_files
+
+
+def test_bookkeeping_files_not_counted(tmp_path):
+    folder = tmp_path / "general"
+    folder.mkdir()
+    (folder / "page.txt").write_text("<main></main>", encoding="utf-8")
+    (folder / "page.enriched.json").write_text("{}", encoding="utf-8")
+    (tmp_path / upsert.FAILURE_MANIFEST_FILENAME).write_text("[]", encoding="utf-8")
+    (tmp_path / upsert.CRAWL_STATE_FILENAME).write_text("{}", encoding="utf-8")
+
+    assert count_output_files(str(tmp_path)) == 1
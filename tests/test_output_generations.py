@@ -0,0 +1,60 @@
+import os
+
+from output_generations import (begin_generation, current_generation, discard_generation, is_building,
+                                list_generations, promote_generation, rollback_generation)
+
+
+def _write(generation, name, text):
+    with open(os.path.join(generation, name), "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def test_promote_keeps_newer_generation_of_overlapping_job(tmp_path):
+    output = str(tmp_path / "output")
+    first = begin_generation(output)
+    second = begin_generation(output)
+    _write(second, "page.txt", "en cours")
+
+    promote_generation(output, first, keep=0)
+
+    assert current_generation(output) == os.path.realpath(first)
+    assert os.path.isfile(os.path.join(second, "page.txt"))
+    assert is_building(second)
+    assert not is_building(first)
+
+
+def test_prune_skips_older_generation_still_building(tmp_path):
+    output = str(tmp_path / "output")
+    slow = begin_generation(output)
+    for _ in range(3):
+        promote_generation(output, begin_generation(output), keep=1)
+
+    generations = list_generations(output)
+    assert slow in generations
+    assert len(generations) == 3  # slow, la précédente gardée, la courante
+
+    promote_generation(output, slow, keep=1)
+    assert current_generation(output) == os.path.realpath(slow)
+
+
+def test_prune_keeps_previous_generations_for_rollback(tmp_path):
+    output = str(tmp_path / "output")
+    published = []
+    for _ in range(4):
+        generation = begin_generation(output)
+        promote_generation(output, generation, keep=2)
+        published.append(generation)
+
+    assert list_generations(output) == published[1:]
+    assert rollback_generation(output) == os.path.realpath(published[2])
+
+
+def test_discard_generation_removes_directory_and_marker(tmp_path):
+    output = str(tmp_path / "output")
+    generation = begin_generation(output)
+
+    discard_generation(generation)
+
+    assert not os.path.exists(generation)
+    assert not is_building(generation)
+    assert os.listdir(tmp_path / "output.generations") == []
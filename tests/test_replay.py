@@ -0,0 +1,33 @@
+import json
+import os
+
+import upsert
+from conftest import PAGE_URLS, read_page
+from enriched_text import enriched_sidecar_path
+from html_archive import RawArchive
+from html_cleaning import clean_html_with_stats
+
+# URLs classées dans une catégorie des sitemaps (config.PRIMARY_PATTERNS)
+CATEGORY = "https://monservicepublic.gouv.mc/thematiques/transports-et-mobilite"
+
+
+def test_replay_in_spawned_cleaning_processes(tmp_path):
+    """Le pool de nettoyage (spawn) produit les mêmes pages que le nettoyage dans le processus courant."""
+    archive = RawArchive(str(tmp_path / "archive"))
+    pages = {f"{CATEGORY}/{name}": read_page(name) for name in sorted(PAGE_URLS)}
+    for url, html in pages.items():
+        archive.add(url, html.encode("utf-8"))
+    archive.save()
+    output = str(tmp_path / "output")
+
+    assert upsert.replay_archive(str(tmp_path / "archive"), output, cleaning_workers=2,
+                                 corpus_format="files") == len(pages)
+
+    for url, html in pages.items():
+        minimal_html, _, enriched = clean_html_with_stats(html, url)
+        folder = os.path.join(output, upsert.determine_group(url))
+        path = os.path.join(folder, upsert.sanitize_url(url) + ".txt")
+        with open(path, encoding="utf-8") as f:
+            assert f.read() == minimal_html
+        with open(enriched_sidecar_path(path), encoding="utf-8") as f:
+            assert json.load(f) == dict(enriched, group=os.path.basename(folder))
@@ -0,0 +1,24 @@
+import json
+
+from vector_manifest import load_vector_manifest, manifest_hashes, manifest_ids, save_vector_manifest
+
+
+def test_manifest_round_trip_keeps_other_indexes(tmp_path):
+    path = str(tmp_path / "vector_manifest.json")
+    save_vector_manifest(path, "autre", {"general": {"https://www.example.mc/": {"id-0": "h0"}}})
+    manifest = {"child": {"https://www.example.mc/a": {"id-1": "h1", "id-2": "h2"}}}
+
+    save_vector_manifest(path, "idx", manifest)
+
+    assert load_vector_manifest(path, "idx") == manifest
+    assert load_vector_manifest(path, "autre") == {"general": {"https://www.example.mc/": {"id-0": "h0"}}}
+
+
+def test_legacy_manifest_lists_have_unknown_hashes(tmp_path):
+    path = tmp_path / "vector_manifest.json"
+    path.write_text(json.dumps({"idx": {"child": {"https://www.example.mc/a": ["id-1", "id-2"]}}}))
+
+    pages = load_vector_manifest(str(path), "idx")["child"]
+
+    assert manifest_ids(pages) == {"id-1", "id-2"}
+    assert manifest_hashes(pages) == {"id-1": None, "id-2": None}
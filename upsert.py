@@ -1,311 +1,62 @@
 #upsert.py
 import requests
-from bs4 import BeautifulSoup
 import urllib3
 import re
 import os
-from concurrent.futures import ThreadPoolExecutor
-from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 import xml.etree.ElementTree as ET
 import shutil
+import multiprocessing
 from tqdm import tqdm
 import sys
 import io
+import json
+import threading
+import queue
+import random
+import time
+from datetime import datetime, timezone
+
+from http_cache import ValidatorCache
+from html_archive import RawArchive
+from corpus import CorpusWriter, corpus_exists, load_corpus_index
+from output_generations import begin_generation, discard_generation, promote_generation, rollback_generation
+from html_parsing import parse_html
+from html_cleaning import clean_html_with_stats, clean_archived_page
+from enriched_text import enriched_sidecar_path, soup_to_enriched_text
+from output_files import FAILURE_MANIFEST_FILENAME, CRAWL_STATE_FILENAME
+from url_classifier import get_classifier
+from host_throttle import get_host_throttle
 
 # Importation de la configuration centralisée
-from config import PRIMARY_PATTERNS, FIXED_URLS, BASE_DOMAIN, PARENT_NAMESPACE, ANNUAIRE_URL_PATTERNS
+from config import PRIMARY_PATTERNS, FIXED_URLS, BASE_DOMAIN, PARENT_NAMESPACE
+from config import STAGED_OUTPUT, OUTPUT_GENERATIONS_KEPT, CORPUS_FORMAT
+from config import CONNECT_TIMEOUT, READ_TIMEOUT, RETRY_MAX_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY, RETRY_QUEUE_MAX
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
-# --- Fonctions de nettoyage du HTML ---
-def remove_cookie_banner(soup):
-    cookie_div = soup.find("div", id="cmplz-cookiebanner-container")
-    if cookie_div:
-        cookie_div.decompose()
-
-    for el in soup.find_all(lambda tag: any(
-        (val and "cmplz" in val.lower())
-        for val in tag.attrs.values() if isinstance(val, str)
-    )):
-        el.decompose()
-
-    for btn in soup.find_all("button"):
-        if "gérer le consentement" in btn.get_text(strip=True).lower():
-            btn.decompose()
-
-def remove_footer_shortcodes(soup):
-    FOOTER_KEYWORDS = []  # À compléter si nécessaire
-    for sc in soup.find_all("div", class_="elementor-shortcode"):
-        txt = sc.get_text(strip=True).lower()
-        if any(kw in txt for kw in FOOTER_KEYWORDS):
-            sc.decompose()
-
-    for sec in soup.find_all("section", class_=lambda c: c and "elementor-top-section" in c):
-        txt = sec.get_text(strip=True).lower()
-        if any(kw in txt for kw in FOOTER_KEYWORDS):
-            sec.decompose()
-
-def remove_useless_tags(soup):
-    """
-    Supprime uniquement les éléments vraiment inutiles, 
-    en préservant le contenu interactif et structuré
-    """
-    # Supprimer les scripts, styles et méta
-    for tag in soup(["script", "style", "meta", "noscript", "link"]):
-        tag.decompose()
-    
-    # Supprimer les SVG et iframes (généralement décoratifs)
-    for tag in soup(["svg", "iframe"]):
-        tag.decompose()
-    
-    # Pour les images, vérifier si elles ont un alt text informatif
-    for img in soup.find_all("img"):
-        alt_text = img.get("alt", "").strip()
-        # Garder seulement les images avec un alt text informatif
-        if not alt_text or len(alt_text) < 5:
-            img.decompose()
-    
-    # Analyser headers, footers, nav et aside individuellement
-    for tag_name in ["header", "footer", "nav", "aside"]:
-        for element in soup.find_all(tag_name):
-            # Compter le contenu textuel significatif
-            text_content = element.get_text(strip=True)
-            # Compter les liens utiles (non navigation)
-            useful_links = 0
-            for link in element.find_all("a", href=True):
-                href = link.get("href", "")
-                link_text = link.get_text(strip=True)
-                # Ignorer les liens de navigation typiques
-                if not any(nav_word in link_text.lower() for nav_word in ["accueil", "home", "menu", "connexion", "login", "contact"]):
-                    if len(link_text) > 10:  # Lien avec du texte substantiel
-                        useful_links += 1
-            
-            # Garder si contient du texte substantiel ou des liens utiles
-            if len(text_content) < 100 and useful_links == 0:
-                element.decompose()
-    
-    # Supprimer les éléments vides
-    remove_empty_elements(soup)
-
-def remove_empty_elements(soup):
-    """
-    Supprime les éléments vides qui n'apportent pas de structure
-    """
-    # Tags qui peuvent être supprimés s'ils sont vides
-    removable_if_empty = ["div", "span", "section", "article", "aside"]
-    
-    # Continuer jusqu'à ce qu'il n'y ait plus de changements
-    changed = True
-    while changed:
-        changed = False
-        for tag_name in removable_if_empty:
-            for element in soup.find_all(tag_name):
-                # Vérifier si l'élément est vraiment vide (pas de texte, pas d'enfants avec contenu)
-                if not element.get_text(strip=True) and not element.find_all(["img", "input", "button"]):
-                    element.decompose()
-                    changed = True
-    
-    # Supprimer les <br> multiples
-    br_tags = soup.find_all("br")
-    for i in range(len(br_tags)-1, 0, -1):
-        if br_tags[i].find_previous_sibling() and br_tags[i].find_previous_sibling().name == "br":
-            br_tags[i].decompose()
-
-def clean_attributes(soup):
-    """
-    Supprime tous les attributs sauf href pour les liens
-    """
-    for tag in soup.find_all(True):
-        if tag.name == "a":
-            # Garder seulement href pour les liens
-            keep = {}
-            if "href" in tag.attrs:
-                keep["href"] = tag.attrs["href"]
-            tag.attrs = keep
-        else:
-            # Supprimer tous les attributs pour les autres tags
-            tag.attrs = {}
-
-def simplify_structure(soup):
-    """
-    Simplifie la structure HTML en supprimant les div imbriqués inutiles
-    """
-    # Remplacer les divs imbriqués par leur contenu quand c'est possible
-    changed = True
-    while changed:
-        changed = False
-        for div in soup.find_all("div"):
-            # Si le div n'a qu'un seul enfant direct qui est aussi un div
-            children = [child for child in div.children if child.name]
-            if len(children) == 1 and children[0].name == "div":
-                # Remplacer le parent par l'enfant
-                child_div = children[0]
-                div.replace_with(child_div)
-                changed = True
-    
-    # Convertir les buttons avec du texte en simples textes (pour les accordéons)
-    for button in soup.find_all("button"):
-        button_text = button.get_text(strip=True)
-        if button_text:
-            # Ajouter un espace après les numéros au début
-            import re
-            # Rechercher les numéros au début du texte et ajouter un espace
-            button_text = re.sub(r'^(\d+)([A-Za-z])', r'\1 \2', button_text)
-            
-            # Créer un h3 pour les titres d'accordéon
-            new_h3 = soup.new_tag("h3")
-            new_h3.string = button_text
-            button.replace_with(new_h3)
-
-def convert_relative_urls(soup, base_url):
-    for tag in soup.find_all(True):
-        if tag.has_attr("href"):
-            tag['href'] = urljoin(base_url, tag['href'])
-        if tag.has_attr("src"):
-            tag['src'] = urljoin(base_url, tag['src'])
-    return soup
-
-def extract_main_content_only(soup):
-    """
-    Extrait uniquement le contenu principal en supprimant complètement
-    navigation, header, footer et autres éléments non informatifs
-    """
-    # Supprimer complètement tous les éléments de navigation
-    for element in soup.find_all(['nav', 'header', 'footer']):
-        element.decompose()
-    
-    # Supprimer les éléments avec des rôles de navigation
-    for element in soup.find_all(attrs={'role': ['navigation', 'banner', 'contentinfo']}):
-        element.decompose()
-    
-    # Supprimer les éléments avec des classes/ids typiques de navigation
-    nav_patterns = [
-        'nav', 'navigation', 'menu', 'header', 'footer', 'sidebar', 'aside',
-        'breadcrumb', 'skip', 'search', 'lang', 'cookie', 'banner'
-    ]
-    
-    for pattern in nav_patterns:
-        # Supprimer par classe
-        for element in soup.find_all(class_=lambda x: x and pattern in str(x).lower()):
-            element.decompose()
-        
-        # Supprimer par id  
-        for element in soup.find_all(id=lambda x: x and pattern in str(x).lower()):
-            element.decompose()
-    
-    # Chercher le contenu principal dans l'ordre de priorité
-    main_selectors = [
-        'main',
-        '[role="main"]',
-        '.main-content',
-        '.content',
-        '.page-content',
-        'article',
-        '.article-content'
-    ]
-    
-    main_content = None
-    for selector in main_selectors:
-        main_content = soup.select_one(selector)
-        if main_content:
-            break
-    
-    if main_content:
-        return main_content
-    
-    # Si pas de contenu principal identifié, chercher le plus gros bloc de contenu
-    # en excluant les éléments de petite taille
-    content_blocks = []
-    nav_words = ['accueil', 'menu', 'navigation', 'connexion', 'rechercher', 'thematiques', 'actualités', 'evenements']
-    
-    for div in soup.find_all('div'):
-        text = div.get_text(strip=True)
-        if len(text) > 500:  # Seuil minimum de contenu plus élevé
-            # Vérifier que ce n'est pas principalement de la navigation
-            text_lower = text.lower()
-            # Si moins de 3 mots de navigation détectés, c'est probablement du contenu
-            nav_count = sum(1 for word in nav_words if word in text_lower)
-            if nav_count < 3:
-                content_blocks.append((div, len(text)))
-    
-    if content_blocks:
-        # Prendre le bloc avec le plus de contenu
-        content_blocks.sort(key=lambda x: x[1], reverse=True)
-        return content_blocks[0][0]
-    
-    return soup
-
-def remove_breadcrumbs_and_navigation(soup):
-    """
-    Supprime les fils d'Ariane et autres éléments de navigation 
-    qui peuvent rester dans le contenu principal
-    """
-    # Supprimer les listes de navigation (souvent des fils d'Ariane)
-    for ul in soup.find_all('ul'):
-        links = ul.find_all('a')
-        if len(links) >= 3:  # Probable fil d'Ariane si 3+ liens
-            # Vérifier si contient des mots typiques de navigation
-            ul_text = ul.get_text().lower()
-            if any(word in ul_text for word in ['accueil', 'thématiques', 'home']):
-                ul.decompose()
-                continue
-    
-    # Supprimer les éléments avec peu de contenu mais beaucoup de liens
-    for div in soup.find_all('div'):
-        text = div.get_text(strip=True)
-        links = div.find_all('a')
-        if len(text) < 200 and len(links) > 2:
-            # Plus de liens que de contenu = probablement navigation
-            div.decompose()
-    
-    # Supprimer les divs qui ne contiennent que des spans avec peu de texte
-    for div in soup.find_all('div'):
-        spans = div.find_all('span')
-        other_elements = [tag for tag in div.find_all() if tag.name != 'span']
-        if len(spans) > 0 and len(other_elements) == 0:
-            text = div.get_text(strip=True)
-            if len(text) < 100 and any(word in text.lower() for word in ['démarche', 'mise à jour', 'transports']):
-                div.decompose()
-
-def clean_html_content(html, page_url):
-    soup = BeautifulSoup(html, "html.parser")
-    
-    # Nettoyages basiques
-    remove_cookie_banner(soup)
-    remove_footer_shortcodes(soup)
-    
-    # NOUVEAU: Extraire uniquement le contenu principal
-    main_content = extract_main_content_only(soup)
-    
-    # Créer un nouveau document avec seulement le contenu principal
-    new_soup = BeautifulSoup("", "html.parser")
-    new_html = new_soup.new_tag("html")
-    new_head = new_soup.new_tag("head")
-    new_title = new_soup.new_tag("title")
-    new_title.string = page_url
-    new_head.append(new_title)
-    new_body = new_soup.new_tag("body")
-    
-    if main_content:
-        # Copier le contenu principal
-        new_body.append(main_content)
-    
-    new_html.append(new_head)
-    new_html.append(new_body)
-    new_soup.append(new_html)
-    
-    # Appliquer les nettoyages sur le nouveau document
-    remove_useless_tags(new_soup)
-    remove_breadcrumbs_and_navigation(new_soup)  # NOUVEAU: Nettoyage des fils d'Ariane
-    clean_attributes(new_soup)
-    simplify_structure(new_soup)
-    convert_relative_urls(new_soup, page_url)
-
-    minimal_html = (
-        "<!DOCTYPE html>\n"
-        f"{new_soup.prettify()}\n"
-    )
-    return minimal_html
+# Compteurs d'extraction (gabarit reconnu / pipeline générique) du run en cours
+extraction_stats = {"fast_path": 0, "generic": 0}
+_extraction_stats_lock = threading.Lock()
+
+def reset_extraction_stats():
+    with _extraction_stats_lock:
+        extraction_stats["fast_path"] = 0
+        extraction_stats["generic"] = 0
+
+def clean_page(content, page_url, clean_executor=None):
+    """
+    Nettoie une page, dans le thread courant ou dans le pool de processus
+    de nettoyage s'il est fourni (le thread d'I/O attend alors le résultat
+    sans tenir le GIL). Renvoie (html_nettoyé, enrichi).
+    """
+    if clean_executor is None:
+        minimal_html, fast_path, enriched = clean_html_with_stats(content, page_url)
+    else:
+        minimal_html, fast_path, enriched = clean_executor.submit(clean_html_with_stats, content, page_url).result()
+    with _extraction_stats_lock:
+        extraction_stats["fast_path" if fast_path else "generic"] += 1
+    return minimal_html, enriched
 
 def sanitize_url(url):
     return re.sub(r'\W+', '_', url)
@@ -317,18 +68,127 @@ except ImportError:
     annuaire_scraper_loaded = False
     print("[INFO] Module annuaire_scraper non disponible. Le scraping spécifique d'annuaire est désactivé.")
 
-# --- Fonction de scraping d'une URL ---
-def process_single_url(url, output_folder, silent=False):
+try:
+    from async_fetcher import fetch_urls, TRANSIENT_ERRORS as ASYNC_TRANSIENT_ERRORS
+    async_fetcher_loaded = True
+except ImportError:
+    ASYNC_TRANSIENT_ERRORS = ()
+    async_fetcher_loaded = False
+
+# Délais (connexion, lecture) appliqués à chaque requête
+REQUEST_TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+
+# Échecs transitoires relancés en fin de scraping
+RETRYABLE_STATUSES = (408, 425, 429, 500, 502, 503, 504)
+TRANSIENT_ERRORS = (
+    requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError,
+) + ASYNC_TRANSIENT_ERRORS
+
+class PageFetchError(requests.HTTPError):
+    """Réponse HTTP inexploitable pour une page (le code sert à décider d'une relance)."""
+    def __init__(self, url, status_code):
+        super().__init__(f"HTTP {status_code} en accédant à {url}")
+        self.status_code = status_code
+
+def describe_error(error):
+    """Message lisible (certaines exceptions httpx ont un message vide)."""
+    return str(error) or type(error).__name__
+
+def is_retryable(error):
+    if isinstance(error, PageFetchError):
+        return error.status_code in RETRYABLE_STATUSES
+    return isinstance(error, TRANSIENT_ERRORS)
+
+# Session HTTP partagée par les threads (connexions keep-alive réutilisées)
+_http_session = None
+
+def get_http_session(pool_size=16):
+    global _http_session
+    if _http_session is None:
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.verify = False
+        _http_session = session
+    return _http_session
+
+def fetch_page(url, headers=None):
+    """
+    Télécharge une page via la session partagée. Renvoie (status_code, content, headers).
+    La concurrence vers l'hôte est régulée par le contrôleur partagé (host_throttle).
+    """
+    throttle = get_host_throttle()
+    if throttle is None:
+        resp = get_http_session().get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+        return resp.status_code, resp.content, resp.headers
+    throttle.acquire(url)
+    start = time.monotonic()
+    try:
+        resp = get_http_session().get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+    except Exception:
+        throttle.release(url, error=True)
+        raise
+    throttle.release(url, resp.status_code, time.monotonic() - start, resp.headers.get("Retry-After"))
+    return resp.status_code, resp.content, resp.headers
+
+def write_text_atomic(path, text):
+    """
+    Écrit via un fichier temporaire renommé : un lecteur ne voit jamais de
+    fichier partiel, et un fichier partagé par lien physique avec une
+    génération précédente n'est pas modifié.
+    """
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+def enrich_page(html):
+    """Texte enrichi d'une page déjà nettoyée (annuaire, cache HTTP) : une analyse du HTML."""
+    soup = parse_html(html)
+    url = soup.title.string.strip() if soup.title and soup.title.string else "unknown"
+    return {"url": url, "title": None, "text": soup_to_enriched_text(soup, url)}
+
+def write_page(url, output_folder, html, corpus=None, enriched=None):
+    """
+    Enregistre une page nettoyée avec son texte enrichi : fichier .txt dans
+    le dossier du groupe (texte enrichi dans le fichier .enriched.json voisin),
+    ou enregistrement du corpus JSONL si corpus est fourni. Renvoie l'emplacement.
+    enriched: dict {"url", "title", "text"} de clean_html_with_stats, calculé
+    à partir du HTML s'il n'est pas fourni.
+    """
+    if enriched is None:
+        enriched = enrich_page(html)
+    group = os.path.basename(output_folder)
+    filename = sanitize_url(url) + ".txt"
+    if corpus is not None:
+        corpus.add(url, group, html, filename, enriched=enriched)
+        return corpus.directory
     os.makedirs(output_folder, exist_ok=True)
-    
+    filepath = os.path.join(output_folder, filename)
+    write_text_atomic(filepath, html)
+    # Écrit après la page : un fichier enrichi plus ancien que sa page est ignoré au chargement
+    write_text_atomic(enriched_sidecar_path(filepath), json.dumps(dict(enriched, group=group), ensure_ascii=False))
+    return filepath
+
+# --- Fonction de scraping d'une URL ---
+def process_single_url(url, output_folder, silent=False, prefetched=None, http_cache=None, clean_executor=None,
+                       raw_archive=None, corpus=None):
+    """
+    Scrape une URL et enregistre le HTML nettoyé. Lève une exception en cas
+    d'échec (PageFetchError pour une réponse HTTP inexploitable).
+    prefetched: tuple (status_code, content, headers) déjà téléchargé par le mode asynchrone.
+    http_cache: ValidatorCache optionnel ; une réponse 304 réutilise le HTML nettoyé précédent
+    et son texte enrichi (titre compris).
+    clean_executor: ProcessPoolExecutor optionnel pour le nettoyage HTML.
+    raw_archive: RawArchive optionnelle où conserver le HTML brut (mode replay).
+    corpus: CorpusWriter optionnel remplaçant les fichiers .txt.
+    """
     # Point d'extension pour l'annuaire 
-    if annuaire_scraper_loaded and any(pattern in url for pattern in ANNUAIRE_URL_PATTERNS):
+    if annuaire_scraper_loaded and is_annuaire_url(url):
         try:
             html_content = scrape_annuaire(url) 
-            filename = sanitize_url(url) + ".txt"
-            filepath = os.path.join(output_folder, filename)
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(html_content)
+            filepath = write_page(url, output_folder, html_content, corpus)
             if not silent:
                 print(f"[OK] Fichier annuaire enregistré : {filepath}")
             return  # Sortie anticipée
@@ -338,122 +198,675 @@ def process_single_url(url, output_folder, silent=False):
             # Continuer avec le scraping normal en cas d'échec
     
     try:
-        resp = requests.get(url, verify=False)
-        if resp.status_code == 200:
-            cleaned_html = clean_html_content(resp.content, url)
-            filename = sanitize_url(url) + ".txt"
-            filepath = os.path.join(output_folder, filename)
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(cleaned_html)
+        if prefetched is not None:
+            status_code, content, headers = prefetched
+        else:
+            request_headers = http_cache.request_headers(url) if http_cache is not None else None
+            status_code, content, headers = fetch_page(url, request_headers)
+        
+        cleaned_html = None
+        enriched = None
+        if status_code == 304 and http_cache is not None:
+            enriched = http_cache.load_metadata(url)
+            cached = http_cache.load(url) if enriched is not None else None
+            if cached is not None:
+                cleaned_html = cached.decode("utf-8")
+            else:
+                # Contenu du cache perdu (ou sans texte enrichi) : requête inconditionnelle
+                enriched = None
+                status_code, content, headers = fetch_page(url)
+        if cleaned_html is None and status_code == 200:
+            if raw_archive is not None:
+                raw_archive.add(url, content)
+            cleaned_html, enriched = clean_page(content, url, clean_executor)
+            if http_cache is not None:
+                http_cache.store(url, headers, cleaned_html.encode("utf-8"), metadata=enriched)
+        
+        if cleaned_html is not None:
+            filepath = write_page(url, output_folder, cleaned_html, corpus, enriched)
             if not silent:
                 print(f"[OK] Fichier enregistré : {filepath}")
         else:
-            if not silent:
-                print(f"[ERREUR] HTTP {resp.status_code} en accédant à {url}")
+            raise PageFetchError(url, status_code)
     except Exception as e:
         if not silent:
             print(f"[ERREUR] En traitant {url} : {e}")
+        raise
+
+def is_annuaire_url(url):
+    return get_classifier().is_annuaire(url)
 
 # --- Détermination du groupe / namespace ---
 def determine_group(url):
-    from config import FIXED_URLS, PRIMARY_PATTERNS, PARENT_NAMESPACE, ANNUAIRE_URL_PATTERNS, ANNUAIRE_NAMESPACE
+    return get_classifier().group(url)
+
+
+# --- Traitement multiple des URLs ---
+def process_urls_threaded(valid_urls, output_base_folder, max_workers, pbar, http_cache=None, clean_executor=None,
+                          on_failure=None, raw_archive=None, corpus=None):
+    """
+    Mode historique : chaque thread télécharge puis nettoie sa page.
+    valid_urls est un itérable de (url, groupe), éventuellement un flux.
+    on_failure(url, groupe, erreur) est appelé pour chaque URL en échec.
+    """
+    get_http_session(pool_size=max_workers)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = []
+        
+        # Soumettre toutes les tâches avec le mode silencieux
+        for url, group in valid_urls:
+            output_folder = os.path.join(output_base_folder, group)
+            future = executor.submit(process_single_url, url, output_folder, True,  # Passer silent=True
+                                     http_cache=http_cache, clean_executor=clean_executor, raw_archive=raw_archive,
+                                     corpus=corpus)
+            futures.append((future, url, group))
+        
+        # Attendre les résultats et mettre à jour la progression
+        for future, url, group in futures:
+            try:
+                future.result()
+            except Exception as e:
+                print(f"[ERREUR] Échec du traitement de {url}: {e}")
+                if on_failure is not None:
+                    on_failure(url, group, e)
+            finally:
+                pbar.update(1)
+
+def process_urls_async(valid_urls, output_base_folder, max_workers, max_in_flight, pbar, http_cache=None,
+                       clean_executor=None, on_failure=None, raw_archive=None, corpus=None):
+    """
+    Mode asynchrone : un seul pool de connexions httpx télécharge les pages
+    (max_in_flight requêtes simultanées) et les threads ne font plus que le nettoyage.
+    valid_urls est un itérable de (url, groupe), éventuellement un flux.
+    on_failure(url, groupe, erreur) est appelé pour chaque URL en échec.
+    """
+    groups = {}
     
-    # Traitement spécial pour l'annuaire basé sur la config
-    if any(pattern in url for pattern in ANNUAIRE_URL_PATTERNS):
-        return ANNUAIRE_NAMESPACE # "child" pour l'annuaire
+    def handle_failure(url, error):
+        print(f"[ERREUR] Échec du traitement de {url}: {describe_error(error)}")
+        if on_failure is not None:
+            on_failure(url, groups[url], error)
     
-    # Vérifier si l'URL figure dans FIXED_URLS (pour les autres)
-    for fixed in FIXED_URLS:
-        if url == fixed["url"]:
-            return PARENT_NAMESPACE  
+    def handle_result(url, response, error):
+        try:
+            if error is not None:
+                handle_failure(url, error)
+            else:
+                process_single_url(url, os.path.join(output_base_folder, groups[url]), True, prefetched=response,
+                                   http_cache=http_cache, clean_executor=clean_executor, raw_archive=raw_archive,
+                                   corpus=corpus)
+        except Exception as e:
+            handle_failure(url, e)
+        finally:
+            pbar.update(1)
     
-    # Logique normale pour le reste
-    for category, patterns in PRIMARY_PATTERNS.items():
-        for pattern in patterns:
-            if pattern in url:
-                return category
-    return None
+    def handle_annuaire(url):
+        try:
+            process_single_url(url, os.path.join(output_base_folder, groups[url]), True, corpus=corpus)
+        except Exception as e:
+            handle_failure(url, e)
+        finally:
+            pbar.update(1)
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        def urls_to_fetch():
+            for url, group in valid_urls:
+                groups[url] = group
+                # L'annuaire passe par Playwright, inutile de le télécharger
+                if annuaire_scraper_loaded and is_annuaire_url(url):
+                    executor.submit(handle_annuaire, url)
+                else:
+                    yield url
+        
+        fetch_urls(urls_to_fetch(), handle_result, max_in_flight=max_in_flight, executor=executor,
+                   timeout=REQUEST_TIMEOUT,
+                   request_headers=http_cache.request_headers if http_cache is not None else None,
+                   throttle=get_host_throttle())
 
+# --- Relances et manifeste des échecs ---
 
-# --- Traitement multiple des URLs ---
-def process_multiple_urls(url_list, output_base_folder, max_workers=4):
-    # Supprimer le dossier de sortie s'il existe déjà
-    if os.path.exists(output_base_folder):
+def retry_delay(attempt):
+    """Backoff exponentiel avec jitter complet (attempt commence à 0)."""
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+
+def retry_failed_urls(failures, output_base_folder, max_workers, http_cache=None, clean_executor=None,
+                      raw_archive=None, corpus=None):
+    """
+    Relance en fin de scraping les URLs en échec transitoire (erreur réseau,
+    408/429/5xx), au plus RETRY_QUEUE_MAX URLs et RETRY_MAX_ATTEMPTS tentatives
+    chacune. failures (url -> échec) est mis à jour sur place.
+    """
+    queue_urls = [url for url, failure in failures.items() if failure["retryable"]]
+    if not queue_urls:
+        return
+    if len(queue_urls) > RETRY_QUEUE_MAX:
+        print(f"[AVERT] {len(queue_urls)} URLs en échec transitoire, seules {RETRY_QUEUE_MAX} sont relancées.")
+        queue_urls = queue_urls[:RETRY_QUEUE_MAX]
+    print(f"[INFO] Relance de {len(queue_urls)} URLs en échec (jusqu'à {RETRY_MAX_ATTEMPTS} tentatives).")
+    
+    def retry(url):
+        failure = failures[url]
+        output_folder = os.path.join(output_base_folder, failure["group"])
+        for attempt in range(RETRY_MAX_ATTEMPTS):
+            time.sleep(retry_delay(attempt))
+            failure["attempts"] += 1
+            try:
+                process_single_url(url, output_folder, True, http_cache=http_cache, clean_executor=clean_executor,
+                                   raw_archive=raw_archive, corpus=corpus)
+                return True
+            except Exception as e:
+                failure["error"] = describe_error(e)
+                failure["retryable"] = is_retryable(e)
+                if not failure["retryable"]:
+                    return False
+        return False
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        recovered = [url for url, ok in zip(queue_urls, executor.map(retry, queue_urls)) if ok]
+    for url in recovered:
+        del failures[url]
+    print(f"[INFO] {len(recovered)} URLs récupérées lors des relances.")
+
+def save_failure_manifest(output_base_folder, failures):
+    """Enregistre les URLs toujours en échec (remplace le manifeste précédent)."""
+    manifest = {
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+        "failures": [dict(failure, url=url) for url, failure in sorted(failures.items())],
+    }
+    manifest_path = os.path.join(output_base_folder, FAILURE_MANIFEST_FILENAME)
+    write_text_atomic(manifest_path, json.dumps(manifest, indent=2, ensure_ascii=False))
+
+def load_failure_manifest(output_base_folder):
+    """Liste des échecs du dernier run (dicts avec url, group, error, attempts)."""
+    manifest_path = os.path.join(output_base_folder, FAILURE_MANIFEST_FILENAME)
+    if not os.path.exists(manifest_path):
+        return []
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f).get("failures", [])
+    except (OSError, ValueError) as e:
+        print(f"[AVERT] Manifeste des échecs illisible, ignoré : {e}")
+        return []
+
+def process_multiple_urls(url_list, output_base_folder, max_workers=4, async_fetch=False, max_in_flight=32,
+                          http_cache=None, clean_output=True, cleaning_workers=0, raw_archive=None, corpus=None):
+    """
+    url_list: itérable d'URLs ; un générateur (flux des sitemaps) est consommé
+    au fil de l'eau, chaque URL étant classée et planifiée dès qu'elle arrive.
+    max_workers: threads d'I/O (téléchargement + écriture).
+    cleaning_workers: taille du pool de processus dédié au nettoyage HTML
+    (0 = nettoyage dans les threads d'I/O).
+    raw_archive: RawArchive optionnelle recevant le HTML brut de chaque page.
+    corpus: CorpusWriter optionnel (corpus JSONL au lieu des fichiers .txt).
+    Les échecs transitoires sont relancés en fin de traitement ; ceux qui
+    subsistent sont enregistrés dans le manifeste des échecs (renvoyé).
+    """
+    # Supprimer le dossier de sortie s'il existe déjà (sauf en mode incrémental)
+    if clean_output and os.path.exists(output_base_folder):
         print(f"[INFO] Suppression du dossier existant : {output_base_folder}")
         shutil.rmtree(output_base_folder)
     
     # Créer le dossier de sortie
     os.makedirs(output_base_folder, exist_ok=True)
     
-    # Filtrer les URLs valides
-    valid_urls = []
-    skipped_urls = []
+    if async_fetch and not async_fetcher_loaded:
+        print("[INFO] httpx non disponible, retour au mode threads.")
+        async_fetch = False
     
-    for url in url_list:
-        group = determine_group(url)
-        if group is None:
-            skipped_urls.append(url)
-            continue
-        valid_urls.append((url, group))
+    reset_extraction_stats()
+    # spawn : les processus de nettoyage démarrent à la première page, quand les threads d'I/O
+    # et la boucle asyncio tournent déjà ; une copie (fork) de ce processus n'est pas sûre
+    clean_executor = (ProcessPoolExecutor(max_workers=cleaning_workers, mp_context=multiprocessing.get_context("spawn"))
+                      if cleaning_workers > 0 else None)
+    if clean_executor is not None:
+        print(f"[INFO] Nettoyage HTML dans {cleaning_workers} processus, {max_workers} threads d'I/O.")
     
-    # Afficher les statistiques
-    print(f"[INFO] {len(valid_urls)} URLs à traiter, {len(skipped_urls)} URLs ignorées")
-    
-    # Créer les dossiers pour chaque groupe
-    groups = set(group for _, group in valid_urls)
-    for group in groups:
-        output_folder = os.path.join(output_base_folder, group)
-        os.makedirs(output_folder, exist_ok=True)
+    failures = {}
+    failures_lock = threading.Lock()
+    def record_failure(url, group, error):
+        with failures_lock:
+            failures[url] = {"group": group, "error": describe_error(error), "retryable": is_retryable(error), "attempts": 1}
     
     # Traiter les URLs avec une barre de progression
-    with tqdm(total=len(valid_urls), desc="Traitement global", unit="page") as pbar:
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = []
-            
-            # Soumettre toutes les tâches avec le mode silencieux
-            for url, group in valid_urls:
-                output_folder = os.path.join(output_base_folder, group)
-                future = executor.submit(process_single_url, url, output_folder, True)  # Passer silent=True
-                futures.append((future, url))
+    valid_count = 0
+    skipped_count = 0
+    try:
+        with tqdm(total=0, desc="Traitement global", unit="page") as pbar:
+            # Filtrer les URLs valides au fil de l'eau
+            def iter_valid_urls():
+                nonlocal valid_count, skipped_count
+                for url in url_list:
+                    group = determine_group(url)
+                    if group is None:
+                        skipped_count += 1
+                        continue
+                    # Créer le dossier du groupe à sa première URL
+                    if corpus is None:
+                        os.makedirs(os.path.join(output_base_folder, group), exist_ok=True)
+                    valid_count += 1
+                    pbar.total = valid_count
+                    pbar.refresh()
+                    yield url, group
             
-            # Attendre les résultats et mettre à jour la progression
-            for future, url in futures:
-                try:
-                    future.result()
-                except Exception as e:
-                    print(f"[ERREUR] Échec du traitement de {url}: {e}")
-                finally:
-                    pbar.update(1)
+            valid_urls = iter_valid_urls()
+            if async_fetch:
+                process_urls_async(valid_urls, output_base_folder, max_workers, max_in_flight, pbar, http_cache,
+                                   clean_executor, on_failure=record_failure, raw_archive=raw_archive, corpus=corpus)
+            else:
+                process_urls_threaded(valid_urls, output_base_folder, max_workers, pbar, http_cache, clean_executor,
+                                      on_failure=record_failure, raw_archive=raw_archive, corpus=corpus)
+        
+        retry_failed_urls(failures, output_base_folder, max_workers, http_cache, clean_executor, raw_archive,
+                          corpus)
+    finally:
+        if clean_executor is not None:
+            clean_executor.shutdown()
+    
+    # Afficher les statistiques
+    print(f"[INFO] {valid_count} URLs traitées, {skipped_count} URLs ignorées")
+    
+    save_failure_manifest(output_base_folder, failures)
+    if failures:
+        print(f"[AVERT] {len(failures)} URLs en échec, liste enregistrée dans "
+              f"{os.path.join(output_base_folder, FAILURE_MANIFEST_FILENAME)}")
+    
+    if http_cache is not None:
+        http_cache.save()
+        print(f"[INFO] Cache HTTP : {http_cache.hits} pages inchangées (304) réutilisées.")
+    
+    if corpus is not None:
+        corpus.save()
+        print(f"[INFO] Corpus JSONL : {corpus.written} pages écrites, {corpus.unchanged} inchangées "
+              f"({len(corpus)} au total).")
+    
+    if raw_archive is not None:
+        raw_archive.close()
+        print(f"[INFO] Archive HTML : {raw_archive.added} nouveaux contenus, "
+              f"{raw_archive.deduplicated} identiques à un contenu déjà archivé.")
+    
+    throttle = get_host_throttle()
+    if throttle is not None:
+        for line in throttle.summary():
+            print(f"[INFO] Concurrence adaptative : {line}")
+    
+    cleaned_total = extraction_stats["fast_path"] + extraction_stats["generic"]
+    if cleaned_total:
+        hit_rate = extraction_stats["fast_path"] / cleaned_total * 100
+        print(f"[INFO] Gabarit du site reconnu (extraction rapide) : "
+              f"{extraction_stats['fast_path']}/{cleaned_total} pages ({hit_rate:.1f}%)")
     
     print(f"[INFO] Traitement terminé. Résultats sauvegardés dans {output_base_folder}")
+    return failures
+
+# --- Replay : renettoyage hors ligne de l'archive HTML brute ---
+def replay_archive(archive_dir, output_base_folder, cleaning_workers=0, clean_output=True, corpus_format=None):
+    """
+    Réapplique le nettoyage HTML à toutes les pages de l'archive brute, sans
+    accès réseau, dans un pool de processus (cleaning_workers, ou un
+    processus par cœur si 0). Le dossier de sortie est régénéré.
+    corpus_format: "files" ou "jsonl" (CORPUS_FORMAT par défaut).
+    Renvoie le nombre de pages renettoyées.
+    """
+    archive = RawArchive(archive_dir) if archive_dir else None
+    if not archive:
+        print(f"[ERREUR] Archive HTML vide ou absente : {archive_dir}")
+        return 0
+    
+    if clean_output and os.path.exists(output_base_folder):
+        print(f"[INFO] Suppression du dossier existant : {output_base_folder}")
+        shutil.rmtree(output_base_folder)
+    os.makedirs(output_base_folder, exist_ok=True)
+    
+    corpus = CorpusWriter(output_base_folder) if (corpus_format or CORPUS_FORMAT) == "jsonl" else None
+    pages = []
+    skipped_count = 0
+    for url in archive.urls():
+        group = determine_group(url)
+        if group is None:
+            skipped_count += 1
+            continue
+        pages.append((url, group, archive.location(url)))
+    
+    reset_extraction_stats()
+    workers = cleaning_workers if cleaning_workers > 0 else (os.cpu_count() or 1)
+    print(f"[INFO] Replay de {len(pages)} pages archivées dans {workers} processus.")
+    failed_count = 0
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        results = executor.map(clean_archived_page, [archive_dir] * len(pages), [page[2] for page in pages],
+                               [page[0] for page in pages], chunksize=8)
+        for (url, group, _), (minimal_html, fast_path, enriched, error) in tqdm(
+                zip(pages, results), total=len(pages), desc="Replay", unit="page"):
+            if error is not None:
+                failed_count += 1
+                print(f"[ERREUR] Replay de {url} : {error}")
+                continue
+            extraction_stats["fast_path" if fast_path else "generic"] += 1
+            write_page(url, os.path.join(output_base_folder, group), minimal_html, corpus, enriched)
+    if corpus is not None:
+        corpus.save()
+    
+    print(f"[INFO] {len(pages) - failed_count} pages renettoyées, {failed_count} en échec, "
+          f"{skipped_count} URLs ignorées")
+    cleaned_total = extraction_stats["fast_path"] + extraction_stats["generic"]
+    if cleaned_total:
+        hit_rate = extraction_stats["fast_path"] / cleaned_total * 100
+        print(f"[INFO] Gabarit du site reconnu (extraction rapide) : "
+              f"{extraction_stats['fast_path']}/{cleaned_total} pages ({hit_rate:.1f}%)")
+    print(f"[INFO] Replay terminé. Résultats sauvegardés dans {output_base_folder}")
+    return len(pages) - failed_count
 
 # --- Chargement des URLs depuis plusieurs sitemaps XML ---
-def load_urls_from_sitemaps(sitemaps):
-    urls = set()
+SITEMAP_CHUNK_SIZE = 64 * 1024
+
+def iter_sitemap_chunks(sitemap, http_cache=None):
+    """
+    Produit le contenu XML d'un sitemap (URL ou chemin local) par blocs,
+    avec requête conditionnelle si un cache HTTP est fourni.
+    """
+    if not sitemap.startswith("http"):
+        with open(sitemap, "rb") as f:
+            while True:
+                chunk = f.read(SITEMAP_CHUNK_SIZE)
+                if not chunk:
+                    return
+                yield chunk
+    
+    request_headers = http_cache.request_headers(sitemap) if http_cache is not None else None
+    with get_http_session().get(sitemap, headers=request_headers, stream=True, timeout=REQUEST_TIMEOUT) as response:
+        if response.status_code == 304:
+            cached = http_cache.load(sitemap)
+            if cached is not None:
+                yield cached
+                return
+        elif response.status_code != 200:
+            raise requests.HTTPError(f"HTTP {response.status_code}")
+        else:
+            body = []
+            for chunk in response.iter_content(chunk_size=SITEMAP_CHUNK_SIZE):
+                body.append(chunk)
+                yield chunk
+            if http_cache is not None:
+                http_cache.store(sitemap, response.headers, b"".join(body))
+            return
+    
+    # 304 mais contenu du cache perdu : requête inconditionnelle
+    status_code, content, headers = fetch_page(sitemap)
+    if status_code != 200:
+        raise requests.HTTPError(f"HTTP {status_code}")
+    http_cache.store(sitemap, headers, content)
+    yield content
+
+def iter_sitemap_entries(sitemaps, http_cache=None, max_workers=8, failed_sitemaps=None):
+    """
+    Charge les sitemaps en parallèle et produit les couples (url, lastmod)
+    au fur et à mesure de l'analyse XML en flux (lastmod vaut None si absent).
+    Les <sitemapindex> sont suivis récursivement.
+    failed_sitemaps: liste optionnelle complétée avec les sitemaps en échec.
+    """
+    results = queue.Queue()
     
-    for sitemap in sitemaps:
+    def read_sitemap(sitemap):
         try:
-            if sitemap.startswith("http"):
-                response = requests.get(sitemap, verify=False)
-                response.raise_for_status()
-                xml_content = response.content
-            else:
-                with open(sitemap, "rb") as f:
-                    xml_content = f.read()
-
-            root = ET.fromstring(xml_content)
-            for elem in root.iter():
-                if elem.tag.endswith("loc") and elem.text:
-                    urls.add(elem.text.strip())
+            parser = ET.XMLPullParser(events=("end",))
+            for chunk in iter_sitemap_chunks(sitemap, http_cache):
+                parser.feed(chunk)
+                _queue_sitemap_events(parser, results)
+            parser.close()
+            _queue_sitemap_events(parser, results)
         except Exception as e:
             print(f"[ERREUR] Lecture/parsing du sitemap {sitemap} : {e}")
-    return list(urls)
+            if failed_sitemaps is not None:
+                failed_sitemaps.append(sitemap)
+        finally:
+            results.put(None)  # Fin de ce sitemap
+    
+    seen_sitemaps = set()
+    pending = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for sitemap in sitemaps:
+            if sitemap not in seen_sitemaps:
+                seen_sitemaps.add(sitemap)
+                executor.submit(read_sitemap, sitemap)
+                pending += 1
+        
+        while pending:
+            item = results.get()
+            if item is None:
+                pending -= 1
+                continue
+            kind, loc, lastmod = item
+            if kind == "sitemap":
+                # Sitemap enfant d'un <sitemapindex>
+                if loc not in seen_sitemaps:
+                    seen_sitemaps.add(loc)
+                    executor.submit(read_sitemap, loc)
+                    pending += 1
+            else:
+                yield loc, lastmod
+    
+    if http_cache is not None:
+        http_cache.save()
+
+def _queue_sitemap_events(parser, results):
+    for _, elem in parser.read_events():
+        kind = elem.tag.rsplit("}", 1)[-1]
+        if kind not in ("url", "sitemap"):
+            continue
+        loc = elem.find("{*}loc")
+        if loc is not None and loc.text:
+            lastmod = elem.find("{*}lastmod")
+            results.put((kind, loc.text.strip(),
+                         lastmod.text.strip() if lastmod is not None and lastmod.text else None))
+        # Libérer la mémoire des entrées déjà traitées
+        elem.clear()
+
+def load_sitemap_entries(sitemaps, http_cache=None):
+    """
+    Charge les sitemaps et renvoie un dictionnaire {url: lastmod}
+    (lastmod vaut None si le sitemap ne le fournit pas).
+    """
+    entries = {}
+    for url, lastmod in iter_sitemap_entries(sitemaps, http_cache=http_cache):
+        if entries.get(url) is None:
+            entries[url] = lastmod
+    return entries
+
+def load_urls_from_sitemaps(sitemaps, http_cache=None):
+    return list(load_sitemap_entries(sitemaps, http_cache=http_cache))
+
+# --- Mode incrémental (basé sur <lastmod>) ---
+
+def output_path_for(url, output_base_folder):
+    """Chemin du fichier produit pour une URL (None si l'URL n'est pas scrapée)."""
+    group = determine_group(url)
+    if group is None:
+        return None
+    return os.path.join(output_base_folder, group, sanitize_url(url) + ".txt")
+
+def load_crawl_state(output_base_folder):
+    """Charge le lastmod de chaque URL enregistré lors du run précédent."""
+    state_path = os.path.join(output_base_folder, CRAWL_STATE_FILENAME)
+    if not os.path.exists(state_path):
+        return {}
+    try:
+        with open(state_path, "r", encoding="utf-8") as f:
+            return json.load(f).get("lastmod", {})
+    except (OSError, ValueError) as e:
+        print(f"[AVERT] État du crawl précédent illisible, scraping complet : {e}")
+        return {}
+
+def output_exists(url, output_base_folder, corpus=None):
+    """
+    La page de l'URL a-t-elle été produite ? corpus : CorpusWriter ou index
+    du corpus JSONL (sinon on cherche le fichier .txt).
+    """
+    if corpus is not None:
+        return url in corpus
+    path = output_path_for(url, output_base_folder)
+    return bool(path) and os.path.exists(path)
+
+def save_crawl_state(output_base_folder, entries, removed_urls, corpus=None):
+    """
+    Enregistre le lastmod des URLs dont le fichier existe : une URL en échec
+    n'est pas mémorisée et sera donc retentée au prochain run incrémental.
+    """
+    lastmod = {}
+    for url, value in entries.items():
+        if output_exists(url, output_base_folder, corpus):
+            lastmod[url] = value
+    state = {
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+        "lastmod": lastmod,
+        "removed": sorted(removed_urls),
+    }
+    state_path = os.path.join(output_base_folder, CRAWL_STATE_FILENAME)
+    write_text_atomic(state_path, json.dumps(state, indent=2))
+
+def needs_scrape(url, lastmod, previous_lastmod, output_base_folder, corpus=None):
+    """
+    Une URL est rescrapée si elle est nouvelle, si son lastmod a changé,
+    si le sitemap ne donne pas de lastmod ou si son fichier a disparu.
+    """
+    if url not in previous_lastmod or lastmod is None or previous_lastmod[url] != lastmod:
+        return True
+    return determine_group(url) is not None and not output_exists(url, output_base_folder, corpus)
+
+def select_changed_urls(entries, previous_lastmod, output_base_folder):
+    """
+    Compare les sitemaps au run précédent.
+    Renvoie (URLs à scraper, URLs retirées des sitemaps).
+    """
+    corpus = load_corpus_index(output_base_folder) if corpus_exists(output_base_folder) else None
+    changed = [url for url, lastmod in entries.items()
+               if needs_scrape(url, lastmod, previous_lastmod, output_base_folder, corpus)]
+    removed = [url for url in previous_lastmod if url not in entries]
+    return changed, removed
+
+def remove_outputs(urls, output_base_folder, corpus=None):
+    """Supprime les fichiers (ou enregistrements du corpus) des URLs qui ne figurent plus dans les sitemaps."""
+    for url in urls:
+        if corpus is not None:
+            if corpus.remove(url):
+                print(f"[INFO] URL retirée des sitemaps, retirée du corpus : {url}")
+            continue
+        path = output_path_for(url, output_base_folder)
+        if path and os.path.exists(path):
+            os.remove(path)
+            print(f"[INFO] URL retirée des sitemaps, fichier supprimé : {path}")
+        if path and os.path.exists(enriched_sidecar_path(path)):
+            os.remove(enriched_sidecar_path(path))
 
 # --- Fonction principale d'exécution du scraping ---
-def run_upsert(sitemaps, output_folder, workers=4):
-    url_list = load_urls_from_sitemaps(sitemaps)
-    print(f"[INFO] {len(url_list)} URLs chargées depuis les sitemaps.")
-    process_multiple_urls(url_list, output_folder, max_workers=workers)
+def run_upsert(sitemaps, output_folder, workers=4, async_fetch=False, max_in_flight=32, http_cache_dir=None,
+               incremental=False, cleaning_workers=0, retry_failed=False, archive_dir=None, replay=False,
+               corpus_format=None):
+    """
+    retry_failed: ne relancer que les URLs du manifeste des échecs du run
+    précédent, sans relire les sitemaps.
+    archive_dir: archive du HTML brut, alimentée pendant le scraping.
+    replay: renettoyer l'archive (archive_dir) sans aucun accès réseau.
+    corpus_format: "files" (un .txt par page) ou "jsonl" (corpus en shards
+    compressés, voir corpus.py) ; CORPUS_FORMAT par défaut.
+    Avec STAGED_OUTPUT, le run écrit dans une nouvelle génération qui n'est
+    publiée sous output_folder qu'une fois terminée.
+    """
+    if retry_failed:
+        urls = [failure["url"] for failure in load_failure_manifest(output_folder)]
+        if not urls:
+            print(f"[INFO] Aucune URL en échec à relancer dans {output_folder}.")
+            return
+    
+    corpus_format = corpus_format or CORPUS_FORMAT
+    if STAGED_OUTPUT:
+        # Les runs incrémentaux partent d'une copie (liens physiques) de la génération courante
+        work_folder = begin_generation(output_folder, clone=incremental or retry_failed)
+    else:
+        work_folder = output_folder
+    
+    try:
+        if replay:
+            if not replay_archive(archive_dir, work_folder, cleaning_workers, clean_output=not STAGED_OUTPUT,
+                                  corpus_format=corpus_format):
+                if STAGED_OUTPUT:
+                    discard_generation(work_folder)
+                return
+        elif retry_failed:
+            print(f"[INFO] Relance de {len(urls)} URLs en échec du run précédent.")
+            process_multiple_urls(urls, work_folder, max_workers=workers,
+                                  async_fetch=async_fetch, max_in_flight=max_in_flight,
+                                  http_cache=ValidatorCache(http_cache_dir) if http_cache_dir else None,
+                                  clean_output=False, cleaning_workers=cleaning_workers,
+                                  raw_archive=RawArchive(archive_dir) if archive_dir else None,
+                                  corpus=CorpusWriter(work_folder) if corpus_format == "jsonl" else None)
+        else:
+            failed_sitemaps = scrape_sitemaps(sitemaps, work_folder, workers, async_fetch, max_in_flight, http_cache_dir,
+                                              incremental, cleaning_workers, archive_dir,
+                                              clean_output=not incremental and not STAGED_OUTPUT,
+                                              corpus_format=corpus_format)
+            if STAGED_OUTPUT and failed_sitemaps and not incremental:
+                # Corpus incomplet : la génération courante reste publiée
+                print(f"[AVERT] Sitemap(s) en échec, génération abandonnée : {output_folder} reste inchangé.")
+                discard_generation(work_folder)
+                return
+    except BaseException:
+        # Run interrompu : la génération inachevée n'est pas conservée
+        if STAGED_OUTPUT:
+            discard_generation(work_folder)
+        raise
+    
+    if STAGED_OUTPUT:
+        promote_generation(output_folder, work_folder, keep=OUTPUT_GENERATIONS_KEPT)
+
+def scrape_sitemaps(sitemaps, output_folder, workers, async_fetch, max_in_flight, http_cache_dir, incremental,
+                    cleaning_workers, archive_dir, clean_output=True, corpus_format="files"):
+    """
+    Scraping des URLs des sitemaps (toutes, ou seulement celles modifiées en
+    mode incrémental). Renvoie la liste des sitemaps en échec.
+    """
+    http_cache = ValidatorCache(http_cache_dir) if http_cache_dir else None
+    raw_archive = RawArchive(archive_dir) if archive_dir else None
+    previous_lastmod = load_crawl_state(output_folder) if incremental else {}
+    corpus = None
+    if corpus_format == "jsonl":
+        # Le dossier est vidé avant d'ouvrir le corpus, et non par process_multiple_urls
+        if clean_output and os.path.exists(output_folder):
+            print(f"[INFO] Suppression du dossier existant : {output_folder}")
+            shutil.rmtree(output_folder)
+            clean_output = False
+        corpus = CorpusWriter(output_folder)
+    
+    # Les URLs sont scrapées au fil de l'analyse des sitemaps
+    entries = {}
+    failed_sitemaps = []
+    def urls_to_scrape():
+        for url, lastmod in iter_sitemap_entries(sitemaps, http_cache=http_cache, failed_sitemaps=failed_sitemaps):
+            if url in entries:
+                # URL présente dans plusieurs sitemaps : déjà planifiée
+                if entries[url] is None:
+                    entries[url] = lastmod
+                continue
+            entries[url] = lastmod
+            if not incremental or needs_scrape(url, lastmod, previous_lastmod, output_folder, corpus):
+                yield url
+    
+    process_multiple_urls(urls_to_scrape(), output_folder, max_workers=workers,
+                          async_fetch=async_fetch, max_in_flight=max_in_flight, http_cache=http_cache,
+                          clean_output=clean_output, cleaning_workers=cleaning_workers,
+                          raw_archive=raw_archive, corpus=corpus)
+    print(f"[INFO] {len(entries)} URLs chargées depuis les sitemaps.")
+    
+    removed_urls = []
+    if incremental and failed_sitemaps:
+        # Liste d'URLs incomplète : ne rien supprimer sur cette base
+        print(f"[AVERT] {len(failed_sitemaps)} sitemap(s) en échec, détection des URLs retirées ignorée.")
+    elif incremental:
+        removed_urls = [url for url in previous_lastmod if url not in entries]
+        print(f"[INFO] Mode incrémental : {len(removed_urls)} URLs retirées des sitemaps.")
+        remove_outputs(removed_urls, output_folder, corpus)
+        if corpus is not None and removed_urls:
+            corpus.save()
+    save_crawl_state(output_folder, entries, removed_urls, corpus)
+    return failed_sitemaps
 
 # Si on souhaite exécuter directement ce script
 if __name__ == "__main__":
@@ -461,11 +874,42 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         description="Scrape des URLs depuis plusieurs sitemaps XML et enregistre dans des dossiers dédiés."
     )
-    parser.add_argument("--sitemaps", "-s", nargs="+", required=True,
+    parser.add_argument("--sitemaps", "-s", nargs="+",
                         help="Liste de liens ou chemins vers des sitemaps XML.")
     parser.add_argument("--output", "-o", required=True,
                         help="Dossier de base pour sauvegarder les pages scrappées.")
     parser.add_argument("--workers", "-w", type=int, default=4,
                         help="Nombre de workers pour le traitement parallèle.")
+    parser.add_argument("--async-fetch", action="store_true",
+                        help="Télécharger les pages via un pool de connexions asynchrone (httpx).")
+    parser.add_argument("--max-in-flight", type=int, default=32,
+                        help="Nombre maximal de requêtes simultanées en mode asynchrone.")
+    parser.add_argument("--http-cache-dir", default=None,
+                        help="Dossier du cache ETag/Last-Modified (requêtes conditionnelles). Désactivé si absent.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Ne scraper que les URLs nouvelles ou dont le <lastmod> a changé depuis le run précédent.")
+    parser.add_argument("--cleaning-workers", type=int, default=0,
+                        help="Nombre de processus dédiés au nettoyage HTML (0 = nettoyage dans les threads).")
+    parser.add_argument("--retry-failed", action="store_true",
+                        help="Ne relancer que les URLs en échec du run précédent (manifeste du dossier de sortie).")
+    parser.add_argument("--archive-dir", default=None,
+                        help="Dossier de l'archive compressée du HTML brut (alimentée pendant le scraping).")
+    parser.add_argument("--replay", action="store_true",
+                        help="Renettoyer le HTML de l'archive (--archive-dir) sans accès réseau.")
+    parser.add_argument("--corpus-format", choices=["files", "jsonl"], default=None,
+                        help="Format des pages : un .txt par page ou corpus JSONL compressé (défaut : config.py).")
+    parser.add_argument("--rollback", action="store_true",
+                        help="Republier la génération précédente du dossier de sortie (sorties par générations).")
     args = parser.parse_args()
-    run_upsert(args.sitemaps, args.output, workers=args.workers)
\ No newline at end of file
+    if args.rollback:
+        rollback_generation(args.output)
+        sys.exit(0)
+    if args.replay and not args.archive_dir:
+        parser.error("--replay nécessite --archive-dir")
+    if not args.sitemaps and not args.retry_failed and not args.replay:
+        parser.error("--sitemaps est requis (sauf avec --retry-failed ou --replay)")
+    run_upsert(args.sitemaps, args.output, workers=args.workers,
+               async_fetch=args.async_fetch, max_in_flight=args.max_in_flight,
+               http_cache_dir=args.http_cache_dir, incremental=args.incremental,
+               cleaning_workers=args.cleaning_workers, retry_failed=args.retry_failed,
+               archive_dir=args.archive_dir, replay=args.replay, corpus_format=args.corpus_format)
\ No newline at end of file
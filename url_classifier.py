@@ -0,0 +1,107 @@
+#url_classifier.py
+import os
+from functools import lru_cache
+
+# Clé marquant la fin d'un pattern dans le trie (les autres clés sont des caractères)
+_END = None
+
+class UrlClassifier:
+    """
+    Classification des URLs compilée à partir de la configuration :
+    table de hachage pour les URLs fixes et trie de caractères pour les
+    patterns de catégories, afin d'éviter de parcourir toute la config
+    pour chaque URL.
+
+    Le résultat est identique au parcours linéaire d'origine : un pattern
+    correspond s'il est contenu dans l'URL, et en cas de correspondances
+    multiples la première catégorie de la config l'emporte.
+    """
+
+    def __init__(self, primary_patterns, fixed_urls, annuaire_patterns, parent_namespace, annuaire_namespace,
+                 cache_size=65536):
+        self.parent_namespace = parent_namespace
+        self.annuaire_namespace = annuaire_namespace
+        self.annuaire_patterns = tuple(annuaire_patterns)
+
+        # URLs fixes : la première occurrence l'emporte, comme dans le parcours linéaire
+        self.fixed_urls = {}
+        for fixed in fixed_urls:
+            self.fixed_urls.setdefault(fixed["url"], fixed["thematique"])
+
+        # Trie des patterns ; chaque fin de pattern porte le rang de sa catégorie
+        self.categories = list(primary_patterns)
+        self._trie = {}
+        all_patterns = []
+        for rank, patterns in enumerate(primary_patterns.values()):
+            for pattern in patterns:
+                node = self._trie
+                for char in pattern:
+                    node = node.setdefault(char, {})
+                node[_END] = min(node.get(_END, rank), rank)
+                all_patterns.append(pattern)
+
+        # Préfixe commun à tous les patterns (typiquement le domaine) : seules
+        # ses occurrences dans l'URL peuvent être le début d'une correspondance
+        self._root = os.path.commonprefix(all_patterns)
+
+        self.group = lru_cache(maxsize=cache_size)(self._group)
+
+    def is_annuaire(self, url):
+        return any(pattern in url for pattern in self.annuaire_patterns)
+
+    def fixed_thematique(self, url):
+        """Thématique associée si l'URL figure dans FIXED_URLS, sinon None."""
+        return self.fixed_urls.get(url)
+
+    def _starts(self, url):
+        if not self._root:
+            return range(len(url) + 1)
+        starts = []
+        start = url.find(self._root)
+        while start != -1:
+            starts.append(start)
+            start = url.find(self._root, start + 1)
+        return starts
+
+    def category(self, url):
+        """Catégorie dont un pattern est contenu dans l'URL, ou None."""
+        best = None
+        for start in self._starts(url):
+            node = self._trie
+            if _END in node and (best is None or node[_END] < best):
+                best = node[_END]
+            for char in url[start:]:
+                node = node.get(char)
+                if node is None:
+                    break
+                if _END in node and (best is None or node[_END] < best):
+                    best = node[_END]
+            if best == 0:
+                break
+        return self.categories[best] if best is not None else None
+
+    def _group(self, url):
+        # Traitement spécial pour l'annuaire basé sur la config
+        if self.is_annuaire(url):
+            return self.annuaire_namespace
+        # URLs fixes (pour les autres)
+        if url in self.fixed_urls:
+            return self.parent_namespace
+        # Logique normale pour le reste
+        return self.category(url)
+
+_classifier = None
+
+def get_classifier():
+    """Classifieur partagé, compilé une seule fois à partir de config.py."""
+    global _classifier
+    if _classifier is None:
+        import config
+        _classifier = UrlClassifier(
+            config.PRIMARY_PATTERNS,
+            config.FIXED_URLS,
+            config.ANNUAIRE_URL_PATTERNS,
+            config.PARENT_NAMESPACE,
+            config.ANNUAIRE_NAMESPACE,
+        )
+    return _classifier
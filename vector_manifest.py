@@ -0,0 +1,49 @@
+#vector_manifest.py
+import json
+import os
+
+# Manifeste local des vecteurs présents dans l'index Pinecone, par index puis
+# namespace puis page : {index: {namespace: {page: {id: hash des métadonnées}}}}.
+# Avec des IDs déterministes (URL + chunk + texte), il permet de n'insérer que
+# les chunks nouveaux ou modifiés (texte ou métadonnées) et de supprimer
+# uniquement les IDs obsolètes.
+
+def load_vector_manifest(path, index_name):
+    """Manifeste {namespace: {page: {id: hash}}} de l'index (vide si absent ou illisible)."""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f).get(index_name, {})
+    except (OSError, ValueError) as e:
+        print(f"[AVERT] Manifeste des vecteurs illisible, ignoré : {e}")
+        return {}
+    # Ancien format {page: [ids]} : hash inconnu, les vecteurs seront réinsérés une fois
+    return {ns: {page: ids if isinstance(ids, dict) else dict.fromkeys(ids) for page, ids in pages.items()}
+            for ns, pages in manifest.items()}
+
+def save_vector_manifest(path, index_name, manifest):
+    """Remplace le manifeste de l'index (écriture atomique, autres index conservés)."""
+    data = {}
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+    data[index_name] = manifest
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+def manifest_ids(namespace_manifest):
+    """Ensemble des IDs d'un namespace du manifeste."""
+    return {vector_id for ids in namespace_manifest.values() for vector_id in ids}
+
+def manifest_hashes(namespace_manifest):
+    """Hash des métadonnées de chaque ID d'un namespace du manifeste."""
+    return {vector_id: digest for ids in namespace_manifest.values() for vector_id, digest in ids.items()}